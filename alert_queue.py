@@ -0,0 +1,253 @@
+"""
+알림 전송 큐
+
+이벤트 핸들러(감지)와 Slack 전송을 분리한다.
+- 감지 쪽은 submit()으로 작업만 넣고 바로 반환 (큐가 꽉 차면 False)
+- sender 스레드 몇 개가 큐를 비우며 실제 전송 함수를 호출
+- stop()은 남은 작업을 다 보낸 뒤 스레드를 정리
+
+AsyncAlertQueue는 asyncio 런타임용 (같은 submit/depth/stats 인터페이스, 스레드 대신 task)
+"""
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+
+_STOP = object()
+
+
+class AlertQueue:
+    def __init__(self, send_fn, maxsize: int = 1000, workers: int = 2, name: str = "alert-sender",
+                 latency_samples: int = 1024):
+        """
+        send_fn(job): 실제 전송 함수. 예외는 큐가 잡아서 failed로 센다.
+        """
+        self._send_fn = send_fn
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._workers = workers
+        self._name = name
+        self._threads = []
+        self._accepting = False
+
+        self._stats_lock = threading.Lock()
+        self._submitted = 0
+        self._dropped = 0
+        self._sent = 0
+        self._failed = 0
+        # 최근 N건만 보관 (메모리 고정)
+        self._send_latency = deque(maxlen=latency_samples)
+        self._queue_wait = deque(maxlen=latency_samples)
+
+    # ----------------------------------------------------
+    # lifecycle
+    # ----------------------------------------------------
+    def start(self):
+        """
+        workers=0 이면 스레드 없이 submit() 안에서 바로 전송한다 (리플레이/테스트용)
+        """
+        if self._threads:
+            return
+        self._accepting = True
+        for i in range(self._workers):
+            t = threading.Thread(target=self._run, name=f"{self._name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 10.0):
+        """
+        신규 submit을 막고, 이미 들어온 작업을 모두 보낸 뒤 스레드 종료
+        """
+        self._accepting = False
+        for _ in self._threads:
+            self._queue.put(_STOP)
+
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        self._threads = [t for t in self._threads if t.is_alive()]
+
+    # ----------------------------------------------------
+    # producer
+    # ----------------------------------------------------
+    def submit(self, job) -> bool:
+        """
+        블로킹하지 않는다. 큐가 닫혔거나 꽉 찼으면 False
+        """
+        if not self._accepting:
+            with self._stats_lock:
+                self._dropped += 1
+            return False
+        if self._workers == 0:
+            with self._stats_lock:
+                self._submitted += 1
+            self._execute(time.monotonic(), job)
+            return True
+        try:
+            self._queue.put_nowait((time.monotonic(), job))
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped += 1
+            return False
+        with self._stats_lock:
+            self._submitted += 1
+        return True
+
+    # ----------------------------------------------------
+    # consumer
+    # ----------------------------------------------------
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._execute(*item)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, enqueued_at: float, job):
+        started = time.monotonic()
+        ok = True
+        try:
+            self._send_fn(job)
+        except Exception as e:
+            ok = False
+            print(f"[ALERT_QUEUE_SEND_FAIL] {repr(e)}")
+        finished = time.monotonic()
+
+        with self._stats_lock:
+            if ok:
+                self._sent += 1
+            else:
+                self._failed += 1
+            self._queue_wait.append(started - enqueued_at)
+            self._send_latency.append(finished - started)
+
+    def join(self):
+        """
+        지금까지 들어온 작업이 모두 처리될 때까지 대기 (테스트/리플레이용)
+        """
+        self._queue.join()
+
+    # ----------------------------------------------------
+    # stats
+    # ----------------------------------------------------
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            send_latency = sorted(self._send_latency)
+            queue_wait = sorted(self._queue_wait)
+            out = {
+                "depth": self._queue.qsize(),
+                "submitted": self._submitted,
+                "dropped": self._dropped,
+                "sent": self._sent,
+                "failed": self._failed,
+            }
+        out["send_latency"] = _summary(send_latency)
+        out["queue_wait"] = _summary(queue_wait)
+        return out
+
+
+class AsyncAlertQueue:
+    """
+    asyncio 런타임용 전송 큐: 작업마다 task 1개, 동시 전송은 concurrency개까지
+    submit()은 이벤트 루프 스레드에서만 호출한다 (감지가 루프 위에서 돌므로 락 없음).
+    """
+
+    def __init__(self, send_fn, maxsize: int = 1000, concurrency: int = 8, latency_samples: int = 1024):
+        """
+        send_fn(job): 코루틴 함수. 예외는 큐가 잡아서 failed로 센다.
+        """
+        self._send_fn = send_fn
+        self._maxsize = maxsize
+        self._concurrency = concurrency
+        self._sem = None
+        self._tasks = set()
+        self._waiting = 0
+        self._accepting = False
+
+        self._submitted = 0
+        self._dropped = 0
+        self._sent = 0
+        self._failed = 0
+        self._send_latency = deque(maxlen=latency_samples)
+        self._queue_wait = deque(maxlen=latency_samples)
+
+    def start(self):
+        self._sem = asyncio.Semaphore(self._concurrency)
+        self._accepting = True
+
+    async def aclose(self, timeout: float = 10.0):
+        """
+        신규 submit을 막고, 이미 들어온 작업을 timeout까지 기다린다 (남은 작업은 취소)
+        """
+        self._accepting = False
+        if not self._tasks:
+            return
+        _done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+    def submit(self, job) -> bool:
+        if not self._accepting or len(self._tasks) >= self._maxsize:
+            self._dropped += 1
+            return False
+        task = asyncio.get_running_loop().create_task(self._execute(time.monotonic(), job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._waiting += 1
+        self._submitted += 1
+        return True
+
+    async def _execute(self, enqueued_at: float, job):
+        async with self._sem:
+            self._waiting -= 1
+            started = time.monotonic()
+            ok = True
+            try:
+                await self._send_fn(job)
+            except Exception as e:
+                ok = False
+                print(f"[ALERT_QUEUE_SEND_FAIL] {repr(e)}")
+            finished = time.monotonic()
+
+        if ok:
+            self._sent += 1
+        else:
+            self._failed += 1
+        self._queue_wait.append(started - enqueued_at)
+        self._send_latency.append(finished - started)
+
+    async def join(self):
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def depth(self) -> int:
+        return self._waiting
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._waiting,
+            "submitted": self._submitted,
+            "dropped": self._dropped,
+            "sent": self._sent,
+            "failed": self._failed,
+            "send_latency": _summary(sorted(self._send_latency)),
+            "queue_wait": _summary(sorted(self._queue_wait)),
+        }
+
+
+def _summary(sorted_values) -> dict:
+    n = len(sorted_values)
+    if n == 0:
+        return {"count": 0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": n,
+        "p50": sorted_values[int(0.50 * (n - 1))],
+        "p99": sorted_values[int(0.99 * (n - 1))],
+        "max": sorted_values[-1],
+    }
@@ -0,0 +1,155 @@
+"""
+asyncio 런타임 진입점 (app.py의 비동기 버전)
+
+    python async_app.py
+
+- Bolt AsyncApp + AsyncSocketModeHandler (aiohttp)
+- 감지는 이벤트 루프 위에서 바로 처리 (스레드 풀 없음)
+- 알림은 aiohttp 세션 풀 하나를 쓰는 AsyncWebClient로 동시에 전송 (async_bot.AsyncErrorBot)
+- 룰/상태/메트릭/무중단 재시작(HANDOFF_PATH) 구성은 app.py와 같다 (runtime.py)
+
+RedisBackend는 호출마다 루프를 막으므로 지원하지 않는다 (STATE_REDIS_URL이면 app.py 사용).
+"""
+import asyncio
+import os
+import signal
+import socket
+import time
+
+STARTED = time.monotonic()
+
+import aiohttp
+from slack_bolt.adapter.socket_mode.aiohttp import AsyncSocketModeHandler
+from slack_bolt.async_app import AsyncApp
+from slack_sdk.web.async_client import AsyncWebClient
+
+from async_bot import AsyncErrorBot
+from backend import RedisBackend
+from config import ASYNC_HTTP_POOL_SIZE, ASYNC_SEND_CONCURRENCY, DRAIN_TIMEOUT_SECONDS, SLACK_API_URL
+from runtime import (
+    build_backend,
+    build_handoff,
+    build_metrics_exporters,
+    build_rules_watcher,
+    build_state,
+    errstats_reply,
+    initial_rules,
+    prepare_state,
+    record_ready,
+    reload_reply,
+)
+
+
+def register_handlers(app, bot):
+    @app.event("message")
+    async def handle_message(body):
+        bot.handle_message(body)
+
+    @app.command("/mute")
+    async def slash_mute(ack, respond):
+        await ack()
+        bot.set_muted(True)
+        await respond("🔇 Bot mute 설정 완료")
+
+    @app.command("/unmute")
+    async def slash_unmute(ack, respond):
+        await ack()
+        bot.set_muted(False)
+        await respond("🔔 Bot unmute 완료 (카운트 초기화)")
+
+    @app.command("/reload")
+    async def slash_reload(ack, respond):
+        await ack()
+        await respond(reload_reply(bot))
+
+    @app.command("/errstats")
+    async def slash_errstats(ack, respond, command):
+        await ack()
+        await respond(errstats_reply(bot, command.get("text", "")))
+
+
+async def main():
+    print(f"[BOOT] pid={os.getpid()} host={socket.gethostname()} time={time.time()} runtime=asyncio")
+    bot_token = os.environ.get("SLACK_BOT_TOKEN")
+    app_token = os.environ.get("SLACK_APP_TOKEN")
+    if not bot_token or not app_token:
+        raise RuntimeError("Missing SLACK_BOT_TOKEN or SLACK_APP_TOKEN in environment variables.")
+
+    backend = build_backend()
+    if isinstance(backend, RedisBackend):
+        raise RuntimeError("async runtime supports the in-memory backend only (unset STATE_REDIS_URL or use app.py)")
+
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=ASYNC_HTTP_POOL_SIZE))
+    client = AsyncWebClient(token=bot_token, session=session, base_url=SLACK_API_URL or AsyncWebClient.BASE_URL)
+    app = AsyncApp(client=client)
+
+    bot = AsyncErrorBot(client, initial_rules(), backend, alert_workers=ASYNC_SEND_CONCURRENCY)
+    print(f"[BOOT] rules source={bot.ruleset.source} rules={len(bot.ruleset.rules)} version={bot.ruleset.version}")
+    register_handlers(app, bot)
+    rules_watcher = build_rules_watcher(bot)
+    state_store, state_snapshotter = build_state(bot)
+    metrics_exporters = build_metrics_exporters(bot.metrics.registry)
+
+    loop = asyncio.get_running_loop()
+    shutdown = asyncio.Event()
+    handler = AsyncSocketModeHandler(app, app_token)
+    drain_lock = asyncio.Lock()
+    drained = False
+
+    async def drain():
+        """
+        연결 종료 -> 처리 중 이벤트 대기 -> 전송 drain -> 마지막 상태 저장 (한 번만 수행)
+        """
+        nonlocal drained
+        async with drain_lock:
+            if drained:
+                return
+            drained = True
+            await handler.close_async()
+            # 감지는 루프 위에서 동기로 끝나므로 남은 건 전송 쪽뿐 (aclose가 기다림)
+            if rules_watcher is not None:
+                rules_watcher.stop()
+            try:
+                await asyncio.wait_for(bot.aclose(), DRAIN_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                print(f"[DRAIN_TIMEOUT] alert queue after {DRAIN_TIMEOUT_SECONDS}s")
+            if state_snapshotter is not None:
+                state_snapshotter.stop()
+            for exporter in metrics_exporters:
+                exporter.stop()
+            await session.close()
+            print(f"[SHUTDOWN] {bot.stats()}")
+
+    def drain_for_handoff():
+        # 코디네이터 스레드 -> 루프에서 drain 실행 후 release
+        asyncio.run_coroutine_threadsafe(drain(), loop).result()
+        loop.call_soon_threadsafe(shutdown.set)
+
+    handoff = build_handoff(bot, state_store, state_snapshotter, drain_for_handoff)
+    loop.add_signal_handler(signal.SIGTERM, shutdown.set)
+
+    await bot.init_identity_async()
+    prepare_state(bot, handoff, state_store, state_snapshotter)
+    bot.start()
+    for exporter in metrics_exporters:
+        exporter.start()
+    if rules_watcher is not None:
+        rules_watcher.start()
+    try:
+        await handler.connect_async()
+        record_ready(bot, STARTED, handoff)
+        if handoff is not None:
+            handoff.connected()  # 연결이 열린 뒤에야 이전 프로세스가 drain 시작
+            handoff.start()
+        await shutdown.wait()
+    finally:
+        await drain()
+        if handoff is not None:
+            await asyncio.to_thread(handoff.close)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
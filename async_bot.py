@@ -0,0 +1,104 @@
+"""
+asyncio 런타임용 봇 (async_app.py)
+
+감지 코어(Detector, 매처, MemoryBackend, 발언 제한, 요약)는 ErrorBot과 그대로 공유하고
+Slack 호출만 바꾼다.
+- 감지는 이벤트 루프 위에서 바로 돈다 (블로킹 I/O 없음. RedisBackend는 루프를 막으므로 쓰지 않는다)
+- 알림은 AsyncAlertQueue task로 동시에 보낸다 (client: slack_sdk AsyncWebClient, aiohttp 세션 풀)
+- 전송 로직은 ErrorBot의 전송 단계 제너레이터(_alert_steps 등)를 _drive_async로 실행
+"""
+import asyncio
+import time
+
+from alert_queue import AsyncAlertQueue
+from bot import ErrorBot
+
+
+class AsyncErrorBot(ErrorBot):
+    """
+    client: chat_postMessage / files_upload_v2 / auth_test가 코루틴인 객체 (AsyncWebClient 호환)
+    alert_workers: 동시 전송 수
+    start()/handle_message()/flush_digest()는 이벤트 루프 스레드에서 호출한다.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._digest_task = None
+        self._reply_tasks = set()
+
+    def _make_alert_queue(self, maxsize: int, workers: int):
+        return AsyncAlertQueue(self.deliver_alert_async, maxsize=maxsize, concurrency=max(1, workers))
+
+    def _make_ingress(self, capacity: int, high_water: int, workers: int):
+        # 감지는 루프 위에서만 돈다 (수신 큐 워커 스레드 없음)
+        return None
+
+    async def init_identity_async(self):
+        try:
+            self._set_identity(await self.client.auth_test())
+        except Exception as e:
+            self._set_identity(None, e)
+
+    def start(self):
+        self.alert_queue.start()
+        if self.digest_flush_seconds > 0 and self._digest_task is None:
+            self._digest_task = asyncio.get_running_loop().create_task(self._digest_loop_async())
+
+    async def aclose(self):
+        if self._digest_task is not None:
+            self._digest_task.cancel()
+        await self.alert_queue.aclose()
+        pending = self.digest.pending_triggers()
+        if pending:
+            print(f"[DIGEST_DROPPED_ON_SHUTDOWN] triggers={pending}")
+
+    def stop(self):
+        raise RuntimeError("AsyncErrorBot: use 'await bot.aclose()'")
+
+    async def _digest_loop_async(self):
+        while True:
+            await asyncio.sleep(self.digest_flush_seconds)
+            try:
+                self.flush_digest()
+            except Exception as e:
+                print(f"[DIGEST_FLUSH_FAIL] {repr(e)}")
+
+    # ----------------------------------------------------
+    # 전송
+    # ----------------------------------------------------
+    async def deliver_alert_async(self, job):
+        kind = job.get("kind")
+        if kind == "digest":
+            await self._drive_async(self._digest_job_steps(job))
+        elif kind == "incident":
+            await self._drive_async(self._incident_steps(job))
+        else:
+            await self._drive_async(self._alert_steps(job))
+
+    async def _drive_async(self, steps):
+        try:
+            call = next(steps)
+            while True:
+                method, kwargs = call
+                started = time.perf_counter()
+                try:
+                    await getattr(self.client, method)(**kwargs)
+                except Exception as e:
+                    self._observe_send(started, e)
+                    call = steps.throw(e)
+                else:
+                    self._observe_send(started)
+                    call = next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+    def _reply(self, channel, text, fail_tag: str):
+        task = asyncio.get_running_loop().create_task(self._reply_async(channel, text, fail_tag))
+        self._reply_tasks.add(task)
+        task.add_done_callback(self._reply_tasks.discard)
+
+    async def _reply_async(self, channel, text, fail_tag: str):
+        try:
+            await self.client.chat_postMessage(channel=channel, text=text)
+        except Exception as e:
+            print(f"[{fail_tag}] {repr(e)}")
@@ -0,0 +1,450 @@
+"""
+감지 상태 백엔드
+
+(channel, rule) 윈도우 카운트, 발언 제한(rate_limit.py), mute를 어디에 둘지 고른다.
+- MemoryBackend: 프로세스 메모리 (기존 동작, 인스턴스 1개)
+- RedisBackend: Redis 프로토콜 저장소 공유 (인스턴스 여러 개)
+
+공통 인터페이스
+- register_keys(keys)
+- record_hits(now_ts, items) -> [fired, ...]
+    items: [(key, hits, threshold), ...] / fired는 전체 인스턴스 통틀어 1번만 True
+- reset(now_ts, keys=None)      윈도우 초기화 (keys가 없으면 전체)
+- acquire_slot(now_ts, limits, destinations=()) -> rate_limit.Slot | None
+  release_slot(slot) / reset_limits(limits)
+- muted (속성, 락 없이 읽음) / set_muted(bool)
+"""
+import itertools
+import math
+import os
+import socket
+import threading
+import time
+from rate_limit import Slot, TokenBuckets
+from window import SlidingWindowCounter
+
+
+# --------------------------------------------------------
+# 메모리 백엔드 (기존 동작)
+# --------------------------------------------------------
+class _WindowSlot:
+    __slots__ = ("lock", "counter", "dirty")
+
+    def __init__(self, counter):
+        self.lock = threading.Lock()
+        self.counter = counter
+        self.dirty = False  # 마지막 스냅샷 이후 변경 여부 (state_store용)
+
+
+class MemoryBackend:
+    """
+    - (channel, rule) 키마다 락 1개: prune/add/count/clear를 한 번에 처리
+    - 발언 제한은 별도 락 1개 안의 토큰 버킷 (트리거 1회 = 단계별 토큰 1개)
+    """
+
+    def __init__(self, window_seconds: float, bucket_seconds: float):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.muted = False
+
+        self._slots = {}
+        self._slots_lock = threading.Lock()
+        self._buckets = TokenBuckets()
+
+    # ----------------------------------------------------
+    # 윈도우 카운트
+    # ----------------------------------------------------
+    def register_keys(self, keys):
+        with self._slots_lock:
+            for key in keys:
+                if key not in self._slots:
+                    self._slots[key] = _WindowSlot(SlidingWindowCounter(self.window_seconds, self.bucket_seconds))
+
+    def record_hits(self, now_ts: float, items):
+        slots = self._slots
+        fired = []
+        for key, hits, threshold in items:
+            slot = slots[key]
+            with slot.lock:
+                counter = slot.counter
+                counter.prune(now_ts)
+                counter.add(now_ts, hits)
+                hit = counter.count() >= threshold
+                if hit:
+                    counter.clear()
+                slot.dirty = True
+            fired.append(hit)
+        return fired
+
+    def record_hits_traced(self, now_ts: float, items, trace):
+        """
+        record_hits와 같고 키 락 대기 시간을 trace의 lock_wait 단계로 따로 뺀다 (tracer.py)
+        """
+        slots = self._slots
+        fired = []
+        waited = 0.0
+        for key, hits, threshold in items:
+            slot = slots[key]
+            t0 = time.perf_counter()
+            with slot.lock:
+                waited += time.perf_counter() - t0
+                counter = slot.counter
+                counter.prune(now_ts)
+                counter.add(now_ts, hits)
+                hit = counter.count() >= threshold
+                if hit:
+                    counter.clear()
+                slot.dirty = True
+            fired.append(hit)
+        trace.carve("lock_wait", waited)
+        return fired
+
+    def window_count(self, key, now_ts: float = None) -> int:
+        slot = self._slots.get(key)
+        if slot is None:
+            return 0
+        with slot.lock:
+            return slot.counter.count(now_ts)
+
+    def reset(self, now_ts: float = None, keys=None):
+        slots = self._slots.values() if keys is None else [self._slots[k] for k in keys if k in self._slots]
+        for slot in list(slots):
+            with slot.lock:
+                slot.counter.clear()
+                slot.dirty = True
+
+    # ----------------------------------------------------
+    # 발언 제한
+    # ----------------------------------------------------
+    def acquire_slot(self, now_ts: float, limits, destinations=()):
+        """
+        발언 가능하면 토큰을 쓰고 Slot을 반환, 아니면 None (rate_limit.TokenBuckets.acquire 참고)
+        """
+        if self.muted:
+            return None
+        return self._buckets.acquire(now_ts, limits, destinations)
+
+    def release_slot(self, slot):
+        """
+        썼던 토큰 되돌리기 (mute/unmute로 이미 비워졌으면 무시)
+        """
+        self._buckets.release(slot)
+
+    def reset_limits(self, limits=()):
+        self._buckets.reset()
+
+    # ----------------------------------------------------
+    # mute
+    # ----------------------------------------------------
+    def set_muted(self, muted: bool):
+        self.muted = muted
+
+    # ----------------------------------------------------
+    # 영속화 (state_store)
+    # ----------------------------------------------------
+    def export_windows(self, dirty_only: bool = True):
+        """
+        [((channel, rule name), SlidingWindowCounter.to_state()), ...]
+        키 락은 상태 복사하는 동안만 잡는다.
+        """
+        out = []
+        for key, slot in list(self._slots.items()):
+            if dirty_only and not slot.dirty:
+                continue
+            with slot.lock:
+                state = slot.counter.to_state()
+                slot.dirty = False
+            out.append((key, state))
+        return out
+
+    def import_windows(self, rows) -> int:
+        """
+        export_windows 형식을 복원. 현재 룰에 없는 키나 설정이 바뀐 키는 건너뜀
+        """
+        restored = 0
+        for key, state in rows:
+            slot = self._slots.get(key)
+            if slot is None:
+                continue
+            with slot.lock:
+                if slot.counter.load_state(*state):
+                    restored += 1
+        return restored
+
+    def merge_windows(self, rows) -> int:
+        """
+        export_windows 형식을 지금 카운트에 더한다 (무중단 재시작 인계)
+        """
+        merged = 0
+        for key, state in rows:
+            slot = self._slots.get(key)
+            if slot is None:
+                continue
+            with slot.lock:
+                if slot.counter.merge_state(*state):
+                    slot.dirty = True
+                    merged += 1
+        return merged
+
+    def export_limits(self) -> dict:
+        return self._buckets.export()
+
+    def import_limits(self, buckets: dict, merge: bool = False):
+        self._buckets.load(buckets, merge)
+
+
+# --------------------------------------------------------
+# Redis 백엔드 (여러 인스턴스 공유)
+# --------------------------------------------------------
+class RedisBackend:
+    """
+    redis-py 호환 client(redis.Redis 또는 fake_redis.FakeRedis)를 받는다.
+
+    윈도우 카운트
+    - 버킷별 키에 INCRBY (원자적), 윈도우 카운트 = 현재 윈도우 버킷들의 합
+    - "clear"는 키를 지우는 대신 리셋 마커("버킷번호:그 시점 값")를 남긴다.
+      마커 이후 증가분만 센다.
+    - threshold를 넘긴 인스턴스들은 "현재 마커" 기준 발사 키를 SET NX로 다툰다(리더 선출).
+      이긴 1곳만 발사하고 새 마커를 기록한다 -> 트리거당 전송 1회
+
+    왕복 횟수
+    - 메시지 1건: hit 난 룰 전부를 파이프라인 1번으로 처리 (+ mute 조회)
+    - threshold를 넘은 경우에만 1번 더 (발사 키 / 마커)
+
+    발언 제한
+    - 버킷마다 토큰 키 burst개에 SET NX EX(per_seconds) - 비어 있는 키를 잡으면 토큰 1개 사용.
+      토큰은 쓰고 나서 per_seconds 뒤에 다시 찬다 (메모리 버킷과 같은 burst / 평균 비율).
+    - 모든 단계를 파이프라인 1번에 시도하고, 조건을 못 채우면 잡은 키를 되돌린다.
+    """
+
+    def __init__(self, client, window_seconds: float, bucket_seconds: float, prefix: str = "errbot"):
+        self.client = client
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.prefix = prefix
+        self.muted = False  # 마지막으로 본 공유 mute 값 (record_hits/acquire_slot 때 갱신)
+
+        self._size = int(math.ceil(window_seconds / bucket_seconds)) + 1
+        self._ttl = int(math.ceil(window_seconds + 2 * bucket_seconds))
+        self._keys = set()
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._seq = itertools.count()
+
+    # ----------------------------------------------------
+    # key helpers
+    # ----------------------------------------------------
+    def _k(self, *parts) -> str:
+        return ":".join((self.prefix,) + tuple(str(p) for p in parts))
+
+    def _bucket_key(self, key, idx: int) -> str:
+        return self._k("w", key[0], key[1], idx)
+
+    def _marker_key(self, key) -> str:
+        return self._k("r", key[0], key[1])
+
+    def _muted_key(self) -> str:
+        return self._k("muted")
+
+    def _token_key(self, bucket_id: str, i: int) -> str:
+        return self._k("t", bucket_id, i)
+
+    @staticmethod
+    def _decode(value):
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            return value.decode()
+        return str(value)
+
+    def _window_count(self, idx: int, values, marker):
+        """
+        values: idx-size+1 .. idx 버킷 값 (오래된 것부터)
+        marker: "버킷번호:값" 또는 None
+        반환: (윈도우 카운트, 현재 버킷 값)
+        """
+        ints = [int(v) if v is not None else 0 for v in values]
+        first = idx - self._size + 1
+        if marker is None:
+            return sum(ints), ints[-1]
+
+        m_idx_s, _, m_val_s = marker.partition(":")
+        m_idx, m_val = int(m_idx_s), int(m_val_s or 0)
+        total = 0
+        for offset, v in enumerate(ints):
+            j = first + offset
+            if j > m_idx:
+                total += v
+            elif j == m_idx:
+                total += max(0, v - m_val)
+        return total, ints[-1]
+
+    # ----------------------------------------------------
+    # 윈도우 카운트
+    # ----------------------------------------------------
+    def register_keys(self, keys):
+        self._keys.update(keys)
+
+    def record_hits(self, now_ts: float, items):
+        idx = int(now_ts // self.bucket_seconds)
+        window_idx = range(idx - self._size + 1, idx + 1)
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(self._muted_key())
+        for key, hits, _threshold in items:
+            bucket_key = self._bucket_key(key, idx)
+            pipe.incrby(bucket_key, hits)
+            pipe.expire(bucket_key, self._ttl)
+            pipe.mget([self._bucket_key(key, j) for j in window_idx])
+            pipe.get(self._marker_key(key))
+        replies = pipe.execute()
+
+        self.muted = self._decode(replies[0]) == "1"
+        if self.muted:
+            return [False] * len(items)
+
+        crossed = []  # (item 위치, key, marker, 내 INCRBY 직후 버킷 값)
+        for n, (key, _hits, threshold) in enumerate(items):
+            base = 1 + 4 * n
+            own_value = int(replies[base])
+            values, marker = list(replies[base + 2]), self._decode(replies[base + 3])
+            # 현재 버킷은 MGET 값 대신 "내 INCRBY 직후 값"으로 센다 (다른 인스턴스의 이후 증가분은
+            # 새 마커 뒤로 넘어가 다음 윈도우에 잡힌다)
+            values[-1] = own_value
+            count, current = self._window_count(idx, values, marker)
+            if count >= threshold:
+                crossed.append((n, key, marker, current))
+
+        fired = [False] * len(items)
+        if not crossed:
+            return fired
+
+        # 같은 마커 기준으로 넘긴 인스턴스끼리 발사 키를 다툼 (1곳만 성공)
+        pipe = self.client.pipeline(transaction=False)
+        for _n, key, marker, _current in crossed:
+            pipe.set(self._k("f", key[0], key[1], marker or "0"), self._owner, nx=True, ex=self._ttl)
+        won = pipe.execute()
+
+        pipe = self.client.pipeline(transaction=False)
+        for (n, key, _marker, current), ok in zip(crossed, won):
+            if ok:
+                fired[n] = True
+                pipe.set(self._marker_key(key), f"{idx}:{current}", ex=self._ttl)
+        pipe.execute()
+        return fired
+
+    def record_hits_traced(self, now_ts: float, items, trace):
+        return self.record_hits(now_ts, items)  # 로컬 락 없음 (Redis 왕복은 window 단계에 포함)
+
+    def window_count(self, key, now_ts: float) -> int:
+        idx = int(now_ts // self.bucket_seconds)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.mget([self._bucket_key(key, j) for j in range(idx - self._size + 1, idx + 1)])
+        pipe.get(self._marker_key(key))
+        values, marker = pipe.execute()
+        return self._window_count(idx, values, self._decode(marker))[0]
+
+    def reset(self, now_ts: float = None, keys=None):
+        """
+        키(기본: 전체)에 "지금" 마커를 남겨 그 이전 카운트를 무효화
+        """
+        now_ts = time.time() if now_ts is None else now_ts
+        idx = int(now_ts // self.bucket_seconds)
+        keys = sorted(self._keys if keys is None else keys)
+
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(self._bucket_key(key, idx))
+        currents = pipe.execute()
+
+        pipe = self.client.pipeline(transaction=False)
+        for key, current in zip(keys, currents):
+            pipe.set(self._marker_key(key), f"{idx}:{int(current or 0)}", ex=self._ttl)
+        pipe.execute()
+
+    # ----------------------------------------------------
+    # 발언 제한
+    # ----------------------------------------------------
+    def acquire_slot(self, now_ts: float, limits, destinations=()):
+        """
+        단계마다 토큰 키 0..burst-1을 앞에서부터 SET NX로 시도해 처음 잡은 1개에서 멈춘다.
+        라운드 r에는 아직 못 잡은 단계들의 r번째 키만 한 파이프라인으로 (왕복 <= 최대 burst).
+        다른 인스턴스가 보는 버킷에는 이 트리거가 실제로 쓸 토큰 1개만 잡힌다.
+        """
+        value = f"{self._owner}:{now_ts}:{next(self._seq)}"
+        levels = list(limits) + list(destinations)
+        taken = [None] * len(levels)  # 단계별로 잡은 토큰 키
+        pending = list(range(len(levels)))
+
+        first = True
+        for i in range(max((limit.burst for _b, limit in levels), default=0)):
+            tries = [n for n in pending if i < levels[n][1].burst]
+            pipe = self.client.pipeline(transaction=False)
+            if first:
+                pipe.get(self._muted_key())
+            for n in tries:
+                bucket_id, limit = levels[n]
+                pipe.set(self._token_key(bucket_id, i), value, nx=True, ex=int(math.ceil(limit.per_seconds)))
+            replies = pipe.execute()
+            if first:
+                self.muted = self._decode(replies[0]) == "1"
+                replies = replies[1:]
+                first = False
+            for n, ok in zip(tries, replies):
+                if ok:
+                    taken[n] = self._token_key(levels[n][0], i)
+            pending = [n for n in pending if taken[n] is None]
+            # 필수 단계 하나가 키를 다 써 버렸으면 더 볼 필요 없음
+            if self.muted or any(n < len(limits) and i + 1 >= levels[n][1].burst for n in pending):
+                break
+        if first:
+            self.muted = self._decode(self.client.get(self._muted_key())) == "1"
+
+        granted = tuple(key is not None for key in taken[len(limits):])
+        ok = (not self.muted and all(key is not None for key in taken[:len(limits)])
+              and (not destinations or any(granted)))
+        parts = tuple((key, value) for key in taken if key is not None)
+        if not ok:
+            if parts:
+                self.release_slot(Slot(parts, ()))
+            return None
+        return Slot(parts, granted)
+
+    def release_slot(self, slot):
+        keys = [key for key, _value in slot.parts]
+        current = self.client.mget(keys)
+        mine = [key for (key, value), cur in zip(slot.parts, current) if self._decode(cur) == value]
+        if mine:
+            self.client.delete(*mine)
+
+    def reset_limits(self, limits=()):
+        """
+        limits: [(bucket id, RateLimit), ...] - Redis에는 키 목록이 없으므로 호출 쪽이 알려 준다
+        """
+        keys = [self._token_key(bucket_id, i) for bucket_id, limit in limits for i in range(limit.burst)]
+        if keys:
+            self.client.delete(*keys)
+
+    # ----------------------------------------------------
+    # mute
+    # ----------------------------------------------------
+    def set_muted(self, muted: bool):
+        self.client.set(self._muted_key(), "1" if muted else "0")
+        self.muted = muted
+
+    # ----------------------------------------------------
+    # 영속화: Redis 자체가 공유 저장소라 state_store는 쓰지 않음
+    # ----------------------------------------------------
+    def export_windows(self, dirty_only: bool = True):
+        return []
+
+    def import_windows(self, rows) -> int:
+        return 0
+
+    def merge_windows(self, rows) -> int:
+        return 0  # 윈도우가 이미 Redis에 공유돼 있음
+
+    def export_limits(self) -> dict:
+        return {}
+
+    def import_limits(self, buckets: dict, merge: bool = False):
+        pass  # 발언 제한도 Redis에 공유돼 있음
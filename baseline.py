@@ -0,0 +1,129 @@
+"""
+적응형 threshold (EWMA 기준선)
+
+고정 threshold 대신 룰별로 "평소 윈도우당 hit 수"의 지수 가중 평균/분산을 학습해
+현재 윈도우 카운트가 평균 + k·표준편차를 넘을 때 발사한다.
+
+- 구간(interval) = 윈도우 길이. 구간 하나의 hit 합이 샘플 1개 (윈도우 카운트와 같은 단위)
+- hit가 없던 구간은 0 샘플로 반영 (다음 hit 때 한꺼번에, 최대 MAX_GAP_SAMPLES개)
+- 상태는 (channel, rule)당 float 몇 개 (EwmaBaseline.__slots__)
+- 샘플이 warmup개 모이기 전에는 룰의 고정 threshold, 이후에는 max(floor, ceil(mean + k·std))
+
+기준선은 이 프로세스가 받은 hit로 학습한다. RedisBackend로 여러 인스턴스가 이벤트를 나눠 받으면
+인스턴스마다 자기 몫만 보므로 기준선이 낮게 잡힌다 (적응형 룰은 단일 인스턴스 구성 권장).
+
+룰 설정:
+    "adaptive": {"k": 4, "floor": 3, "warmup": 30, "alpha": 0.05}   # 전부 선택, true면 기본값
+"""
+import math
+import threading
+from collections import namedtuple
+
+# 룰의 adaptive 설정 (ruleset에서 검증 후 기본값을 채워 만든다)
+AdaptiveSpec = namedtuple("AdaptiveSpec", ["k", "floor", "warmup", "alpha"])
+
+# 오래 조용했던 룰: 0 샘플을 이만큼만 반영 (alpha=0.05면 (0.95)^200 ≈ 0 이라 그 이상은 의미 없음)
+MAX_GAP_SAMPLES = 200
+
+
+class EwmaBaseline:
+    __slots__ = ("mean", "var", "samples", "interval_idx", "current")
+
+    def __init__(self, interval_idx: int, mean: float = 0.0, var: float = 0.0, samples: int = 0,
+                 current: float = 0.0):
+        self.mean = mean
+        self.var = var
+        self.samples = samples
+        self.interval_idx = interval_idx
+        self.current = current
+
+    def _push(self, x: float, alpha: float):
+        # 지수 가중 평균/분산 (Finch, "Incremental calculation of weighted mean and variance")
+        diff = x - self.mean
+        incr = alpha * diff
+        self.mean += incr
+        self.var = (1.0 - alpha) * (self.var + diff * incr)
+        self.samples += 1
+
+    def observe(self, interval_idx: int, hits: int, alpha: float):
+        if interval_idx > self.interval_idx:
+            self._push(self.current, alpha)
+            for _ in range(min(interval_idx - self.interval_idx - 1, MAX_GAP_SAMPLES)):
+                self._push(0.0, alpha)
+            self.interval_idx = interval_idx
+            self.current = 0.0
+        self.current += hits
+
+    def threshold(self, spec: AdaptiveSpec, static_threshold: int) -> int:
+        if self.samples < spec.warmup:
+            return static_threshold
+        return max(spec.floor, math.ceil(self.mean + spec.k * math.sqrt(self.var)))
+
+    def to_state(self):
+        return [self.mean, self.var, self.samples, self.interval_idx, self.current]
+
+
+class AdaptiveThresholds:
+    """
+    (channel, rule) -> EwmaBaseline. Detector가 hit 난 adaptive 룰마다 threshold_for()로 유효 threshold를 구한다.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._baselines = {}
+
+    def threshold_for(self, key, spec: AdaptiveSpec, static_threshold: int, hits: int, now_ts: float) -> int:
+        idx = int(now_ts // self.interval_seconds)
+        with self._lock:
+            baseline = self._baselines.get(key)
+            if baseline is None:
+                baseline = self._baselines[key] = EwmaBaseline(idx)
+            baseline.observe(idx, hits, spec.alpha)
+            return baseline.threshold(spec, static_threshold)
+
+    def current(self, key, spec: AdaptiveSpec, static_threshold: int) -> int:
+        """
+        지금 기준 유효 threshold (게이지용, 학습에는 반영하지 않음)
+        """
+        baseline = self._baselines.get(key)
+        return static_threshold if baseline is None else baseline.threshold(spec, static_threshold)
+
+    def reset(self, keys=None):
+        with self._lock:
+            if keys is None:
+                self._baselines.clear()
+            else:
+                for key in keys:
+                    self._baselines.pop(tuple(key), None)
+
+    def export(self):
+        with self._lock:
+            return [[channel, name, *b.to_state()] for (channel, name), b in self._baselines.items()]
+
+    def load(self, rows, merge: bool = False) -> int:
+        """
+        export 형식을 복원. merge=True면 지금 기준선과 합친다 (무중단 재시작 인계, 윈도우 merge와 같은 방식):
+        - 현재 구간 hit 합(current)은 같은 구간이면 더한다 (두 프로세스가 나눠 받은 hit)
+        - 평균/분산/샘플 수는 샘플이 많은 쪽 (오래 학습한 이전 프로세스)
+        """
+        baselines = {}
+        for channel, name, mean, var, samples, interval_idx, current in rows:
+            baselines[(channel, name)] = EwmaBaseline(int(interval_idx), float(mean), float(var), int(samples),
+                                                      float(current))
+        with self._lock:
+            if merge:
+                for key, theirs in baselines.items():
+                    mine = self._baselines.get(key)
+                    if mine is not None:
+                        baselines[key] = _merge_baselines(mine, theirs)
+            self._baselines.update(baselines)
+        return len(baselines)
+
+
+def _merge_baselines(a: EwmaBaseline, b: EwmaBaseline) -> EwmaBaseline:
+    # 더 앞선 구간의 current만 남김 (지난 구간 몫은 인계가 구간 경계에 걸린 경우뿐이라 버림)
+    base = a if a.samples >= b.samples else b
+    idx = max(a.interval_idx, b.interval_idx)
+    current = sum(x.current for x in (a, b) if x.interval_idx == idx)
+    return EwmaBaseline(idx, base.mean, base.var, base.samples, current)
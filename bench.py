@@ -0,0 +1,1159 @@
+"""
+마이크로 벤치마크
+
+사용법:
+    python bench.py            # 전체
+    python bench.py matcher    # 특정 항목만
+
+Slack 토큰 없이 돌 수 있도록 app.py는 import하지 않는다.
+"""
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from collections import Counter, deque
+
+import config
+from backend import MemoryBackend, RedisBackend
+from detector import Detector, build_channel_index
+from extract import event_text
+from fake_redis import FakeRedis
+from matcher import KeywordMatcher, keyword_hits_in_text
+from rate_limit import GLOBAL_BUCKET, RateLimit, TokenBuckets
+from ruleset import compile_rules, default_vars, dump_rules, load_rules_file
+from state_store import StateStore
+from window import SlidingWindowCounter
+
+# SVC_WATCHTOWER_CH에 걸린 키워드 (app.py RULES 기준)
+WATCHTOWER_KEYWORDS = [
+    "RTZR_API",
+    "PET_API",
+    "builtin.one",
+    "Perplexity",
+    "Claude",
+    "MODEL_LABEL: GPT",
+    "Gemini",
+    "Liner",
+    "A.X",
+    "diagramCreate",
+]
+
+_TRACE_WORDS = [
+    "Traceback", "(most", "recent", "call", "last):", "File", '"/srv/app/handler.py",',
+    "line", "in", "invoke", "requests.exceptions.ReadTimeout:", "HTTPSConnectionPool",
+    "status=502", "request_id=9f1c2e", "MODEL_LABEL: GPT", "Claude", "upstream", "에러",
+    "응답", "지연", "RTZR_API", "timeout", "retry", "\n",
+]
+
+
+def make_long_message(size: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size:
+        w = rnd.choice(_TRACE_WORDS)
+        parts.append(w)
+        total += len(w) + 1
+    return " ".join(parts)[:size]
+
+
+def _report(name: str, fn, number: int):
+    best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"  {name:<28} {best * 1e6:10.1f} us/msg")
+    return best
+
+
+def bench_matcher():
+    print("[matcher] 채널 룰 키워드 hit 계산 (old: 룰별 lower+count, new: KeywordMatcher)")
+    matcher = KeywordMatcher(WATCHTOWER_KEYWORDS)
+
+    for size in (200, 2_000, 20_000):
+        text = make_long_message(size, seed=size)
+
+        expected = [keyword_hits_in_text(kw, text) for kw in WATCHTOWER_KEYWORDS]
+        assert matcher.counts(text) == expected, "KeywordMatcher 결과가 기존 카운트와 다름"
+
+        number = max(10, 200_000 // size)
+        print(f" size={size}B")
+        old = _report("old", lambda: [keyword_hits_in_text(kw, text) for kw in WATCHTOWER_KEYWORDS], number)
+        new = _report("new", lambda: matcher.counts(text), number)
+        print(f"  {'speedup':<28} {old / new:10.2f}x")
+
+
+def _simulate_triggers(stream, threshold, window_seconds, make_counter):
+    """
+    (ts, hits) 스트림을 process_message와 같은 방식으로 돌려 트리거 시각 목록을 반환
+    make_counter=None이면 기존 deque 방식
+    """
+    fired = []
+    if make_counter is None:
+        dq = deque()
+        for ts, hits in stream:
+            while dq and ts - dq[0] > window_seconds:
+                dq.popleft()
+            for _ in range(hits):
+                dq.append(ts)
+            if len(dq) >= threshold:
+                fired.append(ts)
+                dq.clear()
+    else:
+        counter = make_counter()
+        for ts, hits in stream:
+            counter.prune(ts)
+            counter.add(ts, hits)
+            if counter.count() >= threshold:
+                fired.append(ts)
+                counter.clear()
+    return fired
+
+
+def bench_window():
+    window_seconds = 240
+    print("[window] (channel, rule) 윈도우 카운터 (old: deque[timestamp], new: SlidingWindowCounter 1s 버킷)")
+
+    hits = 500
+    dq = deque()
+    counter = SlidingWindowCounter(window_seconds, 1)
+
+    def old_add():
+        for _ in range(hits):
+            dq.append(0.0)
+        dq.clear()
+
+    def new_add():
+        counter.add(0.0, hits)
+        counter.count()
+
+    print(f" add {hits} hits from one message")
+    old = _report("old", old_add, 2_000)
+    new = _report("new", new_add, 2_000)
+    print(f"  {'speedup':<28} {old / new:10.2f}x")
+
+    # 알림 타이밍 비교: 윈도우 경계가 버킷 단위라 트리거 수가 약간 다를 수 있다
+    rnd = random.Random(4)
+    ts = 1_700_000_000.0
+    stream = []
+    for _ in range(20_000):
+        ts += rnd.expovariate(1 / 15.0)
+        stream.append((ts, rnd.choice((1, 1, 1, 2, 3))))
+
+    for threshold in (6, 12, 20):
+        old_fired = _simulate_triggers(stream, threshold, window_seconds, None)
+        new_fired = _simulate_triggers(stream, threshold, window_seconds,
+                                       lambda: SlidingWindowCounter(window_seconds, 1))
+        print(f" threshold={threshold:<3} triggers old={len(old_fired)} new={len(new_fired)}")
+
+
+def bench_stress(threads: int = 16, events_per_thread: int = 5_000):
+    """
+    여러 스레드에서 같은 룰로 동시에 이벤트를 밀어 넣고 트리거 수가 정확한지 확인
+    (윈도우 만료가 없도록 시계를 고정: 기대 트리거 = 총 hit // threshold)
+    """
+    print(f"[stress] threads={threads} events/thread={events_per_thread}")
+    rules = [
+        {"name": "A", "channel": "C1", "keyword": "alpha", "threshold": 6, "notify": []},
+        {"name": "B", "channel": "C1", "keyword": "beta", "threshold": 7, "notify": []},
+        {"name": "C", "channel": "C2", "keyword": "alpha", "threshold": 20, "notify": []},
+    ]
+    fired = Counter()
+    fired_lock = threading.Lock()
+
+    def on_trigger(rule, event):
+        with fired_lock:
+            fired[(rule["channel"], rule["name"])] += 1
+
+    detector = Detector(build_channel_index(rules), on_trigger, MemoryBackend(240, 1),
+                        clock=lambda: 1_700_000_000.0)
+    events = [
+        {"channel": "C1", "text": "alpha beta"},
+        {"channel": "C1", "text": "alpha"},
+        {"channel": "C2", "text": "alpha"},
+    ]
+    start = threading.Barrier(threads)
+
+    def worker():
+        start.wait()
+        for i in range(events_per_thread):
+            detector.process(events[i % len(events)])
+
+    ts = [threading.Thread(target=worker) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    total = threads * events_per_thread
+    per_event = Counter()
+    for i in range(total):
+        ev = events[(i % events_per_thread) % len(events)]
+        for rule in rules:
+            if rule["channel"] == ev["channel"] and rule["keyword"] in ev["text"]:
+                per_event[(rule["channel"], rule["name"])] += 1
+
+    ok = True
+    for rule in rules:
+        key = (rule["channel"], rule["name"])
+        expected = per_event[key] // rule["threshold"]
+        leftover = detector.window_count(*key)
+        match = fired[key] == expected and fired[key] * rule["threshold"] + leftover == per_event[key]
+        ok &= match
+        print(f"  {key!s:<14} hits={per_event[key]:<7} triggers={fired[key]:<6} expected={expected:<6} "
+              f"{'OK' if match else 'MISMATCH'}")
+    print(f"  {'throughput':<28} {total / elapsed:10.0f} events/s")
+    if not ok:
+        raise SystemExit("stress: trigger count mismatch")
+
+
+def bench_reload(threads: int = 8, events_per_thread: int = 20_000, swaps: int = 200):
+    """
+    이벤트 처리 중에 룰셋을 계속 교체(threshold만 변경)해도 카운트를 잃지 않는지,
+    교체에 걸리는 시간과 교체 중 처리량
+    """
+    print(f"[reload] threads={threads} events/thread={events_per_thread} swaps={swaps}")
+
+    def make_rules(threshold):
+        return compile_rules([
+            {"name": "A", "channel": "CBENCH1", "keyword": "alpha", "threshold": threshold,
+             "notify": [{"channel": "CBENCH1", "text": "a"}]},
+            {"name": "B", "channel": "CBENCH1", "keyword": "beta", "threshold": threshold,
+             "notify": [{"channel": "CBENCH1", "text": "b"}]},
+        ], variables={})
+
+    detector = Detector(make_rules(10**9).channel_index, lambda rule, event: None, MemoryBackend(240, 1),
+                        clock=lambda: 1_700_000_000.0)
+    event = {"channel": "CBENCH1", "text": "alpha beta"}
+    start = threading.Barrier(threads + 1)
+
+    def worker():
+        start.wait()
+        for _ in range(events_per_thread):
+            detector.process(event)
+
+    ts = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in ts:
+        t.start()
+    start.wait()
+    t_start = time.perf_counter()
+    swap_times = []
+    for i in range(swaps):
+        ruleset = make_rules(10**9 + i)
+        t0 = time.perf_counter()
+        detector.swap(ruleset.channel_index)
+        swap_times.append(time.perf_counter() - t0)
+        time.sleep(0.001)
+    for t in ts:
+        t.join()
+    elapsed = time.perf_counter() - t_start
+
+    total = threads * events_per_thread
+    ok = detector.window_count("CBENCH1", "A") == total and detector.window_count("CBENCH1", "B") == total
+    swap_times.sort()
+    print(f"  {'counts kept across swaps':<28} {'OK' if ok else 'MISMATCH'} (A={detector.window_count('CBENCH1', 'A')} "
+          f"expected={total})")
+    print(f"  {'swap p50 / max':<28} {swap_times[len(swap_times) // 2] * 1e3:7.3f} / {swap_times[-1] * 1e3:.3f} ms")
+    print(f"  {'throughput while swapping':<28} {total / elapsed:10.0f} events/s")
+    if not ok:
+        raise SystemExit("reload: window counts lost during swap")
+
+    # --dump -> 파일 -> 다시 로드: 같은 version (adaptive / pattern / field 룰 포함)
+    raw = [dict(rule) for rule in config.RULES]
+    raw.append({"name": "DUMP_ADAPTIVE", "channel": "CBENCH1", "keyword": "gamma", "threshold": 5,
+                "adaptive": {"k": 3}, "rate_limit": [2, 60], "notify": [{"channel": "CBENCH1", "text": "{x} {{y}}"}]})
+    raw.append({"name": "DUMP_PATTERN", "channel": "CBENCH1", "keyword": "status=5", "pattern": r"status=5\d\d",
+                "threshold": 2, "notify": [{"channel": "CBENCH1", "text": "p"}]})
+    raw.append({"name": "DUMP_FIELD", "channel": "CBENCH1", "field": "latency_ms > 3000", "threshold": 2,
+                "notify": [{"channel": "CBENCH1", "text": "f"}]})
+    ruleset = compile_rules(raw, variables=dict(default_vars(), x="X"))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rules.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dump_rules(ruleset), f, ensure_ascii=False)
+        reloaded = load_rules_file(path)
+    same = reloaded.version == ruleset.version and reloaded.rules == ruleset.rules
+    print(f"  {'dump -> load round trip':<28} {'OK' if same else 'MISMATCH'} ({len(ruleset.rules)} rules, "
+          f"version={ruleset.version})")
+    if not same:
+        raise SystemExit("reload: dumped rules do not load back to the same ruleset")
+
+
+def bench_state(keys: int = 5_000):
+    """
+    keys개 (channel, rule) 윈도우를 SQLite에 저장했다가 새 Detector로 복원하는 시간
+    """
+    print(f"[state] windows={keys}")
+    rules = [
+        {"name": f"R{i}", "channel": f"C{i % 50}", "keyword": f"kw{i}", "threshold": 10**9, "notify": []}
+        for i in range(keys)
+    ]
+    index = build_channel_index(rules)
+    now = 1_700_000_000.0
+    src_backend = MemoryBackend(240, 1)
+    src = Detector(index, lambda rule, event: None, src_backend, clock=lambda: now)
+    for i in range(keys):
+        src.process({"channel": f"C{i % 50}", "text": f"kw{i}"})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = StateStore(os.path.join(tmp, "state.db"))
+        t0 = time.perf_counter()
+        store.save(src_backend.export_windows(), {"muted": False})
+        save_ms = (time.perf_counter() - t0) * 1000.0
+
+        dst_backend = MemoryBackend(240, 1)
+        dst = Detector(index, lambda rule, event: None, dst_backend, clock=lambda: now)
+        t0 = time.perf_counter()
+        windows, _meta = store.load()
+        restored = dst_backend.import_windows(windows)
+        load_ms = (time.perf_counter() - t0) * 1000.0
+        store.close()
+
+    assert restored == keys
+    assert dst.window_count("C0", "R0", now) == 1
+    print(f"  {'save (full snapshot)':<28} {save_ms:10.1f} ms")
+    print(f"  {'load + restore':<28} {load_ms:10.1f} ms")
+
+
+def bench_replicas(replicas: int = 3, events: int = 3_000):
+    """
+    RedisBackend 인스턴스 여러 개가 FakeRedis 하나를 공유할 때
+    - 트래픽을 나눠 받아도 트리거 수가 단일 인스턴스와 같은지 (중복 발사 없음)
+    - 발언 제한(룰/수신 채널 토큰 버킷)이 인스턴스 합산으로 지켜지는지
+    """
+    print(f"[replicas] replicas={replicas} events={events} (FakeRedis 공유)")
+    rules = [{"name": "A", "channel": "C1", "keyword": "alpha", "threshold": 6, "notify": []}]
+    index = build_channel_index(rules)
+    clock = [1_700_000_000.0]
+    redis = FakeRedis(clock=lambda: clock[0])
+
+    fired = Counter()
+    lock = threading.Lock()
+    detectors = []
+    for i in range(replicas):
+        def on_trigger(rule, event, i=i):
+            with lock:
+                fired[i] += 1
+        backend = RedisBackend(redis, 240, 10)
+        detectors.append(Detector(index, on_trigger, backend, clock=lambda: clock[0]))
+
+    event = {"channel": "C1", "text": "alpha"}
+    t0 = time.perf_counter()
+    for n in range(events):
+        detectors[n % replicas].process(event)
+    elapsed = time.perf_counter() - t0
+
+    total = sum(fired.values())
+    expected = events // 6
+    print(f"  triggers={total} expected={expected} per-replica={dict(fired)} "
+          f"{'OK' if total == expected else 'MISMATCH'}")
+    print(f"  {'detect latency':<28} {elapsed / events * 1e6:10.1f} us/event (in-process fake, no network)")
+
+    limits = (("rule:C1:A", RateLimit(2, 300)), (GLOBAL_BUCKET, RateLimit(3, 300)))
+    destinations = (("dest:CA", RateLimit(1, 300)), ("dest:CB", RateLimit(4, 300)))
+    slots = [d.backend.acquire_slot(clock[0], limits, destinations) for d in detectors for _ in range(2)]
+    granted = [s for s in slots if s is not None]
+    to_ca = sum(1 for s in granted if s.granted[0])
+    ok = len(granted) == 2 and to_ca == 1
+    print(f"  slots granted={len(granted)} (rule burst=2) to dest:CA={to_ca} (burst=1) {'OK' if ok else 'MISMATCH'}")
+
+    # 동시 획득: 인스턴스들이 한꺼번에 잡아도 burst만큼 정확히 나가고, 한 트리거가 토큰을 1개 넘게
+    # 쥐지 않아야 함 (잠깐이라도 여러 개를 잡으면 그 사이 다른 인스턴스가 빈 버킷으로 보고 거절됨)
+    burst, racers = 4, 16
+    barrier = threading.Barrier(racers)
+    race, grabs = [], Counter()
+    plain_set = redis.set
+
+    def counting_set(key, value, nx=False, ex=None):
+        ok = plain_set(key, value, nx=nx, ex=ex)
+        if ok and "RACE" in key:
+            with lock:
+                grabs[threading.get_ident()] += 1
+        return ok
+
+    def racer(n):
+        barrier.wait()
+        slot = detectors[n % replicas].backend.acquire_slot(clock[0], (("rule:C1:RACE", RateLimit(burst, 300)),))
+        with lock:
+            race.append(slot is not None)
+
+    redis.set = counting_set
+    threads = [threading.Thread(target=racer, args=(n,)) for n in range(racers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    redis.set = plain_set
+    raced, most = sum(race), max(grabs.values(), default=0)
+    print(f"  concurrent acquire: {racers} racers on burst={burst} granted={raced} "
+          f"max tokens held per trigger={most} {'OK' if raced == burst and most == 1 else 'MISMATCH'}")
+    ok = ok and raced == burst and most == 1
+    if total != expected or not ok:
+        raise SystemExit("replicas: mismatch")
+
+
+def bench_limiter(noisy_triggers: int = 10_000):
+    """
+    config.RULES + 기본 발언 제한(config.*_RATE_LIMIT)으로
+    TMAP 채널 룰들이 계속 트리거되는 동안에도 RTZR_API 알림이 나가는지 + acquire 비용
+    """
+    from bot import ErrorBot
+
+    print(f"[limiter] noisy triggers={noisy_triggers} rule={config.RULE_RATE_LIMIT} dest={config.DEST_RATE_LIMIT} "
+          f"global={config.GLOBAL_RATE_LIMIT}")
+    ruleset = compile_rules(config.RULES)
+    noisy = [ErrorBot._rule_limits(rule)[:2] for rule in ruleset.rules if rule["channel"] == config.SVC_TMAP_DIV_CH]
+    quiet = next(ErrorBot._rule_limits(rule)[:2] for rule in ruleset.rules if rule["name"] == "RTZR_API")
+    buckets = TokenBuckets()
+    now = 1_700_000_000.0
+
+    t0 = time.perf_counter()
+    noisy_granted = sum(1 for i in range(noisy_triggers)
+                        if buckets.acquire(now + i * 0.01, *noisy[i % len(noisy)]))
+    per_acquire = (time.perf_counter() - t0) / noisy_triggers
+    # RTZR_API는 룰 burst만큼 연속 트리거 -> 전부 나가야 함 (전역이 룰 burst 하나로 바닥나면 안 됨)
+    t = now + noisy_triggers * 0.01
+    quiet_slots = [buckets.acquire(t, *quiet) for _ in range(config.RULE_RATE_LIMIT[0])]
+    ok = all(slot is not None and all(slot.granted) for slot in quiet_slots)
+
+    # 롤백: 전송이 전부 실패하면 같은 토큰을 되돌려 다음 트리거가 쓸 수 있어야 함
+    slot = quiet_slots[-1]
+    rolled_back = slot is not None
+    if rolled_back:
+        before = buckets.export()
+        buckets.release(slot)
+        after = buckets.export()
+        rolled_back = all(after[b][0] >= before[b][0] for b, _limit in slot.parts)
+    print(f"  noisy TMAP rules ({len(noisy)}) granted={noisy_granted} over {noisy_triggers * 0.01:.0f}s")
+    print(f"  RTZR_API after noise        {'OK' if ok else 'STARVED'} "
+          f"granted={[slot.granted if slot else None for slot in quiet_slots]}")
+    print(f"  rollback                    {'OK' if rolled_back else 'MISMATCH'}")
+    print(f"  {'acquire':<28} {per_acquire * 1e6:10.2f} us")
+    if not ok or not rolled_back:
+        raise SystemExit("limiter: RTZR_API starved by noisy rules under the default limits")
+
+
+def _regex_rules(n: int):
+    """
+    룰 n개: 메시지에 없는 리터럴(ERRCODE_xxx)을 keyword로, 그 뒤 숫자를 정규식으로 본다
+    """
+    raw = [{"name": "RTZR_API", "channel": "CBENCH1", "keyword": "RTZR_API", "threshold": 3}]
+    raw += [
+        {"name": f"E{i:03d}", "channel": "CBENCH1", "keyword": f"ERRCODE_{i:03d}",
+         "pattern": rf"ERRCODE_{i:03d}=\d+", "threshold": 3}
+        for i in range(n)
+    ]
+    return compile_rules(raw, source="bench")
+
+
+def bench_regex():
+    """
+    정규식 룰 수가 늘어도 리터럴이 없는 메시지의 비용은 그대로인지 (prefilter vs 정규식 전부 실행)
+    리터럴 확인도 룰 수와 무관해야 함 (키워드가 많으면 KeywordMatcher가 합친 정규식 1패스로)
+    """
+    print("[regex] 2KB 메시지 1건 hit 계산 (all: 정규식 전부 실행, prefilter: keyword 먼저 확인)")
+    text = make_long_message(2_000, seed=14)
+    hit_text = text + " ERRCODE_000=17 errcode_000=9 ERRCODE_000=x"
+
+    def prefiltered(entry, msg):
+        hits = entry.matcher.counts(msg)
+        return [fn(msg) if h and fn is not None else h for h, fn in zip(hits, entry.counters)]
+
+    def unfiltered(entry, msg):
+        hits = entry.matcher.counts(msg)
+        return [fn(msg) if fn is not None else h for h, fn in zip(hits, entry.counters)]
+
+    costs = []
+    for n in (0, 10, 50, 200):
+        entry = build_channel_index(_regex_rules(n).rules)["CBENCH1"]
+        for msg in (text, hit_text):
+            assert prefiltered(entry, msg) == unfiltered(entry, msg), "prefilter 결과가 정규식 전체 실행과 다름"
+        if n:
+            assert prefiltered(entry, hit_text)[1] == 2, "ERRCODE_000 정규식 매치 수가 다름"
+
+        number = 2_000
+        print(f" regex rules={n}")
+        _report("all", lambda: unfiltered(entry, text), number)
+        costs.append(_report("prefilter", lambda: prefiltered(entry, text), number))
+    ratio, flat = costs[-1] / costs[0], costs[-1] / costs[-2]
+    print(f"  {'prefilter 200 vs 0 rules':<28} {ratio:10.2f}x  (200 vs 50: {flat:.2f}x)")
+    if ratio > 8 or flat > 2:
+        raise SystemExit("regex: literal prefilter cost still grows with rule count")
+
+    # 합친 정규식 1패스: 겹치거나 서로 포함된 키워드도 키워드별 count와 같아야 함
+    rnd = random.Random(14)
+    pool = [""]
+    for _ in range(4):
+        pool = [p + ch for p in pool for ch in "ab_"] + pool
+    pool = sorted(set(pool) - {""})
+    for _ in range(2_000):
+        keywords = rnd.sample(pool, rnd.randint(24, 32))  # 서로 다른 키워드 24개 이상 -> 합친 정규식 경로
+        msg = "".join(rnd.choice("abAB_ ") for _ in range(rnd.randint(0, 60)))
+        if KeywordMatcher(keywords).counts(msg) != [keyword_hits_in_text(kw, msg) for kw in keywords]:
+            raise SystemExit(f"regex: combined scan disagrees with per-keyword count {keywords} {msg!r}")
+
+
+def bench_extract():
+    """
+    attachments/blocks 본문 추출: 일반 알림 봇 페이로드 비용 + 거대한 페이로드에서도 상한 안에서 끝나는지
+    """
+    print("[extract] text + attachments + blocks -> 버퍼 1개")
+    max_chars, max_nodes = config.EXTRACT_MAX_CHARS, config.EXTRACT_MAX_NODES
+    alert = {
+        "text": "",
+        "attachments": [{
+            "fallback": "[Triggered] RTZR_API error rate",
+            "title": "[Triggered] RTZR_API error rate",
+            "text": make_long_message(1_500, seed=15),
+            "fields": [{"title": "status", "value": "status=502"}, {"title": "latency_ms", "value": "4200"}],
+        }],
+        "blocks": [
+            {"type": "header", "text": {"type": "plain_text", "text": "Sentry: ReadTimeout"}},
+            {"type": "section", "fields": [{"type": "mrkdwn", "text": "*env*: prod"}]},
+        ],
+    }
+    buf = event_text(alert, max_chars, max_nodes)
+    assert "RTZR_API" in buf and "status=502" in buf and "Sentry" in buf, "attachments/blocks 본문 누락"
+    assert buf.count("[Triggered] RTZR_API error rate") == 1, "fallback/title 중복"
+    _report("alert bot payload", lambda: event_text(alert, max_chars, max_nodes), 20_000)
+
+    plain = {"text": make_long_message(2_000, seed=16)}
+    assert event_text(plain, max_chars, max_nodes) is plain["text"]
+
+    # 메시지 text는 자르지 않음: max_chars 뒤의 keyword도 감지 (과부하 모드만 clip_text로 자름)
+    long_text = {"text": "x" * (max_chars + 5_000) + " RTZR_API"}
+    assert event_text(long_text, max_chars, max_nodes) is long_text["text"], "긴 text가 감지 전에 잘림"
+    buf = event_text(dict(long_text, attachments=[{"text": "e" * (max_chars * 2)}]), max_chars, max_nodes)
+    assert "RTZR_API" in buf and len(buf) <= len(long_text["text"]) + 1 + max_chars, "text 보존 / attachments 상한"
+    assert len(event_text(long_text, 2_000, 50, clip_text=True)) <= 2_000, "clip_text 상한"
+
+    # 같은 조각: 서로 다른 attachment면 각각 센다, 메시지 text의 미러는 한 번만
+    same = "[ERROR] RTZR_API timeout"
+    twice = {"text": "", "attachments": [{"text": same}, {"text": same}]}
+    mirrored = {"text": same, "attachments": [{"text": same}], "blocks": [
+        {"type": "section", "text": {"type": "mrkdwn", "text": same}}]}
+    assert event_text(twice, max_chars, max_nodes).count(same) == 2, "별개 attachment의 같은 에러가 합쳐짐"
+    assert event_text(mirrored, max_chars, max_nodes).count(same) == 1, "text 미러 중복"
+    _report("plain text (fast path)", lambda: event_text(plain, max_chars, max_nodes), 200_000)
+
+    wide = {"text": "x", "attachments": [{"fields": [{"title": f"k{i}", "value": f"v{i}"} for i in range(200_000)]}]}
+    deep = {"text": "x", "blocks": [{"type": "section", "text": {"type": "mrkdwn", "text": "y"}}]}
+    node = deep["blocks"][0]
+    for _ in range(100_000):
+        node["fields"] = [{"type": "context", "elements": []}]
+        node = node["fields"][0]
+    huge = {"text": "", "attachments": [{"text": "e" * 5_000_000}]}
+    for name, event in (("200k fields", wide), ("100k nesting", deep), ("5MB text", huge)):
+        buf = event_text(event, max_chars, max_nodes)
+        assert len(buf) <= len(event["text"]) + 1 + max_chars, f"{name}: budget 초과"
+        _report(name, lambda: event_text(event, max_chars, max_nodes), 20)
+
+
+def bench_adaptive(days: int = 3):
+    """
+    하루 주기로 에러량이 출렁이는 룰: 고정 threshold=20 vs adaptive (config.ADAPTIVE_DEFAULTS)
+    - 밤 장애(평소의 약 10배지만 20 미만)를 잡는지, 피크 시간대 평소 잡음에 울리는지
+    """
+    window = config.WINDOW_SECONDS
+    rnd = random.Random(16)
+    start = 1_700_000_000.0
+    windows = days * 86_400 // window
+    night_incident = range(windows - 300, windows - 297)   # 마지막 날 새벽 12분
+    peak_incident = range(windows - 120, windows - 117)    # 마지막 날 낮 12분
+
+    events = []
+    for w in range(windows):
+        hour = (w * window / 3_600) % 24
+        rate = 1.0 + 14.0 * max(0.0, math.sin((hour - 6) / 24 * 2 * math.pi))   # 새벽 ~1, 낮 피크 ~15
+        if w in night_incident:
+            rate = 10.0
+        elif w in peak_incident:
+            rate = 60.0
+        n = sum(1 for _ in range(int(rate * 4)) if rnd.random() < 0.25)        # 평균 rate 근사 (이항)
+        events.extend(start + w * window + rnd.random() * window for _ in range(n))
+    events.sort()
+
+    def run(rule):
+        clock = [start]
+        fired_windows = set()
+        detector = Detector(build_channel_index(compile_rules([rule], source="bench").rules),
+                            lambda r, e: fired_windows.add(int((clock[0] - start) // window)),
+                            MemoryBackend(window, 1), clock=lambda: clock[0])
+        event = {"channel": "CBENCH1", "text": "Perplexity"}
+        t0 = time.perf_counter()
+        for ts in events:
+            clock[0] = ts
+            detector.process(event)
+        per_event = (time.perf_counter() - t0) / len(events)
+        incident = set(night_incident) | set(peak_incident)
+        return (fired_windows & set(night_incident), fired_windows & set(peak_incident),
+                len(fired_windows - incident), per_event, detector)
+
+    base = {"name": "PERPLEXITY", "channel": "CBENCH1", "keyword": "Perplexity", "threshold": 20}
+    print(f"[adaptive] {days} days, {len(events)} events, window={window}s")
+    for label, rule in (("static threshold=20", base), ("adaptive (defaults, k=4)", dict(base, adaptive=True))):
+        night, peak, noise, per_event, detector = run(rule)
+        print(f"  {label:<28} night incident={'HIT' if night else 'miss':<4} peak incident={'HIT' if peak else 'miss':<4} "
+              f"alerts outside incidents={noise:<4} {per_event * 1e6:6.2f} us/event")
+    state = detector.adaptive.export()[0]
+    print(f"  baseline state per rule      {state[2:]} (mean, var, samples, interval, current)")
+    if not night or not peak:
+        raise SystemExit("adaptive: incident missed")
+
+
+def bench_runtime(slack_latency_ms: float = 50.0):
+    """
+    replay 시나리오: app.py(스레드) vs async_app.py(asyncio) 런타임 (가짜 Slack 지연 포함)
+    """
+    import replay  # replay가 bench를 import하므로 여기서
+
+    print(f"[runtime] replay scenarios, fake Slack latency={slack_latency_ms:.0f}ms")
+    for name, make_events in sorted(replay.SCENARIOS.items()):
+        bodies = make_events()
+        for runtime in ("threaded", "async"):
+            result = replay.replay(bodies, runtime=runtime, slack_latency_seconds=slack_latency_ms / 1000.0)
+            lat = result["latency_us"]
+            print(f"  {name:<14} {runtime:<9} {result['events_per_s']:9.0f} ev/s  p99={lat['p99']:8.1f}us "
+                  f"max={lat['max']:9.1f}us  alerts={len(result['alerts']):<3} delivered={result['delivered_s']:.2f}s")
+
+
+def bench_handoff(events: int = 60):
+    """
+    무중단 재시작: 이전 봇(owner)과 새 봇(successor)이 상태 DB/handoff 파일을 공유할 때
+    - 겹침 구간에 양쪽으로 나뉘어 들어온 이벤트가 인수 후 하나의 윈도우로 합쳐지는지
+    - Slack 재전송이 반대쪽 연결로 가도 한 번만 세는지
+    - 인계 후 발언 제한 토큰은 이전 프로세스가 쓴 만큼 줄어 있고, 적응형 기준선의 현재 구간 hit도 합쳐지는지
+    """
+    import replay  # replay가 bench를 import하므로 여기서
+    from bot import ErrorBot
+    from runtime import build_handoff, prepare_state
+    from state_store import StateSnapshotter
+
+    rules = [{"name": "BOOM", "channel": "CBENCH1", "keyword": "boom", "threshold": 10**9, "notify": []},
+             {"name": "BOOM_EWMA", "channel": "CBENCH1", "keyword": "boom", "threshold": 10**9, "notify": [],
+              "adaptive": {"warmup": 10**6}}]
+    glob = ((GLOBAL_BUCKET, RateLimit(*config.GLOBAL_RATE_LIMIT)),)
+    clock = replay.ReplayClock(1_700_000_000.0)
+    bodies = [replay._event(n, clock() + n, "CBENCH1", "boom") for n in range(events)]
+    split = events // 3
+
+    def make_bot():
+        bot = ErrorBot(replay.FakeSlackClient(clock), rules, MemoryBackend(config.WINDOW_SECONDS, 1),
+                       clock=clock, alert_workers=0, digest_flush_seconds=0, incident_groups=[])
+        bot.init_identity()
+        bot.start()
+        return bot
+
+    def send(bot, body):
+        clock.now = max(clock.now, float(body["event"]["ts"]))
+        bot.handle_message(body)
+
+    print(f"[handoff] events={events} (owner {split} -> overlap -> successor)")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = StateStore(os.path.join(tmp, "state.db"))
+        path = os.path.join(tmp, "handoff.db")
+
+        old = make_bot()
+        old_snapshotter = StateSnapshotter(store, old.collect_state, 3_600)
+
+        def old_drain():
+            # 연결이 닫히기 전까지 이전 연결로 들어온 이벤트 + 이미 본 이벤트의 재전송
+            for body in bodies[split:split + 5] + [bodies[3]]:
+                send(old, body)
+            old.stop()
+            old_snapshotter.stop()  # 마지막 저장
+
+        old_handoff = build_handoff(old, store, old_snapshotter, old_drain, path=path, poll_seconds=0.0)
+        prepare_state(old, old_handoff, store, old_snapshotter)
+        for body in bodies[:split]:
+            send(old, body)
+        old.backend.acquire_slot(clock(), glob)  # 이전 프로세스가 알림 1건 분량 토큰을 씀
+
+        new = make_bot()
+        new_snapshotter = StateSnapshotter(store, new.collect_state, 3_600)
+        new_handoff = build_handoff(new, store, new_snapshotter, lambda: None, path=path, poll_seconds=0.0,
+                                    pid=os.getppid())
+        t0 = time.perf_counter()
+        role = prepare_state(new, new_handoff, store, new_snapshotter)
+        for _ in range(3):  # 겹침 구간에 새 프로세스가 3건 (덮어쓰면 이 토큰이 되살아남)
+            new.backend.acquire_slot(clock(), glob)
+        # successor 연결 전: owner는 연결을 닫지 않아야 함 (연결 0개 구간 없음)
+        kept = not old_handoff._poll() and not old_handoff.overlap
+        new_handoff.connected()  # Socket Mode 연결 완료
+        old_handoff._poll()  # owner: successor 연결 발견 -> drain -> release
+        # 겹침 구간: 새 연결로 온 이벤트 + 이전 프로세스가 센 이벤트의 재전송 (이전 연결분/겹침 직전분)
+        for body in bodies[split + 5:2 * split] + [bodies[split + 1], bodies[split - 1]]:
+            send(new, body)
+        new_handoff._poll()  # successor: released -> 상태 합치고 인수
+        takeover_ms = (time.perf_counter() - t0) * 1000.0
+        for body in bodies[2 * split:] + [bodies[2 * split - 1]]:
+            send(new, body)
+
+        new.stop()  # 수신 큐에 남은 이벤트까지 센 뒤
+        count = new.detector.window_count("CBENCH1", "BOOM")
+        tokens = new.backend.export_limits()[GLOBAL_BUCKET][0]
+        current = new.detector.adaptive._baselines[("CBENCH1", "BOOM_EWMA")].current
+        dropped = new.event_dedupe.stats()["hits"]
+        new_snapshotter.stop()
+        old_handoff.close()
+        new_handoff.close()
+        store.close()
+
+    ok = role == "successor" and new_handoff.role == "owner" and count == events and kept
+    spent = tokens <= config.GLOBAL_RATE_LIMIT[0] - 3
+    ok = ok and spent and current == events
+    print(f"  owner kept its connection until the successor connected: {'OK' if kept else 'DRAINED EARLY'}")
+    print(f"  successor window count={count} expected={events} (retries dropped locally={dropped}) "
+          f"{'OK' if ok else 'MISMATCH'}")
+    print(f"  global tokens after takeover={tokens:.2f} (burst={config.GLOBAL_RATE_LIMIT[0]}, owner 1 / successor 3) "
+          f"{'OK' if spent else 'REFILLED'}")
+    print(f"  adaptive baseline current interval hits={current:.0f} expected={events} "
+          f"{'OK' if current == events else 'MISMATCH'}")
+    print(f"  {'overlap -> takeover':<28} {takeover_ms:10.1f} ms (poll_seconds=0, in-process)")
+    if not ok:
+        raise SystemExit("handoff: mismatch")
+
+
+def bench_tracer(repeat: int = 3):
+    """
+    단계별 타이밍 샘플링(tracer.py) 비용: 끔 / 1% / 전부 (replay inline, 최선 값)
+    샘플링 여부와 관계없이 알림 결과가 같아야 한다.
+    """
+    import replay  # replay가 bench를 import하므로 여기서
+
+    print(f"[tracer] replay inline, best of {repeat}")
+    for name in ("many_channels", "long_traces"):
+        bodies = replay.SCENARIOS[name]()
+        baseline_alerts = None
+        for rate in (0.0, 0.01, 1.0):
+            best = None
+            for _ in range(repeat):
+                result = replay.replay(bodies, trace_sample_rate=rate)
+                if best is None or result["latency_us"]["p50"] < best["latency_us"]["p50"]:
+                    best = result
+            alerts = [(a["channel"], a["text"]) for a in best["alerts"]]
+            if baseline_alerts is None:
+                baseline_alerts = alerts
+            elif alerts != baseline_alerts:
+                raise SystemExit(f"tracer: alerts differ with sample rate {rate}")
+            lat = best["latency_us"]
+            print(f"  {name:<14} rate={rate:<5} {best['events_per_s']:9.0f} ev/s  p50={lat['p50']:7.1f}us "
+                  f"p99={lat['p99']:8.1f}us")
+        stages = best["stages"]
+        print("  " + " ".join(f"{stage}={v['mean_us']:.1f}us" for stage, v in stages.items()))
+
+
+def bench_shedding(rate: float = 6000.0, seconds: float = 3.0):
+    """
+    장애 폭주: 20KB 스택트레이스가 처리 능력보다 빠르게 들어올 때 (실시간, Bolt 워커 10개 흉내)
+    - 수신 큐 없음 (이전 동작): Bolt 작업 큐가 끝없이 밀려 감지 지연이 계속 늘어남
+    - 수신 큐 (ingress.py): 지연은 high_water/capacity 깊이로 묶이고, 넘친 만큼 degraded/dropped로 센다
+    감지 지연 = Bolt 풀에 넣은 시각 -> 그 이벤트를 센 시각
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    import replay  # replay가 bench를 import하므로 여기서
+    from bot import ErrorBot
+
+    class _LagBot(ErrorBot):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.lags = []
+
+        def process_message(self, event):
+            super().process_message(event)
+            self.lags.append(time.perf_counter() - event["fed"])
+
+        def _process_degraded(self, event):
+            super()._process_degraded(event)
+            self.lags.append(time.perf_counter() - event["fed"])
+
+    pool_texts = [make_long_message(20_000, seed=i) for i in range(8)]
+    total = int(rate * seconds)
+    print(f"[shedding] {total} events of 20KB at {rate:.0f} ev/s on {config.SVC_WATCHTOWER_CH}")
+    for label, workers in (("no ingress", 0), ("ingress", config.INGRESS_WORKERS)):
+        client = replay.FakeSlackClient(time.time)
+        bot = _LagBot(client, config.RULES, MemoryBackend(config.WINDOW_SECONDS, config.WINDOW_BUCKET_SECONDS),
+                      ingress_workers=workers, digest_flush_seconds=0)
+        bot.init_identity()
+        bot.start()
+        bolt = ThreadPoolExecutor(10)
+        started = time.perf_counter()
+        for n in range(total):
+            # 초당 rate건 간격으로 투입 (앞서 있으면 대기)
+            wait = started + n / rate - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            body = replay._event(n, time.time(), config.SVC_WATCHTOWER_CH, pool_texts[n % len(pool_texts)])
+            body["event"]["fed"] = time.perf_counter()
+            bolt.submit(bot.handle_message, body)
+        fed = time.perf_counter() - started
+        bolt.shutdown(wait=True)
+        bot.stop()
+        drained = time.perf_counter() - started
+        lags = sorted(bot.lags)
+        ingress = bot.stats().get("ingress", {})
+        print(f"  {label:<10} fed={fed:.2f}s drained={drained:.2f}s counted={len(lags)} "
+              f"degraded={ingress.get('degraded', 0)} dropped={ingress.get('dropped', 0)} "
+              f"lag p50={replay._percentile(lags, 0.5) * 1000:.0f}ms p99={replay._percentile(lags, 0.99) * 1000:.0f}ms "
+              f"max={lags[-1] * 1000 if lags else 0:.0f}ms alerts={len(client.posts)}")
+
+
+def bench_history(keys: int = 200, days: int = 3, events: int = 200_000):
+    """
+    룰별 hit 이력(history.py): 기록 비용, /errstats 조회 시간, 버킷 기준 정답 비교, SQLite 저장/복원
+    """
+    from history import RESOLUTIONS, RuleHistory, render_errstats
+
+    rnd = random.Random(22)
+    key_list = [(f"C{i % 20}", f"R{i}") for i in range(keys)]
+    start = 1_700_000_000.0
+    span = days * 86400
+    stream = sorted((start + rnd.random() * span, key_list[int(rnd.paretovariate(1.2)) % keys], rnd.randint(1, 3))
+                    for _ in range(events))
+    now = start + span
+
+    history = RuleHistory()
+    history.register_keys(key_list)
+    t0 = time.perf_counter()
+    for ts, key, hits in stream:
+        history.record(ts, ((key, hits, 0),))
+    record_us = (time.perf_counter() - t0) / events * 1e6
+    print(f"[history] keys={keys} events={events} over {days}d, "
+          f"memory={sum(8 * size for _n, _s, size in RESOLUTIONS) * keys / 1e6:.1f}MB")
+    print(f"  {'record (per hit item)':<28} {record_us:10.2f} us")
+
+    # 정답: 같은 버킷 경계로 자른 단순 합
+    hot = key_list[1]
+    for label, seconds in (("30m", 1800), ("6h", 6 * 3600), ("24h", 86400), ("7d", 7 * 86400)):
+        _i, bucket_seconds, size = history.resolution_for(seconds)
+        n = min(size, math.ceil(seconds / bucket_seconds))
+        last = int(now // bucket_seconds)
+        expected = sum(hits for ts, key, hits in stream if key == hot and last - n < int(ts // bucket_seconds) <= last)
+        got = history.total(hot, seconds, now)
+        query_us = timeit.timeit(lambda: history.total(hot, seconds, now), number=1_000) / 1_000 * 1e6
+        if got != expected:
+            raise SystemExit(f"history: {label} total {got} != {expected}")
+        print(f"  {'total ' + label:<28} {query_us:10.1f} us  hits={got}")
+
+    t0 = time.perf_counter()
+    reply = render_errstats(history, history.keys(), 6 * 3600, "6h", now)
+    print(f"  {'/errstats 6h (all rules)':<28} {(time.perf_counter() - t0) * 1000:10.2f} ms  "
+          f"lines={reply.count(chr(10)) + 1}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = StateStore(os.path.join(tmp, "state.db"))
+        t0 = time.perf_counter()
+        rows = history.export()
+        store.save([], {}, rows)
+        save_ms = (time.perf_counter() - t0) * 1000.0
+        restored = RuleHistory()
+        restored.register_keys(key_list)
+        t0 = time.perf_counter()
+        loaded = restored.load(store.load_history())
+        load_ms = (time.perf_counter() - t0) * 1000.0
+        store.close()
+    if loaded != len(rows) or restored.total(hot, 7 * 86400, now) != history.total(hot, 7 * 86400, now):
+        raise SystemExit("history: restore mismatch")
+    print(f"  {'save (full)':<28} {save_ms:10.1f} ms")
+    print(f"  {'load + restore':<28} {load_ms:10.1f} ms")
+
+
+def bench_fingerprint(reposts: int = 2_000):
+    """
+    에러 시그니처(fingerprint.py): 20KB 로그 1건 비용, request id/UUID/hex/시각만 바뀐 재게시가 한 시그니처로 묶이는지,
+    리플레이에서 알림의 "반복 N건 / 시그니처 K개"와 로그 재첨부 생략
+    """
+    import uuid
+
+    import replay  # replay가 bench를 import하므로 여기서
+    from fingerprint import fingerprint, normalize
+
+    rnd = random.Random(23)
+    bases = [make_long_message(20_000, seed=100 + i) for i in range(3)]
+
+    def repost(base: str) -> str:
+        ts = 1_700_000_000 + rnd.randint(0, 10**6)
+        head = (f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(ts))}.{rnd.randint(0, 999):03d}Z "
+                f"ERROR request_id={rnd.getrandbits(48):012x} trace={uuid.UUID(int=rnd.getrandbits(128))} "
+                f"addr=0x{rnd.getrandbits(40):x} user{rnd.randint(1, 10**6)} took {rnd.random() * 100:.2f}ms\n")
+        return head + base
+
+    texts = [repost(bases[i % len(bases)]) for i in range(reposts)]
+    print(f"[fingerprint] {reposts} reposts of {len(bases)} traces (20KB), random ids/uuids/hex/timestamps")
+    print(f"  normalized head: {normalize(texts[0][:110])!r}")
+    per_us = timeit.timeit(lambda: fingerprint(texts[0]), number=2_000) / 2_000 * 1e6
+    lower_us = timeit.timeit(lambda: texts[0].lower(), number=2_000) / 2_000 * 1e6
+    print(f"  {'fingerprint (20KB)':<28} {per_us:10.1f} us  (text.lower() alone {lower_us:.1f} us)")
+    distinct = len({fingerprint(t) for t in texts})
+    print(f"  distinct signatures          {distinct:10d}  (expected {len(bases)})")
+    if distinct != len(bases):
+        raise SystemExit("fingerprint: reposts did not collapse")
+
+    # 같은 룰에 재게시가 쏟아질 때: 알림 문구, 로그 첨부, 감지 경로 추가 비용
+    from bot import ErrorBot
+
+    channel = "CFPBENCH"
+    rules = [{"name": "TRACE", "channel": channel, "keyword": "addr=0x", "threshold": 20,
+              "rate_limit": [10**6, 1],
+              "notify": [{"channel": "CFPOUT", "text": "TRACE 감지", "include_log": True}]}]
+    bodies = [replay._event(n, 1_700_000_000.0 + n * 0.5, channel, text)
+              for n, text in enumerate(texts[:1_000])]
+
+    class FlakySlackClient(replay.FakeSlackClient):
+        """
+        처음 failures번의 Slack 호출은 실패 (업로드 실패 -> 본문 첨부도 실패 = 알림 전송 실패)
+        """
+        failures = 0
+
+        def _fail(self):
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("slack unavailable")
+
+        def chat_postMessage(self, channel, text, **kwargs):
+            self._fail()
+            return super().chat_postMessage(channel, text, **kwargs)
+
+        def files_upload_v2(self, channel, content, initial_comment="", **kwargs):
+            self._fail()
+            return super().files_upload_v2(channel, content, initial_comment, **kwargs)
+
+    def run(signatures: int, failures: int = 0):
+        clock = replay.ReplayClock(1_700_000_000.0)
+        client = FlakySlackClient(clock)
+        client.failures = failures
+        bot = ErrorBot(client, rules, MemoryBackend(config.WINDOW_SECONDS, 1), clock=clock, alert_workers=0,
+                       digest_flush_seconds=0, ingress_workers=0, fingerprint_signatures=signatures,
+                       incident_groups=[])
+        bot.init_identity()
+        bot.start()
+        took = []
+        for body in bodies:
+            clock.now = float(body["event"]["ts"])
+            started = time.perf_counter()
+            bot.handle_message(body)
+            took.append(time.perf_counter() - started)
+        bot.stop()
+        took.sort()
+        return client.posts, took[len(took) // 2] * 1e6
+
+    # 발언 제한 기본값(전역 5분 2회)이면 알림이 몇 건 안 나가므로 이 비교에서만 전역/수신 채널 제한을 푼다
+    saved = config.GLOBAL_RATE_LIMIT, config.DEST_RATE_LIMIT
+    config.GLOBAL_RATE_LIMIT = config.DEST_RATE_LIMIT = (10**6, 1)
+    try:
+        posts_off, p50_off = run(0)
+        posts_on, p50_on = run(config.FINGERPRINT_LRU_SIZE)
+        posts_flaky, _p50 = run(config.FINGERPRINT_LRU_SIZE, failures=2)
+    finally:
+        config.GLOBAL_RATE_LIMIT, config.DEST_RATE_LIMIT = saved
+    uploads = sum(1 for post in posts_on if "snippet" in post)
+    print(f"  handle_message p50: off {p50_off:.1f} us, on {p50_on:.1f} us")
+    print(f"  alerts: {len(posts_on)} (off {len(posts_off)}), log uploads {uploads} "
+          f"(off {sum(1 for post in posts_off if 'snippet' in post)})")
+    for post in posts_on[:2] + posts_on[-1:]:
+        print("   ", post["text"].replace("\n", " | "))
+    # 첫 알림 전송이 실패하면 그 시그니처 로그는 "첨부함"으로 남지 않고 다음 알림에 다시 붙어야 함
+    flaky_uploads = sum(1 for post in posts_flaky if "snippet" in post)
+    print(f"  first alert failed: log uploads {flaky_uploads} (expected {len(bases)})")
+    if len(posts_on) != len(posts_off) or uploads != len(bases):
+        raise SystemExit("fingerprint: alert count changed or duplicate logs were attached")
+    if flaky_uploads != len(bases):
+        raise SystemExit("fingerprint: a log whose alert failed was not attached again")
+
+
+def bench_shards(events: int = 4_000, channels: int = 8):
+    """
+    채널 샤딩 멀티프로세스 감지 (shard.py)
+    - 리플레이 시나리오 전부: inline 단일 프로세스와 샤드 2/4개의 알림 목록(시각/채널/문구)이 같은지
+    - 상태: 샤드 쪽 collect_state를 단일 프로세스 봇에 복원하면 윈도우 카운트가 같은지
+    - 처리량: 감시 채널 channels개에 20KB 로그 (threaded 런타임, 코어 수만큼만 빨라짐)
+    """
+    import replay  # replay가 bench를 import하므로 여기서
+    from bot import ErrorBot
+    from shard import ShardedErrorBot
+
+    print(f"[shards] cpus={os.cpu_count()}")
+    for name, make in sorted(replay.SCENARIOS.items()):
+        bodies = make()
+        base = replay.replay(bodies)["alerts"]
+        for shards in (2, 4):
+            alerts = replay.replay(bodies, shards=shards)["alerts"]
+            same = "identical" if alerts == base else "DIFFERENT"
+            print(f"  {name:<14} shards={shards} alerts={len(alerts)} (single {len(base)}) {same}")
+            if alerts != base:
+                raise SystemExit(f"shards: {name} alerts differ from the single-process replay")
+
+    rules = [{"name": f"TRACE{i}", "channel": f"CSHARD{i:02d}", "keyword": "Traceback", "threshold": 10**9,
+              "notify": []} for i in range(channels)]
+    pool = [make_long_message(20_000, seed=i) for i in range(8)]
+    start = 1_700_000_000.0
+    bodies = [replay._event(n, start + n * 0.01, f"CSHARD{n % channels:02d}", pool[n % len(pool)])
+              for n in range(events)]
+
+    # 상태 왕복 (샤드 -> StateStore -> 단일 프로세스)
+    clock = replay.ReplayClock(start)
+    sharded = ShardedErrorBot(replay.FakeSlackClient(clock), rules,
+                              MemoryBackend(config.WINDOW_SECONDS, config.WINDOW_BUCKET_SECONDS), clock=clock,
+                              alert_workers=0, digest_flush_seconds=0, shards=4, incident_groups=[])
+    sharded.start()
+    for body in bodies[:1_000]:
+        clock.now = float(body["event"]["ts"])
+        sharded.handle_message(body)
+    sharded.detector.join()
+    counts = [sharded.detector.window_count(rule["channel"], rule["name"]) for rule in rules]
+    single = ErrorBot(replay.FakeSlackClient(clock), rules,
+                      MemoryBackend(config.WINDOW_SECONDS, config.WINDOW_BUCKET_SECONDS), clock=clock,
+                      alert_workers=0, digest_flush_seconds=0, ingress_workers=0, incident_groups=[])
+    with tempfile.TemporaryDirectory() as tmp:
+        store = StateStore(os.path.join(tmp, "state.db"))
+        store.save(*sharded.collect_state())
+        sharded.stop()
+        single.restore_state(store)
+        store.close()
+    restored = [single.detector.window_count(rule["channel"], rule["name"]) for rule in rules]
+    print(f"  state round trip: window counts {sum(counts)} -> {sum(restored)} "
+          f"{'identical' if counts == restored else 'DIFFERENT'}")
+    if counts != restored:
+        raise SystemExit("shards: restored window counts differ")
+
+    print(f"  throughput: {events} events of 20KB over {channels} channels (threaded runtime)")
+    for shards in (0, 2, 4):
+        result = replay.replay(bodies, rules=rules, runtime="threaded", shards=shards)
+        spread = f" per shard {result['shards']['sent']}" if shards else ""
+        print(f"    shards={shards}  {result['events_per_s']:8.0f} ev/s  delivered={result['delivered_s']:.2f}s{spread}")
+
+
+def bench_incidents(minutes: int = 10, groups: int = 1_000):
+    """
+    룰 묶음 incident (correlate.py)
+    - 게이트웨이 장애 리플레이: 벤더 룰 4개가 한꺼번에 트리거될 때 EXT_GIP_REPAIRING_CH로 나가는 알림
+      (그룹 끔 / 기본 설정 config.INCIDENT_GROUPS)
+      접힌 트리거가 룰 수신 채널 보류 요약으로 나가는지도
+    - 장애가 계속되면 incident가 max_open_seconds 뒤 닫히고 다시 열리는지
+    - 그룹 룰은 (channel, rule name): 다른 채널 같은 이름 룰은 무관, 룰셋에 없는 룰은 부팅/리로드 때 에러
+    - observe 1회 비용: 그룹 수/그룹 크기와 무관한지 (트리거당 O(1), 메모리는 그룹당 최대 룰 수)
+    """
+    import replay  # replay가 bench를 import하므로 여기서
+    from bot import ErrorBot
+    from correlate import IncidentCorrelator
+    from ruleset import RuleConfigError
+
+    start = 1_700_000_000.0
+    vendors = ["Perplexity", "Claude", "MODEL_LABEL: GPT", "Gemini"]
+    bodies = [replay._event(n, start + n * 0.5, config.SVC_WATCHTOWER_CH,
+                            f"[GIP] upstream 502 Bad Gateway request_id={n:08x} {vendors[n % len(vendors)]} 응답 실패")
+              for n in range(minutes * 120)]
+    print(f"[incidents] gateway outage: {len(bodies)} events over {minutes}m, 4 vendor rules")
+    group = config.GIP_VENDOR_INCIDENT_GROUP
+    for label, incident_groups in (("off", []), ("on", config.INCIDENT_GROUPS)):
+        def make_bot(client, rules, backend, clock, incident_groups=incident_groups):
+            return ErrorBot(client, rules, backend, clock=clock, alert_workers=0, digest_flush_seconds=0,
+                            ingress_workers=0, incident_groups=incident_groups)
+
+        alerts = replay.replay(bodies, make_bot=make_bot)["alerts"]
+        gip = [alert for alert in alerts if alert["channel"] == config.EXT_GIP_REPAIRING_CH]
+        print(f"  groups {label:<3} alerts={len(alerts)} to EXT_GIP_REPAIRING_CH={len(gip)}")
+        for alert in gip[:3]:
+            print(f"    t={alert['t']:6.1f}s {alert['text'][:90]}")
+        folded = [alert for alert in alerts
+                  if alert["channel"] == config.SVC_WATCHTOWER_CH and "보류된 알림 요약" in alert["text"]]
+        print(f"  {'':<10} digests to SVC_WATCHTOWER_CH={len(folded)}")
+        if label == "on":
+            if sum("GIP 게이트웨이" in alert["text"] for alert in gip) != 1:
+                raise SystemExit("incidents: expected exactly one grouped incident alert")
+            if not folded:
+                raise SystemExit("incidents: folded triggers never reached the digest")
+
+    # 끝나지 않는 장애: 1초마다 벤더 룰이 돌아가며 트리거 -> max_open_seconds마다 다시 열림
+    keys = [("CSRC", name) for name in "ABCD"]
+    spec = {"name": "G", "rules": keys, "min_rules": 2, "within_seconds": 120,
+            "max_open_seconds": 900, "channel": "CINC"}
+    correlator = IncidentCorrelator([spec])
+    opened = [i for i in range(2_000) if (correlator.observe(keys[i % 4], "", start + i) or ("",))[0] == "open"]
+    print(f"  {'endless outage 2000s':<28} incidents opened at t={opened}")
+    if len(opened) != 3:
+        raise SystemExit("incidents: an open incident must close after max_open_seconds")
+
+    # 다른 채널의 같은 이름 룰은 그룹에 안 들어감
+    correlator = IncidentCorrelator([spec])
+    if any(correlator.observe(("COTHER", name), "", start + i) for i, name in enumerate("ABCD")):
+        raise SystemExit("incidents: a same-name rule from another channel fed the group")
+
+    # 룰셋에 없는 그룹 룰: 부팅 때 ValueError, 리로드 때 RuleConfigError + 기존 룰 유지
+    client = replay.FakeSlackClient(replay.ReplayClock(start))
+    backend = MemoryBackend(config.WINDOW_SECONDS, config.WINDOW_BUCKET_SECONDS)
+    typo = dict(group, rules=list(group["rules"][:-1]) + [(config.SVC_WATCHTOWER_CH, "GEMNI")])
+    try:
+        ErrorBot(client, config.RULES, backend, alert_workers=0, digest_flush_seconds=0, ingress_workers=0,
+                 incident_groups=[typo])
+    except ValueError as e:
+        print(f"  {'boot with typo':<28} rejected: {e}")
+    else:
+        raise SystemExit("incidents: a group rule missing from the ruleset was accepted at boot")
+    bot = ErrorBot(client, config.RULES, backend, alert_workers=0, digest_flush_seconds=0, ingress_workers=0,
+                   incident_groups=[group])
+    before = bot.ruleset
+    try:
+        bot.swap_rules(compile_rules([rule for rule in config.RULES if rule["name"] != "GEMINI"], source="bench"))
+    except RuleConfigError as e:
+        print(f"  {'reload without GEMINI':<28} rejected: {e}")
+    else:
+        raise SystemExit("incidents: a reload dropping a group rule was accepted")
+    if bot.ruleset is not before:
+        raise SystemExit("incidents: rejected reload still swapped the ruleset")
+
+    # 트리거당 비용: 룰 4개 그룹 1개 vs 룰 64개 그룹 groups개 (같은 룰 이름 수만큼만 recent에 남는지도)
+    for n_groups, size in ((1, 4), (groups, 64)):
+        specs = [{"name": f"G{g}", "rules": [("CSRC", f"R{g}_{i}") for i in range(size)], "min_rules": size,
+                  "within_seconds": 60, "channel": "CINC"} for g in range(n_groups)]
+        correlator = IncidentCorrelator(specs)
+        names = [("CSRC", f"R{g}_{i}") for g in range(n_groups) for i in range(size - 1)]  # k개 미만이라 incident 없이 계속 join
+        rnd = random.Random(25)
+        seq = [rnd.choice(names) for _ in range(200_000)]
+        t0 = time.perf_counter()
+        for i, name in enumerate(seq):
+            correlator.observe(name, "", start + i * 0.01)
+        per_us = (time.perf_counter() - t0) / len(seq) * 1e6
+        held = max(len(state.recent) for state in correlator._states)
+        print(f"  {f'observe ({n_groups} x {size} rules)':<28} {per_us:10.2f} us  max recent per group={held}")
+        if held > size:
+            raise SystemExit("incidents: group state grew past the group size")
+
+
+BENCHES = {
+    "matcher": bench_matcher,
+    "window": bench_window,
+    "stress": bench_stress,
+    "reload": bench_reload,
+    "state": bench_state,
+    "replicas": bench_replicas,
+    "limiter": bench_limiter,
+    "regex": bench_regex,
+    "extract": bench_extract,
+    "adaptive": bench_adaptive,
+    "runtime": bench_runtime,
+    "handoff": bench_handoff,
+    "tracer": bench_tracer,
+    "shedding": bench_shedding,
+    "history": bench_history,
+    "fingerprint": bench_fingerprint,
+    "shards": bench_shards,
+    "incidents": bench_incidents,
+}
+
+
+def main(argv):
+    names = argv or list(BENCHES)
+    for name in names:
+        if name not in BENCHES:
+            raise SystemExit(f"unknown bench: {name} (choices: {', '.join(BENCHES)})")
+        BENCHES[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
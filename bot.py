@@ -0,0 +1,802 @@
+"""
+봇 본체 (Slack 런타임과 분리)
+
+message 이벤트 처리(필터/중복 제거/!mute 명령/감지)와 알림 전송을 담당한다.
+Slack 클라이언트와 시계를 주입받으므로 app.py(실제 Slack)와 replay.py(가짜 클라이언트,
+기록된 시각)에서 같은 코드가 돈다.
+"""
+import threading
+import time
+
+import config
+from alert_queue import AlertQueue
+from correlate import IncidentCorrelator, render_incident, rule_names
+from dedupe import DedupeCache, event_dedupe_keys
+from detector import Detector
+from digest import SuppressedDigest, render_digest
+from extract import event_text, truncate_log
+from fingerprint import FINGERPRINT_KEY, FingerprintTracker
+from history import RuleHistory
+from ingress import DEGRADED_KEY, IngressQueue
+from metrics import BotMetrics
+from rate_limit import GLOBAL_BUCKET, RateLimit, dest_bucket, incident_bucket, rule_bucket
+from ruleset import RuleConfigError, RuleSet, compile_rules, diff_rules
+from tracer import StageTracer
+
+TRIGGER_OUTCOMES = ("fired", "rate_limited", "muted", "queue_full", "correlated")
+INCIDENT_OUTCOMES = ("sent", "rate_limited", "queue_full")
+
+
+class ErrorBot:
+    def __init__(self, client, rules, backend, clock=time.time,
+                 alert_queue_size: int = config.ALERT_QUEUE_MAXSIZE,
+                 alert_workers: int = config.ALERT_SENDER_THREADS,
+                 dedupe_max_keys: int = config.DEDUPE_MAX_KEYS,
+                 dedupe_ttl_seconds: float = config.DEDUPE_TTL_SECONDS,
+                 metrics: BotMetrics = None,
+                 digest_flush_seconds: float = config.DIGEST_FLUSH_SECONDS,
+                 trace_sample_rate: float = config.TRACE_SAMPLE_RATE,
+                 slow_event_ms: float = config.SLOW_EVENT_MS,
+                 ingress_capacity: int = config.INGRESS_CAPACITY,
+                 ingress_high_water: int = config.INGRESS_HIGH_WATER,
+                 ingress_workers: int = config.INGRESS_WORKERS,
+                 fingerprint_signatures: int = config.FINGERPRINT_LRU_SIZE,
+                 incident_groups=config.INCIDENT_GROUPS):
+        """
+        client: chat_postMessage / auth_test를 가진 객체 (slack_sdk WebClient 호환)
+        rules: ruleset.RuleSet 또는 룰 dict 목록(검증 후 컴파일)
+        alert_workers=0 이면 알림을 이벤트 처리 중에 바로 보낸다 (리플레이용)
+        metrics: 없으면 새로 만든다 (노출은 app.py에서 METRICS_* 설정 시)
+        digest_flush_seconds: 보류 요약 flush 주기. 0이면 스레드 없이 flush_digest()를 직접 호출 (리플레이용)
+        trace_sample_rate: 단계별 타이밍 샘플링 비율 (tracer.py). 0이면 끔
+        ingress_*: 수신 큐 (ingress.py). ingress_workers=0 이면 큐 없이 Bolt 스레드에서 바로 감지
+        fingerprint_signatures: 룰별 에러 시그니처 LRU 크기 (fingerprint.py). 0이면 끔
+        incident_groups: 룰 묶음 incident 그룹 (correlate.py). 비어 있으면 끔
+        """
+        self.client = client
+        self.backend = backend
+        self.clock = clock
+        self.metrics = metrics if metrics is not None else BotMetrics()
+
+        # 내 봇 식별용
+        self.bot_user_id = None
+        self.bot_id = None  # event.get("bot_id") 비교용(있으면 더 안전)
+
+        # 불변 룰셋 (교체는 swap_rules로 통째로)
+        self.ruleset = rules if isinstance(rules, RuleSet) else compile_rules(rules)
+        # 룰별 hit 이력 (/errstats, 분 단위 24시간 + 시간 단위 30일)
+        self.history = RuleHistory()
+        # 반복 로그 시그니처 (알림의 "N건 / 시그니처 K개", 같은 로그 재첨부 생략)
+        self.fingerprints = (FingerprintTracker(fingerprint_signatures, config.FINGERPRINT_MAX_CHARS)
+                             if fingerprint_signatures > 0 else None)
+        # 룰 묶음 incident (같은 그룹 룰 여러 개가 한꺼번에 트리거되면 묶음 알림 1건)
+        self.correlator = (IncidentCorrelator(incident_groups, config.DIGEST_SAMPLE_CHARS, self.ruleset.keys)
+                           if incident_groups else None)
+        self._incident_counters = {
+            spec["name"]: {outcome: self.metrics.incidents.labels(spec["name"], outcome)
+                           for outcome in INCIDENT_OUTCOMES}
+            for spec in (self.correlator.groups if self.correlator is not None else ())
+        }
+        self.detector = self._make_detector()
+        self.alert_queue = self._make_alert_queue(alert_queue_size, alert_workers)
+        self.event_dedupe = DedupeCache(maxsize=dedupe_max_keys, ttl_seconds=dedupe_ttl_seconds, clock=clock)
+
+        # 발언 제한으로 보류된 트리거 요약
+        self.digest = SuppressedDigest(sample_chars=config.DIGEST_SAMPLE_CHARS)
+        self.digest_flush_seconds = digest_flush_seconds
+        self._digest_stop = threading.Event()
+        self._digest_thread = None
+
+        # 단계별 타이밍 (끄면 None: handle_message의 분기 1개만 남음)
+        self.tracer = (StageTracer(trace_sample_rate, slow_event_ms / 1000.0, self.metrics)
+                       if trace_sample_rate > 0 else None)
+
+        # 수신 큐 (없으면 None: handle_message 안에서 바로 감지)
+        self.ingress = self._make_ingress(ingress_capacity, ingress_high_water, ingress_workers)
+        # 과부하 모드 대상 룰 (ruleset, 만료 시각, Detector.subset 결과)
+        self._hot_rules = (None, 0.0, {})
+        ingress_events = self.metrics.ingress_events
+        self._ingress_processed = ingress_events.labels("processed")
+        self._ingress_degraded = ingress_events.labels("degraded")
+        self._ingress_dropped = ingress_events.labels("dropped")
+
+        # 무중단 재시작 (handoff.py): 겹침 구간에만 keys -> 중복 여부 공유 확인 함수가 들어온다
+        self.overlap_claim = None
+        # 처리 중인 이벤트 수 (drain 시 wait_idle)
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+        # (channel, rule name) -> {outcome: counter} (트리거 경로에서 labels() 조회 없음)
+        self._trigger_counters = self._build_trigger_counters(self.ruleset, {})
+        self._register_gauges()
+
+    # ----------------------------------------------------
+    # lifecycle
+    # ----------------------------------------------------
+    def _make_detector(self):
+        return Detector(self.ruleset.channel_index, self.send_alert_for_rule, self.backend, clock=self.clock,
+                        metrics=self.metrics, history=self.history, fingerprints=self.fingerprints)
+
+    def _make_alert_queue(self, maxsize: int, workers: int):
+        return AlertQueue(self.deliver_alert, maxsize=maxsize, workers=workers)
+
+    def _make_ingress(self, capacity: int, high_water: int, workers: int):
+        if workers <= 0:
+            return None
+        return IngressQueue(self._process_queued, capacity=capacity, high_water=high_water,
+                            min_degraded_seconds=config.INGRESS_DEGRADED_MIN_SECONDS, workers=workers)
+
+    def init_identity(self):
+        """
+        bot_user_id: 내 봇 '유저' ID (U로 시작)
+        bot_id: 내 봇 'bot_id' (B로 시작) - 이벤트에서 bot_id로 들어올 때 비교용
+        """
+        try:
+            self._set_identity(self.client.auth_test())
+        except Exception as e:
+            self._set_identity(None, e)
+
+    def _set_identity(self, resp, error: Exception = None):
+        if error is not None:
+            self.bot_user_id, self.bot_id = None, None
+            print(f"[BOOT] auth_test failed: {repr(error)}")
+            return
+        self.bot_user_id = resp.get("user_id")
+        self.bot_id = resp.get("bot_id")
+        print(f"[BOOT] BOT_USER_ID={self.bot_user_id}, BOT_ID={self.bot_id}")
+
+    def start(self):
+        self.alert_queue.start()
+        if self.ingress is not None:
+            self.ingress.start()
+        if self.digest_flush_seconds > 0 and self._digest_thread is None:
+            self._digest_thread = threading.Thread(target=self._digest_loop, name="digest-flush", daemon=True)
+            self._digest_thread.start()
+
+    def stop(self):
+        self._digest_stop.set()
+        if self._digest_thread is not None:
+            self._digest_thread.join(5.0)
+        # 수신 큐에 남은 이벤트를 먼저 감지 (트리거가 전송 큐로 들어감)
+        if self.ingress is not None:
+            self.ingress.stop()
+        self.alert_queue.stop()
+        pending = self.digest.pending_triggers()
+        if pending:
+            print(f"[DIGEST_DROPPED_ON_SHUTDOWN] triggers={pending}")
+
+    def stats(self) -> dict:
+        out = {
+            "alert_queue": self.alert_queue.stats(),
+            "dedupe": self.event_dedupe.stats(),
+            "digest_pending": self.digest.pending_triggers(),
+        }
+        if self.ingress is not None:
+            out["ingress"] = self.ingress.stats()
+        return out
+
+    @property
+    def channel_index(self):
+        return self.ruleset.channel_index
+
+    def _build_trigger_counters(self, ruleset, previous):
+        """
+        교체 전 룰의 카운터도 남겨 둔다 (교체 직전에 시작한 이벤트가 이전 룰로 트리거할 수 있음)
+        """
+        counters = dict(previous)
+        for channel, name in ruleset.keys:
+            if (channel, name) not in counters:
+                counters[(channel, name)] = {
+                    outcome: self.metrics.triggers.labels(channel, name, outcome) for outcome in TRIGGER_OUTCOMES
+                }
+        return counters
+
+    def _register_gauges(self):
+        """
+        스크레이프 시점에 계산하는 값들 (메시지 경로 비용 없음)
+        """
+        def window_counts():
+            now_ts = self.clock()
+            return [(key, self.detector.window_count(*key, now_ts)) for key in sorted(self.ruleset.keys)]
+
+        def thresholds():
+            return [((rule["channel"], rule["name"]), self.detector.threshold(rule)) for rule in self.ruleset.rules]
+
+        m = self.metrics
+        m.gauge("errbot_rule_window_count", "Current sliding-window count per rule", ("channel", "rule"),
+                window_counts)
+        m.gauge("errbot_rule_threshold", "Effective threshold per rule (adaptive rules follow their baseline)",
+                ("channel", "rule"), thresholds)
+        m.gauge("errbot_muted", "1 if the bot is muted", (), lambda: [((), int(self.backend.muted))])
+        m.gauge("errbot_alert_queue_depth", "Alerts waiting in the send queue", (),
+                lambda: [((), self.alert_queue.depth())])
+        if self.ingress is not None:
+            m.gauge("errbot_ingress_depth", "Events waiting in the bounded ingress queue", (),
+                    lambda: [((), self.ingress.depth())])
+            m.gauge("errbot_ingress_degraded", "1 while the ingress queue is above its high-water mark", (),
+                    lambda: [((), int(self.ingress.degraded))])
+        def dedupe_outcomes():
+            stats = self.event_dedupe.stats()
+            return [(("hit",), stats["hits"]), (("miss",), stats["misses"]), (("eviction",), stats["evictions"])]
+
+        m.counter_func("errbot_event_dedupe_total", "Slack event redelivery dedupe by outcome (hit = dropped duplicate "
+                       "/ miss = new event / eviction = key pushed out by maxsize)", ("outcome",), dedupe_outcomes)
+        m.gauge("errbot_event_dedupe_keys", "Event keys held in the redelivery dedupe cache", (),
+                lambda: [((), self.event_dedupe.stats()["size"])])
+        m.gauge("errbot_digest_pending_triggers", "Rate-limited triggers waiting for the next digest", (),
+                lambda: [((), self.digest.pending_triggers())])
+        if self.correlator is not None:
+            def incidents_open():
+                opened = {name for name, _incident in self.correlator.open_incidents(self.clock())}
+                return [((spec["name"],), int(spec["name"] in opened)) for spec in self.correlator.groups]
+
+            m.gauge("errbot_incident_open", "1 while a grouped incident is open (see correlate.py)", ("group",),
+                    incidents_open)
+
+    # ----------------------------------------------------
+    # mute
+    # ----------------------------------------------------
+    def set_muted(self, muted: bool):
+        """
+        mute/unmute 공통: 누적 카운트 제거 + 레이트리밋 카운터 초기화(원하면 유지해도 됨)
+        """
+        self.detector.set_muted(muted)
+        self.detector.reset()
+        if self.fingerprints is not None:
+            self.fingerprints.reset()
+        if self.correlator is not None:
+            self.correlator.reset()
+        self.backend.reset_limits(self._all_limits())
+        self.digest.clear()
+
+    # ----------------------------------------------------
+    # 룰 교체
+    # ----------------------------------------------------
+    def swap_rules(self, ruleset: RuleSet) -> dict:
+        """
+        새 룰셋으로 원자적 교체. 이벤트 처리는 멈추지 않는다.
+        - (channel, rule name)이 같고 keyword/match/pattern/field/adaptive가 그대로인 룰은 윈도우 카운트 유지
+        - 그중 하나라도 바뀐 룰, 빠진 룰은 카운트(+ 적응형 기준선) 초기화 (ruleset.diff_rules)
+        - incident 그룹 룰이 새 룰셋에 없으면 RuleConfigError (교체하지 않음)
+        """
+        if self.correlator is not None:
+            errors = self.correlator.unknown_rules(ruleset.keys)
+            if errors:
+                raise RuleConfigError(ruleset.source, errors)
+        started = time.perf_counter()
+        old = self.ruleset
+        diff = diff_rules(old, ruleset)
+        self._trigger_counters = self._build_trigger_counters(ruleset, self._trigger_counters)
+        self.detector.swap(ruleset.channel_index, reset_keys=diff["changed"] + diff["removed"])
+        if self.fingerprints is not None:
+            self.fingerprints.reset(diff["changed"] + diff["removed"])
+        self.ruleset = ruleset
+        took_ms = (time.perf_counter() - started) * 1000.0
+        print(
+            f"[RULES] swapped {old.version} -> {ruleset.version} source={ruleset.source} "
+            f"rules={len(ruleset.rules)} added={len(diff['added'])} removed={len(diff['removed'])} "
+            f"changed={len(diff['changed'])} took={took_ms:.2f}ms"
+        )
+        return dict(diff, version=ruleset.version, rules=len(ruleset.rules), took_ms=took_ms)
+
+    # ----------------------------------------------------
+    # Slack message event
+    # ----------------------------------------------------
+    def handle_message(self, body):
+        started = time.perf_counter()
+        with self._in_flight_lock:
+            self._in_flight += 1
+        try:
+            if self.tracer is None:
+                self._handle_message(body)
+            else:
+                self._handle_sampled(body, started)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+            self.metrics.handle.observe(time.perf_counter() - started)
+
+    def wait_idle(self, timeout: float) -> bool:
+        """
+        처리 중인 이벤트가 끝날 때까지 대기 (Socket Mode 연결을 닫은 뒤 drain용, 드문 호출이라 폴링)
+        """
+        deadline = time.monotonic() + timeout
+        while self._in_flight:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _handle_message(self, body):
+        event = self._admit(body)
+        if event is None:
+            return
+        if self.ingress is None:
+            self.process_message(event)
+        elif not self.ingress.submit(event):
+            self._ingress_dropped.inc()
+
+    def _handle_sampled(self, body, started: float):
+        trace = self.tracer.sample()
+        if trace is None:
+            self._handle_message(body)
+            self.tracer.check_unsampled(time.perf_counter() - started, body)
+            return
+        self._handle_traced(body, trace)
+
+    def _handle_traced(self, body, trace):
+        """
+        _handle_message와 같은 단계를 거치며 사이사이 시각을 찍는다 (tracer.py)
+        """
+        event = self._admit(body)
+        trace.mark("dedupe")
+        if event is None:
+            return  # 감시하지 않는 채널/중복/명령은 단계 통계에서 뺀다
+        if self.ingress is None:
+            self._process_traced(event, trace)
+        elif not self.ingress.submit(event, trace):
+            self._ingress_dropped.inc()
+
+    def _process_traced(self, event, trace):
+        event = self._extract(event)
+        trace.size = len(event.get("text") or "")
+        trace.channel = event.get("channel")
+        trace.mark("extract")
+        self.detector.process_traced(event, trace)
+        self.tracer.finish(trace)
+
+    def _admit(self, body):
+        """
+        필터/중복 제거/!mute 명령. 감지로 넘길 event 또는 None
+        """
+        event = body.get("event", {}) or {}
+
+        # (1) 메시지 수정/삭제 등 '메시지 본문이 아닌 이벤트'는 제외
+        if event.get("subtype") is not None:
+            return None
+
+        # (2) 감시 룰이 없는 채널은 본문 처리/락 없이 바로 버림 (!mute/!unmute만 예외)
+        channel = event.get("channel")
+        text = (event.get("text") or "")
+        if channel not in self.ruleset.channel_index and not text.lstrip().startswith("!"):
+            return None
+
+        # 다른 봇 메시지도 감지한다.
+        # 단, "내 봇이 보낸 메시지"만 무시하여 무한루프를 방지한다.
+        if self.bot_user_id and event.get("user") == self.bot_user_id:
+            return None
+        if self.bot_id and event.get("bot_id") == self.bot_id:
+            return None
+
+        # (3) Slack 재전송(같은 이벤트)은 다시 세지 않음
+        dedupe_keys = event_dedupe_keys(body, event)
+        if self.event_dedupe.seen(dedupe_keys):
+            return None
+        # 재시작 겹침 구간: 다른 프로세스가 이미 센 이벤트(Slack 재전송)도 버림
+        overlap_claim = self.overlap_claim
+        if overlap_claim is not None and overlap_claim(dedupe_keys):
+            return None
+
+        # 명령 확인은 앞부분만 소문자로 (긴 로그 전체를 lower()하지 않음)
+        cmd = text.lstrip()[:8].lower()
+
+        # !mute / !unmute
+        if cmd.startswith("!mute"):
+            self.set_muted(True)
+            self._reply(channel, "🔇 Bot mute 상태입니다.", "MUTE_REPLY_FAIL")
+            return None
+
+        if cmd.startswith("!unmute"):
+            self.set_muted(False)
+            self._reply(channel, "🔔 Bot unmute 되었습니다. (카운트 초기화)", "UNMUTE_REPLY_FAIL")
+            return None
+
+        # ✅ mute 상태면 카운팅/전파 로직으로 내려가지 않음 (락 없이 읽음)
+        if self.detector.muted:
+            return None
+
+        return event
+
+    def process_message(self, event):
+        self.detector.process(self._extract(event))
+
+    # ----------------------------------------------------
+    # 수신 큐 워커 (ingress.py)
+    # ----------------------------------------------------
+    def _process_queued(self, event, trace, degraded: bool):
+        if degraded:
+            # 과부하 모드 이벤트는 단계 통계에서 뺀다 (다른 처리 경로)
+            self._process_degraded(event)
+            self._ingress_degraded.inc()
+            return
+        if trace is None:
+            self.process_message(event)
+        else:
+            trace.mark("ingress")
+            self._process_traced(event, trace)
+        self._ingress_processed.inc()
+
+    def _process_degraded(self, event):
+        """
+        과부하 모드: 윈도우 카운트가 이미 threshold 절반 이상인 룰만, 본문 앞부분(DEGRADED_MAX_CHARS)으로 센다.
+        - 조용하던 룰은 세지 않는다 (폭주 중 새로 뜨는 룰은 큐가 low_water로 내려온 뒤부터)
+        - threshold 1~2 룰은 절반이 0~1이라 항상 대상
+        - 트리거돼도 include_log 없이 알림 문구만 (DEGRADED_KEY)
+        """
+        hot = self._hot_index()
+        if event.get("channel") not in hot:
+            return
+        text = event_text(event, config.DEGRADED_MAX_CHARS, config.DEGRADED_MAX_NODES, clip_text=True)
+        self.detector.process_subset(dict(event, text=text, **{DEGRADED_KEY: True}), hot)
+
+    def _hot_index(self):
+        """
+        과부하 모드 대상 룰의 Detector.subset (DEGRADED_REFRESH_SECONDS마다, 룰 교체 시 다시 계산)
+        워커 여러 개가 동시에 다시 계산해도 결과가 같으므로 락 없이 튜플째 교체
+        """
+        ruleset, expires_at, index = self._hot_rules
+        now = time.monotonic()
+        if ruleset is self.ruleset and now < expires_at:
+            return index
+        ruleset = self.ruleset
+        now_ts = self.clock()
+        hot_keys = set()
+        for rule in ruleset.rules:
+            key = (rule["channel"], rule["name"])
+            if self.detector.window_count(*key, now_ts) >= self.detector.threshold(rule) // 2:
+                hot_keys.add(key)
+        index = self.detector.subset(hot_keys)
+        self._hot_rules = (ruleset, now + config.DEGRADED_REFRESH_SECONDS, index)
+        return index
+
+    @staticmethod
+    def _extract(event):
+        # text + attachments + blocks를 한 버퍼로 (감지, 요약 샘플, include_log가 같은 버퍼를 씀)
+        # 감지는 text 전체로. include_log는 알림 job을 만들 때 EXTRACT_MAX_CHARS로 자른다
+        text = event_text(event, config.EXTRACT_MAX_CHARS, config.EXTRACT_MAX_NODES)
+        if text is not event.get("text"):
+            event = dict(event, text=text)
+        return event
+
+    # ----------------------------------------------------
+    # 발언 제한 (rate_limit.py)
+    # ----------------------------------------------------
+    @staticmethod
+    def _rule_limits(rule):
+        """
+        반환: (필수 단계 [(bucket, RateLimit)] , 수신 채널 단계 [(bucket, RateLimit)], 수신 채널 목록)
+        """
+        limits = (
+            (rule_bucket(rule["channel"], rule["name"]), RateLimit(*rule.get("rate_limit", config.RULE_RATE_LIMIT))),
+            (GLOBAL_BUCKET, RateLimit(*config.GLOBAL_RATE_LIMIT)),
+        )
+        channels = tuple(dict.fromkeys(action["channel"] for action in rule.get("notify", ())))
+        dest_limit = RateLimit(*config.DEST_RATE_LIMIT)
+        return limits, tuple((dest_bucket(ch), dest_limit) for ch in channels), channels
+
+    def _all_limits(self):
+        out = {GLOBAL_BUCKET: RateLimit(*config.GLOBAL_RATE_LIMIT)}
+        for rule in self.ruleset.rules:
+            limits, destinations, _channels = self._rule_limits(rule)
+            out.update(limits)
+            out.update(destinations)
+        for spec in (self.correlator.groups if self.correlator is not None else ()):
+            out[incident_bucket(spec["name"])] = RateLimit(*spec["rate_limit"])
+        return list(out.items())
+
+    # ----------------------------------------------------
+    # 알림
+    # ----------------------------------------------------
+    def send_alert_for_rule(self, rule, event):
+        """
+        감지 쪽: 전송 권한(슬롯)만 확보하고 실제 전송은 alert_queue에 넘긴다.
+        """
+        now_ts = self.clock()
+        counters = self._trigger_counters[(rule["channel"], rule["name"])]
+
+        # 0) 룰 묶음 incident: 그룹의 k번째 트리거는 묶음 알림으로, 열려 있는 동안의 트리거는 접는다
+        #    접힌 트리거도 버리지 않고 요약에 넣어 둠 -> flush_digest가 룰 수신 채널로 전송
+        if self.correlator is not None and not self.backend.muted:
+            found = self.correlator.observe((rule["channel"], rule["name"]), event.get("text", "") or "", now_ts)
+            if found is not None and self._send_incident(now_ts, *found):
+                counters["correlated"].inc()
+                self.digest.add(rule, event, now_ts)
+                return
+
+        # 1) 전송 권한 확보(트리거 단위 1회: 룰/전역 토큰 + 보낼 수 있는 수신 채널 토큰)
+        limits, destinations, channels = self._rule_limits(rule)
+        slot = self.backend.acquire_slot(now_ts, limits, destinations)
+        if slot is None:
+            if self.backend.muted:
+                counters["muted"].inc()
+            else:
+                # 버리지 않고 요약에 접어 둠 -> 다음 발언 가능 시점에 flush_digest가 전송
+                counters["rate_limited"].inc()
+                self.digest.add(rule, event, now_ts)
+            return
+
+        # 직전 알림 이후 반복 현황 (트리거 이벤트가 대표 로그)
+        text = event.get("text", "") or ""
+        signatures = None
+        if self.fingerprints is not None:
+            signatures = self.fingerprints.take((rule["channel"], rule["name"]), event.get(FINGERPRINT_KEY), now_ts,
+                                                self.backend.window_seconds, config.FINGERPRINT_LOG_REPEAT_SECONDS)
+
+        # 보류 요약은 flush_digest가 자기 토큰(전역 + 수신 채널)으로만 보낸다 (트리거 슬롯에 얹지 않음)
+        job = {
+            "rule": rule,
+            "src_channel": event.get("channel"),
+            "original_text": "" if DEGRADED_KEY in event else text[:config.EXTRACT_MAX_CHARS],
+            "degraded": DEGRADED_KEY in event,
+            "signatures": signatures,
+            "slot": slot,
+            "channels": frozenset(ch for ch, ok in zip(channels, slot.granted) if ok),
+        }
+        if not self.alert_queue.submit(job):
+            self.backend.release_slot(slot)
+            counters["queue_full"].inc()
+            print(f"[ALERT_QUEUE_FULL] rule={rule.get('name')} depth={self.alert_queue.depth()}")
+            return
+        counters["fired"].inc()
+
+    def _send_incident(self, now_ts: float, action: str, spec: dict, incident) -> bool:
+        """
+        반환 True면 이 트리거는 incident로 처리됨 (개별 알림 대신 보류 요약으로).
+        묶음 알림은 그룹 버킷만 쓴다 (전역/수신 채널 토큰을 개별 룰 알림과 다투지 않음).
+        발언 제한/큐가 가득 차 못 보내면 incident를 닫고 이 트리거는 개별 알림 경로로.
+        """
+        if action == "fold":
+            return True
+        counters = self._incident_counters[spec["name"]]
+        slot = self.backend.acquire_slot(now_ts, ((incident_bucket(spec["name"]), RateLimit(*spec["rate_limit"])),))
+        if slot is None:
+            self.correlator.discard(incident)
+            counters["rate_limited"].inc()
+            return False
+        job = {"kind": "incident", "channel": spec["channel"], "text": render_incident(spec, incident),
+               "group": spec["name"], "slot": slot}
+        if not self.alert_queue.submit(job):
+            self.backend.release_slot(slot)
+            self.correlator.discard(incident)
+            counters["queue_full"].inc()
+            print(f"[ALERT_QUEUE_FULL] incident={spec['name']} depth={self.alert_queue.depth()}")
+            return False
+        counters["sent"].inc()
+        print(f"[INCIDENT] group={spec['name']} rules={rule_names(incident, ',')} channel={spec['channel']}")
+        return True
+
+    def deliver_alert(self, job):
+        """
+        sender 스레드 쪽: notify 전송 + 전부 실패 시 슬롯 롤백
+        """
+        kind = job.get("kind")
+        if kind == "digest":
+            self.deliver_digest(job)
+            return
+        if kind == "incident":
+            self._drive(self._incident_steps(job))
+            return
+        self._drive(self._alert_steps(job))
+
+    # ----------------------------------------------------
+    # 전송 단계 (스레드/asyncio 런타임 공통)
+    # ----------------------------------------------------
+    # 전송 로직은 Slack 호출을 yield ("chat_postMessage", kwargs) 하는 제너레이터로 두고,
+    # 실제 호출은 런타임별 드라이버가 한다 (스레드: _drive, asyncio: async_bot.AsyncErrorBot._drive_async).
+    # 호출이 실패하면 드라이버가 그 yield 지점으로 예외를 던져 준다.
+    def _drive(self, steps):
+        try:
+            call = next(steps)
+            while True:
+                method, kwargs = call
+                try:
+                    self._call_slack(getattr(self.client, method), **kwargs)
+                except Exception as e:
+                    call = steps.throw(e)
+                else:
+                    call = next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+    def _alert_steps(self, job):
+        rule = job["rule"]
+        rule_name = rule.get("name")
+        original_text = job["original_text"]
+
+        # 큐에 있는 동안 mute 되었으면 보내지 않음 (mute가 슬롯/요약도 비움)
+        if self.detector.muted:
+            return
+
+        sent_count = 0
+        errors = []
+        allowed_channels = job["channels"]
+        signatures = job.get("signatures")
+        signature_line = ""
+        if signatures is not None:
+            signature_line = (f"\n반복 {signatures['occurrences']}건 / 서로 다른 시그니처 {signatures['signatures']}개 "
+                              f"(대표 로그 fp={signatures['fingerprint']:08x}, 누적 {signatures['fingerprint_count']}건)")
+
+        # 2) 실제 전송: notify 중 최대 2건까지 전송 (수신 채널 버킷이 빈 채널은 건너뜀)
+        for action in rule.get("notify", []):
+            target_channel = action.get("channel")
+            if target_channel not in allowed_channels:
+                continue
+            text, log = action["text"] + signature_line, None
+            if action.get("include_log"):
+                # 과부하 모드 트리거는 로그 없이 (수신 큐가 밀린 동안 큰 업로드/렌더링을 피함)
+                if job.get("degraded"):
+                    text += f"\n{config.DEGRADED_ALERT_NOTE}"
+                elif signatures is not None and signatures["log_seen"]:
+                    # 같은 시그니처 로그는 이미 첨부함 (거의 같은 덩어리를 반복해서 붙이지 않음)
+                    text += "\n(같은 시그니처 로그는 이전 알림 참고)"
+                else:
+                    log = original_text
+            try:
+                yield from self._post_alert_steps(target_channel, text, log)
+                sent_count += 1
+                if log and signatures is not None:
+                    # 대표 로그가 실제로 나간 뒤에만 "첨부함"으로 기록 (큐 거절/전송 실패면 다음 알림에 다시)
+                    self.fingerprints.mark_logged((rule["channel"], rule_name), signatures["fingerprint"],
+                                                  self.clock())
+
+                if sent_count >= 2:   # ✅ 트리거 1회당 최대 2건
+                    break
+
+            except Exception as e:
+                errors.append(f"{target_channel} -> {repr(e)}")
+
+        # 3) 전부 실패했으면 예약 슬롯 되돌리기
+        if sent_count == 0:
+            self.backend.release_slot(job["slot"])
+
+        # (선택) 일부 실패 로그
+        if errors:
+            src_channel = job["src_channel"]
+            print(f"[ALERT_PARTIAL_FAIL] rule={rule_name} src_channel={src_channel} sent={sent_count} errors={errors}")
+
+    def _incident_steps(self, job):
+        """
+        묶음 알림 1건. 실패하면 그룹 토큰만 되돌린다 (접힌 트리거는 보류 요약 쪽에 따로 남아 있음)
+        """
+        if self.detector.muted:
+            return
+        try:
+            yield "chat_postMessage", {"channel": job["channel"], "text": job["text"]}
+        except Exception as e:
+            self.backend.release_slot(job["slot"])
+            print(f"[INCIDENT_SEND_FAIL] group={job['group']} channel={job['channel']} {repr(e)}")
+
+    def _post_alert_steps(self, channel, text, log=None):
+        """
+        알림 1건. log(include_log)가 길면 snippet 파일로 올리고, 업로드를 못 하면 잘라서 본문에 붙인다.
+        """
+        if log and len(log) > config.LOG_INLINE_MAX_CHARS and config.LOG_SNIPPET_UPLOAD:
+            try:
+                yield "files_upload_v2", {"channel": channel, "content": log, "filename": "error.log",
+                                          "title": "error log", "initial_comment": text}
+                return
+            except Exception as e:
+                print(f"[LOG_UPLOAD_FAIL] channel={channel} {repr(e)} -> inline")
+        if log:
+            text += f"\n\n```{truncate_log(log, config.LOG_INLINE_MAX_CHARS)}```"
+        yield "chat_postMessage", {"channel": channel, "text": text}
+
+    # ----------------------------------------------------
+    # 보류 요약 (digest)
+    # ----------------------------------------------------
+    def _digest_loop(self):
+        while not self._digest_stop.wait(self.digest_flush_seconds):
+            try:
+                self.flush_digest()
+            except Exception as e:
+                print(f"[DIGEST_FLUSH_FAIL] {repr(e)}")
+
+    def flush_digest(self) -> bool:
+        """
+        보류된 트리거가 있고 지금 발언 가능하면(전역 + 수신 채널 토큰) 요약을 보낸다.
+        요약 메시지는 항상 이 경로로만 나간다 (알림 1건 = 토큰 1개씩, 수신 채널 제한도 그대로 적용).
+        """
+        if not len(self.digest) or self.backend.muted:
+            return False
+        groups = self.digest.drain(config.DIGEST_MAX_MESSAGES)
+        if not groups:
+            return False
+
+        dest_limit = RateLimit(*config.DEST_RATE_LIMIT)
+        slot = self.backend.acquire_slot(
+            self.clock(),
+            ((GLOBAL_BUCKET, RateLimit(*config.GLOBAL_RATE_LIMIT)),),
+            tuple((dest_bucket(target), dest_limit) for target, _items in groups),
+        )
+        if slot is None:
+            self.digest.restore(groups)
+            return False
+        sendable = [group for group, ok in zip(groups, slot.granted) if ok]
+        self.digest.restore([group for group, ok in zip(groups, slot.granted) if not ok])
+        if not self.alert_queue.submit({"kind": "digest", "groups": sendable, "slot": slot}):
+            self.digest.restore(sendable)
+            self.backend.release_slot(slot)
+            return False
+        return True
+
+    def deliver_digest(self, job):
+        self._drive(self._digest_job_steps(job))
+
+    def _digest_job_steps(self, job):
+        if self.detector.muted:
+            return
+        sent = yield from self._digest_group_steps(job["groups"])
+        if not sent:
+            self.backend.release_slot(job["slot"])
+
+    def _digest_group_steps(self, groups):
+        """
+        수신 채널별 요약 메시지 전송. 실패한 묶음은 다시 보류. 반환: 보낸 메시지 수
+        """
+        sent = 0
+        for target_channel, items in groups:
+            try:
+                yield "chat_postMessage", {"channel": target_channel,
+                                           "text": render_digest(config.ALERT_PREFIX, items)}
+                sent += 1
+            except Exception as e:
+                self.digest.restore([(target_channel, items)])
+                print(f"[DIGEST_SEND_FAIL] channel={target_channel} {repr(e)}")
+        return sent
+
+    def _reply(self, channel, text, fail_tag: str):
+        """
+        !mute/!unmute 응답 (알림 큐를 거치지 않음)
+        """
+        try:
+            self.client.chat_postMessage(channel=channel, text=text)
+        except Exception as e:
+            print(f"[{fail_tag}] {repr(e)}")
+
+    def _call_slack(self, method, **kwargs):
+        """
+        Slack API 호출 + 지연/에러 메트릭
+        """
+        started = time.perf_counter()
+        try:
+            method(**kwargs)
+        except Exception as e:
+            self._observe_send(started, e)
+            raise
+        self._observe_send(started)
+
+    def _observe_send(self, started: float, error: Exception = None):
+        if error is None:
+            self.metrics.send_ok.observe(time.perf_counter() - started)
+        else:
+            self.metrics.send_error.observe(time.perf_counter() - started)
+            self.metrics.slack_send_errors.labels(type(error).__name__).inc()
+
+    # ----------------------------------------------------
+    # 상태 저장/복원 (state_store)
+    # ----------------------------------------------------
+    def collect_state(self):
+        """
+        스냅샷 스레드에서 호출: 바뀐 윈도우 + mute/레이트리밋/적응형 기준선 + 바뀐 hit 이력
+        """
+        meta = {"muted": self.backend.muted, "rate_buckets": self.backend.export_limits(),
+                "baselines": self.detector.adaptive.export()}
+        return self.backend.export_windows(), meta, self.history.export()
+
+    def restore_state(self, store, merge: bool = False):
+        """
+        merge=True: 덮어쓰지 않고 지금 상태와 합친다 (무중단 재시작에서 이전 프로세스 상태 인계)
+        윈도우/hit 이력은 더하고, 발언 제한은 토큰이 적은 쪽, 적응형 기준선은 AdaptiveThresholds.load 참고
+        """
+        started = time.perf_counter()
+        windows, meta = store.load()
+        restored = self.backend.merge_windows(windows) if merge else self.backend.import_windows(windows)
+        self.backend.set_muted(bool(meta.get("muted", False)))
+        self.backend.import_limits(meta.get("rate_buckets", {}), merge=merge)
+        baselines = self.detector.adaptive.load(meta.get("baselines", []), merge=merge)
+        history = self.history.load(store.load_history(), merge=merge)
+        took_ms = (time.perf_counter() - started) * 1000.0
+        print(
+            f"[BOOT] state {'merged' if merge else 'restored'} path={store.path} windows={restored}/{len(windows)} "
+            f"muted={self.detector.muted} baselines={baselines} history={history} took={took_ms:.1f}ms"
+        )
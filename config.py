@@ -0,0 +1,574 @@
+"""
+봇 설정: 채널/멘션 ID, 공통 설정값, RULES
+
+Slack 연결 없이 import 가능 (리플레이/벤치에서도 같은 설정을 쓴다).
+"""
+import os
+
+
+def _env_rate_limit(name: str, default):
+    """
+    "burst/per_seconds" 형식 환경 변수로 발언 제한 덮어쓰기 (운영에서 올릴 때, 부하 테스트용. 없으면 default)
+    """
+    value = os.environ.get(name)
+    if not value:
+        return default
+    burst, per_seconds = value.split("/")
+    return int(burst), float(per_seconds)
+
+
+ALERT_PREFIX = "❗"
+
+# --------------------------------------------------------
+# 채널 ID 정의
+# --------------------------------------------------------
+SVC_WATCHTOWER_CH = "C04M1UCMCFQ"
+SVC_TMAP_DIV_CH = "C09BY22G12Q"
+SVC_BTV_DIV_CH = "C077QK6NB4K"
+RTZR_STT_SKT_ALERT_CH = "C091J89DQF7"
+EXT_GIP_REPAIRING_CH = "C06L4C7HUCF"
+LINER_ADOT_CH = "C08DRU0U7CK"
+ERROR_AX_CH = "C0A2ZM3EMBN"
+TEST_ALERT_CH = "C092DJVHVPY"
+OPEN_MONITORING_CH = "C09BLHZAPSS"
+SKT_NAPKIN = "C0A6X4Y1PKP"
+ADOT_BIZ_TEAM = "C0ADQU3PRRC"
+
+
+# --------------------------------------------------------
+# 멘션 ID 정의
+# --------------------------------------------------------
+MENTION_HEO = "<@U04MGC3BFCY>"
+MENTION_KHM = "<@U04LKUQD294>"
+
+MENTION_KDW = "<@U03H53S4B2B>"
+MENTION_NJK = "<@U03L9HG1Q49>"
+MENTION_JJY = "<@U03J9DUADJ4>"
+
+MENTION_KJH = "<@U04M5AFPQHF>"
+MENTION_KHR = "<@U04LSM49TR8>"
+
+MENTION_KYH = "<@U063M2LKNA1>"
+MENTION_GJH = "<@U063M2QM89K>"
+MENTION_YYJ = "<@U04LSHPDC03>"
+MENTION_PJY = "<@U05319QDEET>"
+
+MENTION_KAI = "<@U06NSJVR0GH>"
+MENTION_BSR = "<@U08DS680G7L>"
+
+MENTION_KSW = "<@U04MGC174HE>"
+MENTION_LYS = "<@U04LV5K4PA8>"
+
+MENTION_GMS = "<@U04M5A7194H>"
+MENTION_JUR = "<@U05BK5TSBRV>"
+
+MENTION_SYC = "<@U04LSHQMADR>"
+
+MENTION_KHJ = "<@U04LC55FDN3>"
+MENTION_PJH = "<@U04LL3F11C6>"
+MENTION_KTH = "<@U04LPNR61BP>"
+MENTION_ERW = "<@U0589UYGNUX>"
+
+# --------------------------------------------------------
+# 공통 설정
+# --------------------------------------------------------
+WINDOW_SECONDS = 240  # threshold 카운팅 윈도우(기존 유지)
+WINDOW_BUCKET_SECONDS = 1  # 윈도우 카운터 버킷 크기 (알림 타이밍 오차 = 버킷 1개 이내)
+
+# ✅ 발언 제한 (토큰 버킷): (burst, per_seconds) = 최대 burst회, per_seconds마다 burst회 비율로 회복
+# "트리거 1회당 2건"을 보장하기 위해 메시지가 아닌 트리거 단위로 센다.
+# 룰 하나는 기존처럼 5분 2회. 전역은 룰 burst 몇 개 분량이라 시끄러운 룰 하나(또는 한 채널 묶음)가
+# 다른 룰 알림을 막지 못하고, 수신 채널 제한이 한 채널로 몰리는 양을 그 절반 아래로 묶는다 (bench.py limiter)
+# 환경 변수로 바꿀 수 있다 ("8/300" 형식)
+RULE_RATE_LIMIT = _env_rate_limit("RULE_RATE_LIMIT", (2, 300))  # 룰별. 룰 설정의 rate_limit로 개별 지정 가능
+DEST_RATE_LIMIT = _env_rate_limit("DEST_RATE_LIMIT", (4, 300))  # 알림 받는 채널별
+GLOBAL_RATE_LIMIT = _env_rate_limit("GLOBAL_RATE_LIMIT", (10, 300))  # 전체
+
+# 적응형 threshold (룰에 "adaptive" 설정 시, baseline.py): 평소 윈도우당 hit의 EWMA 평균 + k·표준편차
+# warmup개 윈도우(기본 30 x 240초 = 2시간)를 학습하기 전에는 룰의 threshold를 그대로 쓴다.
+ADAPTIVE_DEFAULTS = {"k": 4.0, "floor": 3, "warmup": 30, "alpha": 0.05}
+
+# 상태 백엔드: 기본은 프로세스 메모리.
+# STATE_REDIS_URL을 주면 여러 인스턴스가 Redis로 윈도우/발언 제한/mute를 공유 (redis 패키지 필요)
+STATE_REDIS_URL = os.environ.get("STATE_REDIS_URL")
+SHARED_WINDOW_BUCKET_SECONDS = 10  # Redis 버킷 크기 (윈도우당 MGET 키 수 = 240/10 + 1)
+
+# 알림 전송 큐: 감지(이벤트 핸들러)와 Slack 전송을 분리
+ALERT_QUEUE_MAXSIZE = 1000
+ALERT_SENDER_THREADS = 2
+
+# 수신 큐 (ingress.py): 감지를 Bolt 워커 풀 밖의 크기 고정 큐 뒤에서 돌린다 (0이면 Bolt 스레드에서 바로)
+# 깊이가 INGRESS_HIGH_WATER를 넘으면 과부하 모드, INGRESS_CAPACITY가 차면 새 이벤트를 버린다
+INGRESS_WORKERS = 2
+INGRESS_CAPACITY = 5000
+INGRESS_HIGH_WATER = 1000
+INGRESS_DEGRADED_MIN_SECONDS = 5.0  # 과부하 모드 최소 유지 시간 (모드가 자주 뒤집히지 않게)
+# 과부하 모드: threshold 절반 이상 찬 룰만, 본문 앞부분만 보고 센다 (include_log 생략)
+DEGRADED_MAX_CHARS = 2000
+DEGRADED_MAX_NODES = 50
+DEGRADED_REFRESH_SECONDS = 1.0  # 대상 룰(윈도우 카운트) 재계산 주기
+DEGRADED_ALERT_NOTE = "(과부하: 로그 첨부 생략)"
+
+# 채널 샤딩 멀티프로세스 감지 (shard.py, app.py만): 0이면 단일 프로세스
+# 워커 N개가 채널별 윈도우를 나눠 들고, 이 프로세스는 수신/발언 제한/전송만 (수신 큐 대신 워커 파이프)
+# RedisBackend(STATE_REDIS_URL)와는 같이 쓰지 않는다 (윈도우가 워커 메모리에 있으므로)
+SHARD_WORKERS = int(os.environ.get("SHARD_WORKERS") or 0)
+
+# asyncio 런타임(async_app.py): 동시 전송 수 / aiohttp 연결 풀 크기
+ASYNC_SEND_CONCURRENCY = 8
+ASYNC_HTTP_POOL_SIZE = 16
+
+# 발언 제한에 걸린 트리거는 요약으로 모았다가 다음 발언 가능 시점에 전송
+DIGEST_FLUSH_SECONDS = 30
+DIGEST_MAX_MESSAGES = 1  # 요약 1회당 메시지 수 (수신 채널별 1건)
+DIGEST_SAMPLE_CHARS = 200
+
+# 메시지 본문 추출 (extract.py): text + attachments + blocks를 합친 버퍼의 상한
+EXTRACT_MAX_CHARS = 20000  # attachments/blocks에서 모으는 글자 수 + include_log 상한 (메시지 text는 감지에 전부 씀)
+EXTRACT_MAX_NODES = 1000  # 페이로드에서 방문할 최대 노드 수
+
+# include_log: LOG_INLINE_MAX_CHARS 이하면 본문에 코드 블록으로, 넘으면 snippet 파일로 업로드
+# (업로드는 files:write 권한 필요. 끄거나 업로드가 실패하면 잘라서 본문에 붙임)
+LOG_INLINE_MAX_CHARS = 3500  # Slack 권장 메시지 길이(4000자) - 알림 문구 여유
+LOG_SNIPPET_UPLOAD = True
+
+# 단계별 타이밍 샘플링 (tracer.py): 0이면 끔, 0.01이면 100건 중 1건
+# 켜져 있으면 SLOW_EVENT_MS를 넘은 이벤트를 [SLOW_EVENT] 로그로 남긴다
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE") or 0)
+SLOW_EVENT_MS = 50
+
+# 에러 시그니처 (fingerprint.py): 숫자/UUID/hex/시각을 지운 앞부분 해시로 반복 로그를 묶는다
+# 알림에 "N건 / 시그니처 K개"를 붙이고, 같은 시그니처 로그는 FINGERPRINT_LOG_REPEAT_SECONDS 동안 다시 첨부하지 않음
+FINGERPRINT_MAX_CHARS = 2000
+FINGERPRINT_LRU_SIZE = 64  # 룰별 시그니처 수 (0이면 끔)
+FINGERPRINT_LOG_REPEAT_SECONDS = 3600
+
+# 룰 묶음 incident (correlate.py): 같은 그룹의 서로 다른 룰 min_rules개가 within_seconds 안에 트리거되면
+# 개별 알림 대신 channel로 묶음 알림 1건 (그룹 rate_limit만 씀. 전역/수신 채널 발언 제한과 별개)
+# 열린 동안(마지막 트리거 후 within_seconds, 최대 max_open_seconds) 같은 그룹 트리거는 보류 요약으로 접는다.
+# 룰은 (channel, rule name)으로 지정 (부팅/리로드 때 룰셋에 없으면 에러).
+# RULES_FILE에서 그룹 룰을 빼려면 INCIDENT_GROUPS에서도 그룹을 빼야 한다
+GIP_VENDOR_INCIDENT_GROUP = {
+    "name": "GIP_VENDORS",
+    "rules": [
+        (SVC_WATCHTOWER_CH, "PERPLEXITY"),
+        (SVC_WATCHTOWER_CH, "CLAUDE"),
+        (SVC_WATCHTOWER_CH, "GPT"),
+        (SVC_WATCHTOWER_CH, "GEMINI"),
+    ],
+    "min_rules": 2,
+    "within_seconds": 120,
+    "max_open_seconds": 900,
+    "channel": EXT_GIP_REPAIRING_CH,
+    "text": (
+        f"{ALERT_PREFIX} 외부 모델 여러 개에서 동시에 에러가 발생하여 GIP 게이트웨이 장애가 의심됩니다. 확인 문의드립니다. "
+        f"{MENTION_KYH}님, {MENTION_GJH}님 "
+        f"(cc. {MENTION_YYJ}님, {MENTION_PJY}님, {MENTION_HEO}님, {MENTION_KHM}님)"
+    ),
+    "rate_limit": [1, 600],
+}
+INCIDENT_GROUPS = [GIP_VENDOR_INCIDENT_GROUP]
+
+# /errstats [rule] [range]: range를 안 주면 최근 1시간, 룰을 안 주면 hit 많은 순으로 N개
+ERRSTATS_DEFAULT_SECONDS = 3600
+ERRSTATS_MAX_RULES = 10
+
+# Slack 재전송 이벤트 중복 제거 (Slack 재시도는 수 분 안에 끝남)
+DEDUPE_MAX_KEYS = 10000
+DEDUPE_TTL_SECONDS = 600
+
+# 감지 상태 영속화 (선택): 경로를 주면 재시작 시 윈도우/mute/레이트리밋을 이어서 사용
+STATE_DB_PATH = os.environ.get("STATE_DB_PATH")
+STATE_FLUSH_SECONDS = 5
+
+# Slack Web API 주소 (선택): 로컬 가짜 Slack(fake_slack.py)에 붙일 때 "http://127.0.0.1:3001/api/"
+# Socket Mode 연결 주소도 이 API(apps.connections.open)가 알려준다
+SLACK_API_URL = os.environ.get("SLACK_API_URL")
+
+# 무중단 재시작 (선택): 같은 호스트의 이전/새 프로세스가 이 SQLite 파일로 Socket Mode 연결을 넘겨준다 (handoff.py)
+# STATE_DB_PATH와 함께 써야 이전 프로세스의 윈도우 카운트가 이어진다
+HANDOFF_PATH = os.environ.get("HANDOFF_PATH")
+HANDOFF_POLL_SECONDS = 0.5
+HANDOFF_TIMEOUT_SECONDS = 60  # 이전 프로세스가 이 시간 안에 release하지 않으면 그냥 인수
+DRAIN_TIMEOUT_SECONDS = 30  # 종료 시 처리 중 이벤트 대기 한도
+
+# 메트릭 (선택): METRICS_PORT면 /metrics HTTP, METRICS_TEXTFILE이면 node_exporter textfile용 파일
+METRICS_PORT = int(os.environ["METRICS_PORT"]) if os.environ.get("METRICS_PORT") else None
+METRICS_TEXTFILE = os.environ.get("METRICS_TEXTFILE")
+METRICS_TEXTFILE_SECONDS = 15
+
+# 외부 룰 파일 (선택): JSON/YAML. 주면 아래 RULES 대신 사용하고, 파일이 바뀌면(또는 /reload) 무중단 교체
+RULES_FILE = os.environ.get("RULES_FILE")
+RULES_WATCH_SECONDS = 5
+
+
+# --------------------------------------------------------
+# RULES (기존 유지, RULES_FILE이 없을 때 사용)
+# --------------------------------------------------------
+RULES = [
+    {
+        "name": "ADOTBIZ",
+        "channel": TEST_ALERT_CH,
+        "keyword": "이상 감지",
+        "threshold": 1,
+        "notify": [
+            {
+                "channel": TEST_ALERT_CH,
+                "text": f"{ALERT_PREFIX} 이상 감지되어 관련 채널에 전파하였습니다.",
+                "include_log": False,
+            },
+            {
+                "channel": ADOT_BIZ_TEAM,
+                "text": (
+                    f"{ALERT_PREFIX} 이상 감지되어 안내드립니다."                                    
+                ),
+                "include_log": True,
+            },
+        ],
+    },
+    {
+        "name": "RTZR_API",
+        "channel": SVC_WATCHTOWER_CH,
+        "keyword": "RTZR_API",
+        "threshold": 6,
+        "notify": [
+            {
+                "channel": SVC_WATCHTOWER_CH,
+                "text": (
+                    f"{ALERT_PREFIX} 노트 에러(RTZR_API)가 감지되어 담당자 전달하였습니다. "
+                    f"(cc. {MENTION_HEO}님, {MENTION_KHM}님)"
+                ),
+                "include_log": False,
+            },
+            {
+                "channel": RTZR_STT_SKT_ALERT_CH,
+                "text": (
+                    f"{ALERT_PREFIX} RTZR_API 6회 이상 감지중! "
+                    f"{MENTION_KDW}님, {MENTION_NJK}님, {MENTION_JJY}님 확인 문의드립니다. "
+                    f"(cc. {MENTION_HEO}님, {MENTION_KHM}님)"
+                ),
+                "include_log": False,
+            },
+        ],
+    },
+    {
+        "name": "PET_API",
+        "channel": SVC_WATCHTOWER_CH,
+        "keyword": "PET_API",
+        "threshold": 6,
+        "notify": [
+            {
+                "channel": SVC_WATCHTOWER_CH,
+                "text": (
+                    f"{ALERT_PREFIX} 노트 에러(PET_API) 6회 이상 감지중! "
+                    f"{MENTION_KJH}님, {MENTION_KHR}님 확인 문의드립니다. "
+                    f"(cc. {MENTION_HEO}님, {MENTION_KHM}님)"
+                ),
+                "include_log": False,
+            },
+        ],
+    },
+    {
+        "name": "BUILTIN_ONE",
+        "channel": SVC_WATCHTOWER_CH,
+        "keyword": "builtin.one",
+        "threshold": 6,
+        "notify": [
+            {
+                "channel": SVC_WATCHTOWER_CH,
+                "text": (f"{ALERT_PREFIX} One Agent 에러가 감지되었습니다." f"(cc. {MENTION_HEO}님, {MENTION_KHM}님)"),
+                "include_log": False,
+            },
+        ],
+    },
+    {
+        "name": "PERPLEXITY",
+        "channel": SVC_WATCHTOWER_CH,
+        "keyword": "Perplexity",
+        "threshold": 20,
+        "notify": [
+            {
+                "channel": SVC_WATCHTOWER_CH,
+                "text": f"{ALERT_PREFIX} Perplexity 에러가 감지되어 담당자 전달하였습니다. (cc. {MENTION_HEO}님, {MENTION_KHM}님)",
+                "include_log": False,
+            },
+            {
+                "channel": EXT_GIP_REPAIRING_CH,
+                "text": (
+                    f"{ALERT_PREFIX} Perplexity 에러가 발생되어 확인 문의드립니다. "
+                    f"{MENTION_KYH}님, {MENTION_GJH}님 "
+                    f"(cc. {MENTION_YYJ}님, {MENTION_PJY}님, {MENTION_HEO}님, {MENTION_KHM}님)"
+                ),
+                "include_log": True,
+            },
+        ],
+    },
+    {
+        "name": "CLAUDE",
+        "channel": SVC_WATCHTOWER_CH,
+        "keyword": "Claude",
+        "threshold": 20,
+        "notify": [
+            {
+                "channel": SVC_WATCHTOWER_CH,
+                "text": f"{ALERT_PREFIX} Claude 에러가 감지되어 담당자 전달하였습니다. (cc. {MENTION_HEO}님, {MENTION_KHM}님)",
+                "include_log": False,
+            },
+            {
+                "channel": EXT_GIP_REPAIRING_CH,
+                "text": (
+                    f"{ALERT_PREFIX} Claude 에러가 발생되어 확인 문의드립니다. "
+                    f"{MENTION_KYH}님, {MENTION_GJH}님 "
+                    f"(cc. {MENTION_YYJ}님, {MENTION_PJY}님, {MENTION_HEO}님, {MENTION_KHM}님)"
+                ),
+                "include_log": True,
+            },
+        ],
+    },
+    {
+        "name": "GPT",
+        "channel": SVC_WATCHTOWER_CH,
+        "keyword": "MODEL_LABEL: GPT",
+        "threshold": 20,
+        "notify": [
+            {
+                "channel": SVC_WATCHTOWER_CH,
+                "text": f"{ALERT_PREFIX} GPT 에러가 감지되어 담당자 전달하였습니다. (cc. {MENTION_HEO}님, {MENTION_KHM}님)",
+                "include_log": False,
+            },
+            {
+                "channel": EXT_GIP_REPAIRING_CH,
+                "text": (
+                    f"{ALERT_PREFIX} GPT 에러가 발생되어 확인 문의드립니다. "
+                    f"{MENTION_KYH}님, {MENTION_GJH}님 "
+                    f"(cc. {MENTION_YYJ}님, {MENTION_PJY}님, {MENTION_HEO}님, {MENTION_KHM}님)"
+                ),
+                "include_log": True,
+            },
+        ],
+    },
+    {
+        "name": "GEMINI",
+        "channel": SVC_WATCHTOWER_CH,
+        "keyword": "Gemini",
+        "threshold": 20,
+        "notify": [
+            {
+                "channel": SVC_WATCHTOWER_CH,
+                "text": f"{ALERT_PREFIX} Gemini 에러가 감지되어 담당자 전달하였습니다. (cc. {MENTION_HEO}님, {MENTION_KHM}님)",
+                "include_log": False,
+            },
+            {
+                "channel": EXT_GIP_REPAIRING_CH,
+                "text": (
+                    f"{ALERT_PREFIX} Gemini 에러가 발생되어 확인 문의드립니다. "
+                    f"{MENTION_KYH}님, {MENTION_GJH}님 "
+                    f"(cc. {MENTION_YYJ}님, {MENTION_PJY}님, {MENTION_HEO}님, {MENTION_KHM}님)"
+                ),
+                "include_log": True,
+            },
+        ],
+    },
+    {
+        "name": "LINER",
+        "channel": SVC_WATCHTOWER_CH,
+        "keyword": "Liner",
+        "threshold": 6,
+        "notify": [
+            {
+                "channel": SVC_WATCHTOWER_CH,
+                "text": f"{ALERT_PREFIX} Liner 모델 에러가 감지되어 담당자 전달하였습니다. (cc. {MENTION_HEO}님, {MENTION_KHM}님)",
+                "include_log": False,
+            },
+            {
+                "channel": LINER_ADOT_CH,
+                "text": (
+                    f"{ALERT_PREFIX} Liner 에러가 발생되어 확인 문의드립니다. "
+                    f"{MENTION_KAI}님, {MENTION_BSR}님 "
+                    f"(cc. {MENTION_HEO}님, {MENTION_KHM}님)"
+                ),
+                "include_log": True,
+            },
+        ],
+    },
+    {
+        "name": "AX",
+        "channel": SVC_WATCHTOWER_CH,
+        "keyword": "A.X",
+        "threshold": 10,
+        "notify": [
+            {
+                "channel": SVC_WATCHTOWER_CH,
+                "text": f"{ALERT_PREFIX} A.X 에러가 감지되어 담당자 전달하였습니다. (cc. {MENTION_HEO}님, {MENTION_KHM}님)",
+                "include_log": False,
+            },
+            {
+                "channel": ERROR_AX_CH,
+                "text": (
+                    f"{ALERT_PREFIX} A.X 에러가 발생되어 확인 문의드립니다. "
+                    f"{MENTION_KSW}님, {MENTION_LYS}님 "
+                    f"(cc. {MENTION_HEO}님, {MENTION_KHM}님)"
+                ),
+                "include_log": True,
+            },
+        ],
+    },
+    {
+        "name": "REQUEST_ID",
+        "channel": SVC_BTV_DIV_CH,
+        "keyword": "REQUEST_ID",
+        "threshold": 20,
+        "notify": [
+            {
+                "channel": SVC_BTV_DIV_CH,
+                "text": (
+                    f"{ALERT_PREFIX} 에러가 감지되어 확인 문의드립니다. "
+                    f"{MENTION_SYC}님, {MENTION_GMS}님 "
+                    f"(cc. {MENTION_HEO}님, {MENTION_KHM}님)"
+                ),
+                "include_log": False,
+            },
+        ],
+    },
+    # 테스트
+    {
+        "name": "TEST",
+        "channel": TEST_ALERT_CH,
+        "keyword": "builtin.one",
+        "threshold": 2,
+        "notify": [
+            {
+                "channel": TEST_ALERT_CH,
+                "text": f"{ALERT_PREFIX} 테스트 알림: test 감지됨. cc. {MENTION_HEO}님, {MENTION_KHM}님",
+                "include_log": False,
+            },
+        ],
+    },
+    # napkin
+    {
+        "name": "diagramCreate",
+        "channel": SVC_WATCHTOWER_CH,
+        "keyword": "diagramCreate",
+        "threshold": 6,
+        "notify": [
+            {
+                "channel": SVC_WATCHTOWER_CH,
+                "text": f"{ALERT_PREFIX} napkin 에러가 감지되어 담당자 전달하였습니다. (cc. {MENTION_HEO}님)",
+                "include_log": False,
+            },
+            {
+                "channel": SKT_NAPKIN,
+                "text": (
+                    f"{ALERT_PREFIX} napkin error has been detected. Could you please check? "
+                    f"{MENTION_ERW}"
+                    f"(cc. {MENTION_HEO})"
+                ),
+                "include_log": True,
+            },
+        ],
+    },
+
+    # napkin test
+    {
+        "name": "diagramCreate",
+        "channel": TEST_ALERT_CH,
+        "keyword": "diagramCreate",
+        "threshold": 6,
+        "notify": [
+            {
+                "channel": TEST_ALERT_CH,
+                "text": f"{ALERT_PREFIX} napkin 에러가 감지되어 담당자 전달하였습니다. (cc. {MENTION_HEO}님)",
+                "include_log": False,
+            },
+            {
+                "channel": SKT_NAPKIN,
+                "text": (
+                    f"{ALERT_PREFIX} napkin error has been detected. Could you please check? "
+                    f"{MENTION_ERW}"
+                    f"(cc. {MENTION_HEO})"
+                ),
+                "include_log": True,
+            },
+        ],
+    },
+        
+    # TMAP API
+    {
+        "name": "API",
+        "channel": SVC_TMAP_DIV_CH,
+        "keyword": "API",
+        "threshold": 12,
+        "notify": [
+            {
+                "channel": SVC_TMAP_DIV_CH,
+                "text": (
+                    f"{ALERT_PREFIX} TMAP API 에러가 감지되어 티모비 채널에 전파하였습니다. "
+                    f"(cc. {MENTION_GMS}님, {MENTION_JUR}님, {MENTION_KHM}님, {MENTION_HEO}님)"
+                ),
+                "include_log": False,
+            },
+            {
+                "channel": OPEN_MONITORING_CH,
+                "text": (
+                    f"{ALERT_PREFIX} TMAP API 에러가 지속 감지되어 확인 문의드립니다. "
+                    f"<!here>\n"
+                    f"(cc. {MENTION_HEO}님, {MENTION_KHM}님)"
+                ),
+                "include_log": True,
+            },
+        ],
+    },
+    # TMAP status=500
+    {
+        "name": "status=500",
+        "channel": SVC_TMAP_DIV_CH,
+        "keyword": "status=500",
+        "threshold": 6,
+        "notify": [
+            {
+                "channel": SVC_TMAP_DIV_CH,
+                "text": (
+                    f"{ALERT_PREFIX} status=500 에러가 감지되어 확인 문의드립니다. {MENTION_KHJ}님, {MENTION_PJH}님, {MENTION_KTH}님 "
+                    f"(cc. {MENTION_KHM}님, {MENTION_GMS}님, {MENTION_JUR}님, {MENTION_HEO}님)"
+                ),
+                "include_log": False,
+            },
+        ],
+    },
+    # TMAP TOAST ERROR
+    {
+        "name": "TOAST ERROR",
+        "channel": SVC_TMAP_DIV_CH,
+        "keyword": "TOAST ERROR",
+        "threshold": 6,
+        "notify": [
+            {
+                "channel": SVC_TMAP_DIV_CH,
+                "text": (
+                    f"{ALERT_PREFIX} 토스트 에러 확인 문의드립니다. {MENTION_KHJ}님, {MENTION_PJH}님, {MENTION_KTH}님 "
+                    f"(cc. {MENTION_KHM}님, {MENTION_GMS}님, {MENTION_JUR}님, {MENTION_HEO}님)"
+                ),
+                "include_log": False,
+            },
+        ],
+    },
+    # TMAP 채널 전용: "API" 미포함 메시지 6회
+    {
+        "name": "TMAP_API_MISSING",
+        "channel": SVC_TMAP_DIV_CH,
+        "keyword": "API",
+        "match": "absent",  # keyword가 없는 메시지 1건 = hit 1
+        "threshold": 6,
+        "notify": [
+            {
+                "channel": SVC_TMAP_DIV_CH,
+                "text": (
+                    f"{ALERT_PREFIX} 내부 원인으로 추정되는 에러가 감지되어 확인 문의드립니다. "
+                    f"{MENTION_KHJ}님, {MENTION_PJH}님 "
+                    f"(cc. {MENTION_KHM}님, {MENTION_GMS}님, {MENTION_JUR}님, {MENTION_HEO}님)"
+                ),
+                "include_log": False,
+            }
+        ],
+    },
+]
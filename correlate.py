@@ -0,0 +1,224 @@
+"""
+룰 묶음 incident (여러 룰이 한꺼번에 트리거될 때 알림 1건으로)
+
+게이트웨이(GIP)가 죽으면 PERPLEXITY / CLAUDE / GPT / GEMINI 룰이 몇 초 사이에 전부 트리거되고,
+전역 발언 제한이 그중 아무거나 두 개만 내보내서 "벤더 하나 장애"처럼 보인다.
+config.INCIDENT_GROUPS의 그룹마다 트리거 흐름을 슬라이딩 윈도우로 묶는다 (기본: GIP_VENDOR_INCIDENT_GROUP).
+    recent    (channel, rule name) -> 마지막 트리거 시각 (OrderedDict, 오래된 것부터)
+- 그룹 룰은 (channel, rule name)으로 지정: 다른 채널의 같은 이름 룰은 그룹과 무관.
+  룰셋에 없는 키는 부팅/리로드 때 에러 (오타로 그룹이 조용히 꺼지지 않게)
+- 트리거 1건: move_to_end + 앞쪽의 within_seconds 지난 항목 제거 + len() 비교
+  (제거는 항목당 한 번뿐이라 분할 상환 O(1), 그룹 룰 수와 무관)
+- 메모리: 그룹당 recent(최대 그룹 룰 수) + 열린 incident 1개
+- 서로 다른 룰 min_rules개가 within_seconds 안에 트리거되면 incident를 연다 -> 묶음 알림 1건
+- 열린 동안(마지막 트리거 후 within_seconds) 같은 그룹 트리거는 개별 알림 없이 incident에 접는다
+  접힌 트리거도 버리지 않는다: bot이 보류 요약(digest)에 넣어 룰 수신 채널로 나중에 요약 1건
+- 트리거가 계속 와도 incident는 열린 지 max_open_seconds가 지나면 닫는다
+  (그 뒤 트리거는 다시 개별 알림, k개가 다시 모이면 새 incident -> 묶음 알림 발언 제한 안에서 재알림)
+- 시각이 뒤로 가도(스레드/샤드 순서) 그룹 시계는 앞으로만 간다
+- RedisBackend여도 묶기는 이 프로세스가 받은 트리거만 (인스턴스별), 묶음 알림 발언 제한은 공유
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Incident:
+    __slots__ = ("group", "started", "opened", "last_ts", "rules", "sample")
+
+    def __init__(self, group: str, started: float, now_ts: float, rules, sample: str):
+        self.group = group
+        self.started = started  # 묶인 첫 트리거 시각
+        self.opened = now_ts
+        self.last_ts = now_ts
+        self.rules = rules  # (channel, rule name) -> 트리거 수 (열 때 묶인 순서)
+        self.sample = sample
+
+
+class _Group:
+    __slots__ = ("spec", "lock", "recent", "clock", "incident")
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.lock = threading.Lock()
+        self.recent = OrderedDict()  # (channel, rule name) -> 마지막 트리거 시각
+        self.clock = 0.0
+        self.incident = None
+
+
+def compile_groups(groups, rule_keys=None):
+    """
+    INCIDENT_GROUPS 검증 + 기본값. 룰 하나는 그룹 하나에만 (ValueError)
+    rule_keys: 룰셋의 (channel, rule name) 집합. 주면 그룹 룰이 전부 있어야 한다
+    """
+    out, owner = [], {}
+    for i, group in enumerate(groups or ()):
+        name = group.get("name") or f"group{i}"
+        if any(spec["name"] == name for spec in out):
+            raise ValueError(f"incident group {name}: duplicate name")
+        rules = []
+        for rule in group.get("rules") or ():
+            if isinstance(rule, str) or len(rule) != 2:
+                raise ValueError(f"incident group {name}: rules must be (channel, rule name) pairs (got {rule!r})")
+            rules.append(tuple(rule))
+        rules = tuple(dict.fromkeys(rules))
+        min_rules = int(group.get("min_rules", 2))
+        if not 2 <= min_rules <= len(rules):
+            raise ValueError(f"incident group {name}: min_rules must be 2..{len(rules)} (got {min_rules})")
+        if float(group.get("within_seconds", 0)) <= 0 or not group.get("channel"):
+            raise ValueError(f"incident group {name}: within_seconds > 0 and channel are required")
+        max_open = float(group.get("max_open_seconds", 900))
+        if max_open < float(group["within_seconds"]):
+            raise ValueError(f"incident group {name}: max_open_seconds must be >= within_seconds")
+        for rule in rules:
+            if rule in owner:
+                raise ValueError(f"incident group {name}: rule {rule} is already in group {owner[rule]}")
+            owner[rule] = name
+        out.append(dict(group, name=name, rules=rules, min_rules=min_rules,
+                        within_seconds=float(group["within_seconds"]), max_open_seconds=max_open,
+                        rate_limit=tuple(group.get("rate_limit", (1, 600)))))
+    if rule_keys is not None:
+        errors = unknown_rules(out, rule_keys)
+        if errors:
+            raise ValueError("; ".join(errors))
+    return out
+
+
+def unknown_rules(groups, rule_keys):
+    """
+    룰셋에 없는 그룹 룰 [에러 문자열] (compile된 groups 기준)
+    """
+    return [f"incident group {spec['name']}: rule {channel}/{name} is not in the ruleset"
+            for spec in groups for channel, name in spec["rules"] if (channel, name) not in rule_keys]
+
+
+class IncidentCorrelator:
+    def __init__(self, groups, sample_chars: int = 200, rule_keys=None):
+        """
+        groups: INCIDENT_GROUPS (compile_groups로 검증)
+        rule_keys: 룰셋의 (channel, rule name) 집합 (없는 그룹 룰은 ValueError)
+        """
+        self.groups = compile_groups(groups, rule_keys)
+        self.sample_chars = sample_chars
+        self._by_rule = {}
+        self._by_name = {}
+        self._states = []
+        for spec in self.groups:
+            state = self._by_name[spec["name"]] = _Group(spec)
+            self._states.append(state)
+            for rule in spec["rules"]:
+                self._by_rule[rule] = state
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def unknown_rules(self, rule_keys):
+        """
+        리로드 전 검증: 새 룰셋에 없는 그룹 룰 [에러 문자열]
+        """
+        return unknown_rules(self.groups, rule_keys)
+
+    def observe(self, rule_key, text: str, now_ts: float):
+        """
+        트리거 1건 (rule_key = (channel, rule name)). 반환: ("open", spec, incident) / ("fold", spec, incident) / None(그룹 밖이거나 아직 k개 미만)
+        "open"을 받은 쪽은 묶음 알림을 못 보내면 discard()로 되돌린다.
+        """
+        state = self._by_rule.get(rule_key)
+        if state is None:
+            return None
+        spec = state.spec
+        within = spec["within_seconds"]
+        with state.lock:
+            now = state.clock = max(now_ts, state.clock)
+            incident = state.incident
+            if incident is not None:
+                if self._is_open(spec, incident, now):
+                    incident.last_ts = now
+                    incident.rules[rule_key] = incident.rules.get(rule_key, 0) + 1
+                    return "fold", spec, incident
+                state.incident = None
+                self._log_closed(incident)
+
+            recent = state.recent
+            recent[rule_key] = now
+            recent.move_to_end(rule_key)
+            since = now - within
+            while recent:
+                key = next(iter(recent))
+                if recent[key] >= since:
+                    break
+                del recent[key]
+            if len(recent) < spec["min_rules"]:
+                return None
+
+            started = next(iter(recent.values()))
+            incident = _Incident(spec["name"], started, now, dict.fromkeys(recent, 1), self._sample(text))
+            recent.clear()
+            state.incident = incident
+            return "open", spec, incident
+
+    def discard(self, incident):
+        """
+        묶음 알림을 못 보낸 incident를 닫는다 (다음 트리거부터 다시 개별 알림/묶기)
+        """
+        state = self._by_name[incident.group]
+        with state.lock:
+            if state.incident is incident:
+                state.incident = None
+
+    def reset(self):
+        """
+        mute/unmute 시
+        """
+        for state in self._states:
+            with state.lock:
+                state.recent.clear()
+                state.incident = None
+
+    def open_incidents(self, now_ts: float):
+        """
+        지금 열려 있는 incident [(그룹 이름, incident)] (닫기는 다음 트리거 때라 시각으로 거른다)
+        """
+        out = []
+        for state in self._states:
+            with state.lock:
+                incident = state.incident
+                if incident is not None and self._is_open(state.spec, incident, now_ts):
+                    out.append((state.spec["name"], incident))
+        return out
+
+    @staticmethod
+    def _is_open(spec: dict, incident, now_ts: float) -> bool:
+        return (now_ts - incident.last_ts <= spec["within_seconds"]
+                and now_ts - incident.opened <= spec["max_open_seconds"])
+
+    def _sample(self, text: str) -> str:
+        line = (text or "").strip().split("\n", 1)[0]
+        if len(line) > self.sample_chars:
+            line = line[:self.sample_chars] + "…"
+        return line
+
+    @staticmethod
+    def _log_closed(incident):
+        folded = sum(incident.rules.values()) - len(incident.rules)
+        print(f"[INCIDENT_CLOSED] group={incident.group} rules={rule_names(incident, ',')} "
+              f"folded={folded} lasted={incident.last_ts - incident.opened:.0f}s")
+
+
+def rule_names(incident, sep: str = ", ") -> str:
+    return sep.join(name for _channel, name in incident.rules)
+
+
+def render_incident(spec: dict, incident) -> str:
+    first = time.strftime("%H:%M:%S", time.localtime(incident.started))
+    opened = time.strftime("%H:%M:%S", time.localtime(incident.opened))
+    within = spec["within_seconds"]
+    lines = [
+        spec.get("text") or f"{spec['name']} 그룹 룰이 동시에 트리거되었습니다.",
+        f"동시 트리거 {len(incident.rules)}개 룰: {rule_names(incident)} ({first} ~ {opened}, {within:.0f}초 안)",
+        f"이후 {within:.0f}초 안의 같은 그룹 트리거는 개별 알림 대신 보류 요약으로 보냅니다 "
+        f"(최대 {spec['max_open_seconds']:.0f}초, 그 뒤 계속되면 다시 알림).",
+    ]
+    if incident.sample:
+        lines.append(f"> {incident.sample}")
+    return "\n".join(lines)
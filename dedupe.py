@@ -0,0 +1,92 @@
+"""
+Slack 이벤트 중복 제거
+
+봇 응답(ack)이 늦으면 Slack이 같은 이벤트를 재전송한다.
+최근 본 event_id / client_msg_id / (channel, ts) 키를 TTL + LRU 캐시에 두고
+이미 본 이벤트면 카운팅 전에 버린다.
+- 조회/기록 O(1), 최대 maxsize 키 (메모리 고정)
+- hit/miss 카운터로 재전송 빈도 확인
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+def event_dedupe_keys(body, event):
+    """
+    이벤트를 식별할 수 있는 키 목록 (없는 값은 건너뜀)
+    """
+    keys = []
+    event_id = body.get("event_id")
+    if event_id:
+        keys.append(("event_id", event_id))
+    client_msg_id = event.get("client_msg_id")
+    if client_msg_id:
+        keys.append(("client_msg_id", client_msg_id))
+    ts = event.get("ts")
+    if ts:
+        keys.append(("ts", event.get("channel"), ts))
+    return keys
+
+
+class DedupeCache:
+    def __init__(self, maxsize: int = 10000, ttl_seconds: float = 600.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> expires_at (만료 시각 오름차순 유지)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def seen(self, keys) -> bool:
+        """
+        keys 중 하나라도 최근에 본 적 있으면 True(중복).
+        어느 쪽이든 keys 전부를 지금 시각 기준으로 갱신/기록한다.
+        """
+        if not keys:
+            return False
+
+        with self._lock:
+            now = self.clock()
+            entries = self._entries
+
+            # 만료된 것부터 앞에서 정리 (만료 시각 순서라 앞쪽만 보면 됨)
+            while entries and entries[next(iter(entries))] <= now:
+                entries.popitem(last=False)
+
+            duplicate = False
+            expires_at = now + self.ttl_seconds
+            for key in keys:
+                if key in entries:
+                    duplicate = True
+                    entries.move_to_end(key)
+                entries[key] = expires_at
+
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+            if duplicate:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return duplicate
+
+    def keys(self):
+        """
+        아직 만료되지 않은 키 목록 (무중단 재시작 때 다음 프로세스에 넘김)
+        """
+        with self._lock:
+            now = self.clock()
+            return [key for key, expires_at in self._entries.items() if expires_at > now]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,264 @@
+"""
+감지 코어
+
+채널 인덱스(채널 -> 룰/매처)로 메시지 1건의 룰별 hit를 구하고, 윈도우 카운트는
+백엔드(backend.py)에 맡겨 threshold를 넘은 룰에 대해 on_trigger(rule, event)를 호출한다.
+history(history.RuleHistory)가 있으면 같은 hit를 분/시간 단위 이력에도 더한다 (/errstats).
+fingerprints(fingerprint.FingerprintTracker)가 있으면 hit 난 이벤트의 에러 시그니처를 룰별로 센다.
+Slack에 의존하지 않으므로 벤치/리플레이에서도 그대로 쓴다.
+
+동시성
+- (channel, rule) 키별 원자성은 백엔드가 보장한다 (MemoryBackend: 키별 락,
+  RedisBackend: INCRBY + SET NX). 같은 룰에 대한 동시 이벤트가 중복 발사되거나
+  카운트를 잃지 않는다.
+- muted는 락 없이 읽는다(단순 속성 읽기는 GIL 하에서 원자적).
+- on_trigger는 키 락을 놓은 뒤 호출한다.
+- 룰 교체(swap)는 채널별 컴파일 결과 dict 1개를 통째로 바꾼다. process는 시작할 때 한 번만 읽으므로
+  이벤트 처리를 멈추지 않고, 처리 중인 이벤트는 이전 룰셋으로 끝까지 간다.
+"""
+import time
+from collections import defaultdict, namedtuple
+from types import MappingProxyType
+
+from baseline import AdaptiveThresholds
+from fingerprint import FINGERPRINT_KEY
+from matcher import KeywordMatcher, rule_counter
+
+# --------------------------------------------------------
+# 채널 -> 룰 인덱스 (시작 시 1회 생성, 이후 읽기 전용)
+# --------------------------------------------------------
+ChannelRules = namedtuple("ChannelRules", ["rules", "matcher", "absent", "keys", "counters", "adaptive"])
+
+
+def build_channel_index(rules):
+    """
+    channel -> ChannelRules(룰 tuple, KeywordMatcher, absent 플래그 tuple, (channel, rule name) 키 tuple,
+                            pattern/field 룰의 hit 계산 함수 tuple - keyword 룰은 None,
+                            adaptive 룰의 AdaptiveSpec tuple - 고정 threshold 룰은 None)
+    - 룰 순서는 RULES 순서를 그대로 유지한다.
+    - match="absent" 룰은 keyword가 없는 메시지 1건을 hit 1로 센다.
+    - 같은 채널에 같은 이름 룰이 있으면 키를 공유한다(기존 동작).
+    - pattern/field 룰의 keyword는 필수 리터럴: keyword가 나온 메시지에서만 정규식을 돌린다.
+    """
+    by_channel = defaultdict(list)
+    for rule in rules:
+        by_channel[rule["channel"]].append(rule)
+
+    return MappingProxyType({
+        channel: ChannelRules(
+            rules=tuple(ch_rules),
+            matcher=KeywordMatcher([r["keyword"] for r in ch_rules]),
+            absent=tuple(r.get("match") == "absent" for r in ch_rules),
+            keys=tuple((channel, r["name"]) for r in ch_rules),
+            counters=tuple(rule_counter(r) for r in ch_rules),
+            adaptive=tuple(r.get("adaptive") for r in ch_rules),
+        )
+        for channel, ch_rules in by_channel.items()
+    })
+
+
+class Detector:
+    def __init__(self, channel_index, on_trigger, backend, clock=time.time, metrics=None, history=None,
+                 fingerprints=None):
+        """
+        backend: backend.MemoryBackend / backend.RedisBackend (윈도우 카운트, mute 보관)
+        metrics: metrics.BotMetrics (선택) - 룰별 hit 카운터를 미리 만들어 둔다
+        history: history.RuleHistory (선택) - 룰별 hit 이력
+        fingerprints: fingerprint.FingerprintTracker (선택) - 룰별 반복 로그 시그니처
+        """
+        self.on_trigger = on_trigger
+        self.backend = backend
+        self.clock = clock
+        self.metrics = metrics
+        self.history = history
+        self.fingerprints = fingerprints
+
+        # adaptive 룰의 EWMA 기준선 (구간 = 윈도우 길이)
+        self.adaptive = AdaptiveThresholds(backend.window_seconds)
+
+        self.channel_index = channel_index
+        self._compiled = self._compile(channel_index)
+
+    def _compile(self, channel_index):
+        """
+        channel -> (ChannelRules, 룰 hit 카운터 tuple). 새 키는 백엔드에 먼저 등록한다.
+        """
+        backend_keys = {key for entry in channel_index.values() for key in entry.keys}
+        self.backend.register_keys(backend_keys)
+        if self.history is not None:
+            self.history.register_keys(backend_keys)
+        metrics = self.metrics
+        return {
+            channel: (entry, tuple(metrics.rule_hits.labels(*key) if metrics else None for key in entry.keys))
+            for channel, entry in channel_index.items()
+        }
+
+    def swap(self, channel_index, reset_keys=()):
+        """
+        새 채널 인덱스로 교체. 키가 같은 룰은 윈도우 카운트를 그대로 이어서 쓰고,
+        reset_keys(의미가 바뀌었거나 빠진 룰)는 초기화한다.
+        """
+        compiled = self._compile(channel_index)
+        if reset_keys:
+            self.backend.reset(self.clock(), keys=reset_keys)
+            self.adaptive.reset(reset_keys)
+        self.channel_index = channel_index
+        self._compiled = compiled
+
+    @property
+    def muted(self) -> bool:
+        return self.backend.muted
+
+    def set_muted(self, muted: bool):
+        self.backend.set_muted(muted)
+
+    # ----------------------------------------------------
+    # 감지
+    # ----------------------------------------------------
+    def process(self, event):
+        matched = self.match(event)
+        if matched is not None:
+            self.apply(event, *matched)
+
+    def match(self, event, compiled_index=None):
+        """
+        룰별 hit 계산 (백엔드 반영 전). hit가 없으면 None
+        compiled_index: 일부 룰만 볼 때 subset()의 결과 (기본은 전체 룰)
+        반환: (hit 난 룰 list, [(key, hits, threshold)], now_ts)
+        """
+        # ✅ mute 중엔 카운팅도 하지 않음(누적 방지)
+        if self.backend.muted:
+            return None
+
+        channel = event.get("channel")
+        compiled = (self._compiled if compiled_index is None else compiled_index).get(channel)
+        if compiled is None:
+            return None
+        entry, counters = compiled
+
+        text = (event.get("text") or "")
+
+        # RULES 기반 감지: 채널 매처로 한 번에 룰별 hit 계산
+        hit_counts = entry.matcher.counts(text)
+
+        hit_rules = []
+        items = []
+        now_ts = None
+        for rule, hits, absent, key, counter, count_fn, spec in zip(
+                entry.rules, hit_counts, entry.absent, entry.keys, counters, entry.counters, entry.adaptive):
+            # 정규식/필드 룰: 리터럴(keyword)이 있는 메시지에서만 실제 매치 수를 센다
+            if hits and count_fn is not None:
+                hits = count_fn(text)
+            if absent:
+                hits = 0 if hits else 1
+            if hits <= 0:
+                continue
+            if counter is not None:
+                counter.inc(hits)
+            # 한 메시지에서 여러 번 등장하면 그 횟수만큼 한 번에 더함
+            hit_rules.append(rule)
+            threshold = rule["threshold"]
+            if spec is not None:
+                # 적응형: 기준선 학습 + 유효 threshold (warmup 전에는 고정 threshold)
+                if now_ts is None:
+                    now_ts = self.clock()
+                threshold = self.adaptive.threshold_for(key, spec, threshold, hits, now_ts)
+            items.append((key, hits, threshold))
+
+        if not items:
+            return None
+        return hit_rules, items, self.clock() if now_ts is None else now_ts
+
+    def apply(self, event, hit_rules, items, now_ts):
+        """
+        hit 난 룰 전부를 백엔드에 한 번에 반영 (Redis면 왕복 1회) 후 threshold 넘은 룰 발사
+        """
+        fired = self.backend.record_hits(now_ts, items)
+        if self.history is not None:
+            self.history.record(now_ts, items)
+        fp = None
+        if self.fingerprints is not None:
+            fp = self.fingerprints.record(event.get("text") or "", items, now_ts)
+        self._fire(event, hit_rules, fired, fp)
+
+    def _fire(self, event, hit_rules, fired, fp):
+        """
+        threshold 넘은 룰 발사. fingerprint는 트리거 event에 실어 보냄 (알림 쪽에서 다시 계산하지 않음)
+        """
+        for rule, hit in zip(hit_rules, fired):
+            if hit:
+                if fp is not None and FINGERPRINT_KEY not in event:
+                    event = dict(event, **{FINGERPRINT_KEY: fp})
+                self.on_trigger(rule, event)
+
+    def process_subset(self, event, compiled_index):
+        """
+        subset()으로 고른 룰만 센다 (수신 큐 과부하 모드)
+        """
+        matched = self.match(event, compiled_index)
+        if matched is not None:
+            self.apply(event, *matched)
+
+    def subset(self, keys):
+        """
+        keys에 든 룰만 남긴 channel -> (ChannelRules, 룰 hit 카운터) (백엔드 키 등록 없음, 지금 룰셋 기준)
+        """
+        out = {}
+        for channel, (entry, counters) in self._compiled.items():
+            picked = [i for i, key in enumerate(entry.keys) if key in keys]
+            if not picked:
+                continue
+            rules = tuple(entry.rules[i] for i in picked)
+            out[channel] = (
+                ChannelRules(
+                    rules=rules,
+                    matcher=KeywordMatcher([r["keyword"] for r in rules]),
+                    absent=tuple(entry.absent[i] for i in picked),
+                    keys=tuple(entry.keys[i] for i in picked),
+                    counters=tuple(entry.counters[i] for i in picked),
+                    adaptive=tuple(entry.adaptive[i] for i in picked),
+                ),
+                tuple(counters[i] for i in picked),
+            )
+        return out
+
+    def process_traced(self, event, trace):
+        """
+        process()와 같은 처리를 단계별로 재면서 (tracer.py, 샘플링된 이벤트만)
+        """
+        matched = self.match(event)
+        trace.mark("match")
+        if matched is None:
+            return
+        hit_rules, items, now_ts = matched
+        fired = self.backend.record_hits_traced(now_ts, items, trace)
+        if self.history is not None:
+            self.history.record(now_ts, items)
+        trace.mark("window")
+        fp = None
+        if self.fingerprints is not None:
+            fp = self.fingerprints.record(event.get("text") or "", items, now_ts)
+            trace.mark("fingerprint")
+        self._fire(event, hit_rules, fired, fp)
+        trace.mark("send")
+
+    # ----------------------------------------------------
+    # 상태
+    # ----------------------------------------------------
+    def reset(self):
+        """
+        모든 윈도우 카운트 초기화 (mute/unmute)
+        """
+        self.backend.reset(self.clock())
+
+    def threshold(self, rule) -> int:
+        """
+        룰의 지금 유효 threshold (adaptive가 아니면 고정값)
+        """
+        spec = rule.get("adaptive")
+        if spec is None:
+            return rule["threshold"]
+        return self.adaptive.current((rule["channel"], rule["name"]), spec, rule["threshold"])
+
+    def window_count(self, channel, rule_name, now_ts: float = None) -> int:
+        return self.backend.window_count((channel, rule_name), self.clock() if now_ts is None else now_ts)
@@ -0,0 +1,117 @@
+"""
+발언 제한으로 보류된 트리거 요약
+
+발언 제한(rate_limit.py)에 걸린 트리거를 버리지 않고 (channel, rule)별 집계 1개로 접어 둔다.
+- 집계: 횟수, 처음/마지막 시각, 마지막 로그 일부(sample_chars까지)
+- 원본 이벤트는 들고 있지 않으므로 메모리는 룰 수에 비례
+- 봇이 다음에 발언 가능해지면 수신 채널별 요약 메시지로 한 번에 보낸다 (ErrorBot.flush_digest)
+"""
+import threading
+import time
+
+
+class _Pending:
+    __slots__ = ("rule", "count", "first_ts", "last_ts", "sample")
+
+    def __init__(self, rule, now_ts: float, sample: str):
+        self.rule = rule
+        self.count = 1
+        self.first_ts = now_ts
+        self.last_ts = now_ts
+        self.sample = sample
+
+    def merge(self, other):
+        self.count += other.count
+        if other.first_ts < self.first_ts:
+            self.first_ts = other.first_ts
+        if other.last_ts >= self.last_ts:
+            self.last_ts = other.last_ts
+            self.sample = other.sample
+
+
+class SuppressedDigest:
+    def __init__(self, sample_chars: int = 200):
+        self.sample_chars = sample_chars
+        self._lock = threading.Lock()
+        self._pending = {}  # (channel, rule name) -> _Pending
+
+    def _sample(self, text: str) -> str:
+        line = (text or "").strip().split("\n", 1)[0]
+        if len(line) > self.sample_chars:
+            line = line[:self.sample_chars] + "…"
+        return line
+
+    def add(self, rule, event, now_ts: float):
+        key = (rule["channel"], rule["name"])
+        sample = self._sample(event.get("text", ""))
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = _Pending(rule, now_ts, sample)
+            else:
+                pending.rule = rule
+                pending.count += 1
+                pending.last_ts = now_ts
+                pending.sample = sample
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def pending_triggers(self) -> int:
+        with self._lock:
+            return sum(p.count for p in self._pending.values())
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+
+    # ----------------------------------------------------
+    # flush
+    # ----------------------------------------------------
+    def drain(self, max_messages: int):
+        """
+        수신 채널(룰의 첫 번째 notify 채널)별로 묶어 가장 오래 기다린 묶음부터 max_messages개를 꺼낸다.
+        반환: [(target_channel, [_Pending, ...]), ...] / 나머지는 다음 flush까지 남김
+        """
+        with self._lock:
+            groups = {}
+            for key, pending in self._pending.items():
+                notify = pending.rule.get("notify") or ()
+                if not notify:
+                    continue
+                groups.setdefault(notify[0]["channel"], []).append((key, pending))
+
+            picked = sorted(groups.items(), key=lambda g: min(p.first_ts for _k, p in g[1]))[:max_messages]
+            out = []
+            for target, items in picked:
+                for key, _pending in items:
+                    del self._pending[key]
+                out.append((target, sorted((p for _k, p in items), key=lambda p: p.first_ts)))
+            return out
+
+    def restore(self, groups):
+        """
+        전송 실패한 묶음을 되돌려 놓는다 (그 사이 쌓인 집계와 합침)
+        """
+        with self._lock:
+            for _target, items in groups:
+                for pending in items:
+                    key = (pending.rule["channel"], pending.rule["name"])
+                    current = self._pending.get(key)
+                    if current is None:
+                        self._pending[key] = pending
+                    else:
+                        current.merge(pending)
+
+
+def render_digest(prefix: str, items) -> str:
+    total = sum(p.count for p in items)
+    lines = [f"{prefix} 발언 제한/묶음 incident로 보류된 알림 요약 ({len(items)}개 룰, {total}회)"]
+    for p in items:
+        first = time.strftime("%H:%M:%S", time.localtime(p.first_ts))
+        last = time.strftime("%H:%M:%S", time.localtime(p.last_ts))
+        span = first if p.count == 1 else f"{first} ~ {last}"
+        lines.append(f"• {p.rule['name']} x{p.count} ({span})")
+        if p.sample:
+            lines.append(f"> {p.sample}")
+    return "\n".join(lines)
@@ -0,0 +1,100 @@
+"""
+메시지 본문 추출
+
+Datadog/Sentry 같은 알림 봇은 에러 내용을 text가 아니라 attachments/blocks에 넣는다.
+event의 text + attachments + blocks(rich_text 포함)를 한 버퍼로 이어 붙여 모든 룰이 한 번만 스캔하게 한다.
+
+비용 상한 (페이로드가 아무리 커도)
+- 글자 수: attachments/blocks에서는 max_chars까지만 모으고 멈춘다 (마지막 조각은 잘라서 넣음)
+  메시지 text는 자르지 않는다 (20K 뒤의 keyword도 센다). 과부하 모드처럼 전체를 max_chars로 묶으려면 clip_text=True
+- 노드 수: dict/list/문자열을 max_nodes개까지만 방문한다 (작은 조각이 수만 개인 경우)
+- 재귀 없이 스택으로 순회 (깊게 중첩된 페이로드에서도 RecursionError 없음)
+
+중복 방지
+- 사람이 쓴 메시지의 rich_text 블록은 text와 같은 내용이므로 text가 있으면 건너뜀
+- attachment의 fallback은 다른 내용이 없을 때만 사용
+- Slack이 미러링한 조각만 건너뜀: 메시지 text와 똑같은 attachment/block 조각(text == section 블록 등),
+  attachment 하나 안에서 반복되는 조각. 서로 다른 attachment의 같은 내용은 그대로 둔다 (같은 에러 xN = N hit)
+"""
+
+# attachment / block / 요소에서 글자(문자열 또는 {"type": "mrkdwn", "text": ...})를 꺼낼 키
+_TEXT_KEYS = frozenset(("pretext", "author_name", "title", "text", "value", "footer"))
+# 하위 노드 목록을 담는 키
+_CHILD_KEYS = frozenset(("fields", "elements", "blocks"))
+
+
+def _has_content(attachment: dict) -> bool:
+    return any(value for key, value in attachment.items() if key in _TEXT_KEYS or key in _CHILD_KEYS)
+
+
+def event_text(event: dict, max_chars: int, max_nodes: int, clip_text: bool = False) -> str:
+    """
+    감지용 본문 버퍼: 메시지 text 전체 + attachments/blocks에서 모은 글자 (max_chars까지)
+    attachments/blocks가 없으면 event["text"]를 그대로(같은 객체) 돌려준다.
+    clip_text=True면 text까지 합쳐 max_chars로 자른다 (과부하 모드)
+    """
+    text = event.get("text") or ""
+    if clip_text and len(text) > max_chars:
+        text = text[:max_chars]
+    attachments = event.get("attachments")
+    blocks = event.get("blocks")
+    if text and blocks and all(isinstance(b, dict) and b.get("type") == "rich_text" for b in blocks):
+        blocks = None
+    if not attachments and not blocks:
+        return text
+
+    roots = []
+    for attachment in attachments or ():
+        if isinstance(attachment, dict) and not _has_content(attachment):
+            roots.append(attachment.get("fallback"))
+        else:
+            roots.append(attachment)
+    for block in blocks or ():
+        if not (text and isinstance(block, dict) and block.get("type") == "rich_text"):
+            roots.append(block)
+
+    # 중복 검사는 조각이 나온 root(attachment 하나 / block 하나) 안에서만 + 메시지 text의 미러
+    # (서로 다른 attachment에 같은 에러가 N번 들어 있으면 N번 센다)
+    head = text.strip()
+    parts, seen = ([head] if head else []), {}  # root 번호 -> 넣은 조각
+    remaining = max_chars - (len(head) + 1 if clip_text and head else 0)
+    nodes = 0
+    stack = list(enumerate(roots))[::-1]
+    while stack and remaining > 0 and nodes < max_nodes:
+        root, node = stack.pop()
+        nodes += 1
+        if isinstance(node, str):
+            piece = node.strip()
+            if not piece or piece == head:
+                continue
+            piece = piece[:remaining]
+            done = seen.setdefault(root, set())
+            if piece in done:
+                continue
+            done.add(piece)
+            parts.append(piece)
+            remaining -= len(piece) + 1
+        elif isinstance(node, dict):
+            # 페이로드의 키 순서대로. 하위 목록은 남은 노드 수만큼만 쌓는다
+            children = []
+            for key, value in node.items():
+                if key in _TEXT_KEYS:
+                    if isinstance(value, (str, dict)):
+                        children.append(value)
+                elif key in _CHILD_KEYS and isinstance(value, list):
+                    children.extend(value[:max_nodes - nodes])
+            if not children and node.get("type") == "link":
+                children.append(node.get("url"))
+            stack.extend((root, child) for child in reversed(children))
+        elif isinstance(node, list):
+            stack.extend((root, child) for child in reversed(node[:max_nodes - nodes]))
+    return "\n".join(parts)
+
+
+def truncate_log(text: str, max_chars: int) -> str:
+    """
+    Slack 메시지 길이에 맞춰 자름 (잘린 글자 수 표시)
+    """
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}\n… ({len(text) - max_chars}자 생략)"
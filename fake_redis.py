@@ -0,0 +1,100 @@
+"""
+로컬 Redis 대역 (프로세스 내)
+
+RedisBackend가 쓰는 명령만 redis-py와 같은 시그니처로 구현한다.
+여러 RedisBackend 인스턴스가 FakeRedis 하나를 공유하면 "인스턴스 여러 개"를 흉내 낼 수 있다.
+(벤치/리플레이용. 실제 배포에는 redis.Redis를 넘긴다)
+"""
+import threading
+import time
+
+
+class FakeRedis:
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._data = {}     # key -> str
+        self._expires = {}  # key -> 만료 시각
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------
+    # internal
+    # ----------------------------------------------------
+    def _alive_locked(self, key) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= self.clock():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+            return False
+        return key in self._data
+
+    # ----------------------------------------------------
+    # commands
+    # ----------------------------------------------------
+    def get(self, key):
+        with self._lock:
+            return self._data[key] if self._alive_locked(key) else None
+
+    def mget(self, keys):
+        with self._lock:
+            return [self._data[k] if self._alive_locked(k) else None for k in keys]
+
+    def set(self, key, value, nx: bool = False, ex=None):
+        with self._lock:
+            if nx and self._alive_locked(key):
+                return None
+            self._data[key] = str(value)
+            if ex is not None:
+                self._expires[key] = self.clock() + ex
+            else:
+                self._expires.pop(key, None)
+            return True
+
+    def incrby(self, key, amount: int = 1):
+        with self._lock:
+            current = int(self._data[key]) if self._alive_locked(key) else 0
+            current += amount
+            self._data[key] = str(current)
+            return current
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if not self._alive_locked(key):
+                return False
+            self._expires[key] = self.clock() + seconds
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive_locked(key):
+                    removed += 1
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return removed
+
+    def pipeline(self, transaction: bool = True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """
+    명령을 모았다가 execute()에서 순서대로 실행 (왕복 1번에 해당)
+    """
+
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
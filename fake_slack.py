@@ -0,0 +1,452 @@
+"""
+로컬 가짜 Slack (Web API + Socket Mode) - 토큰/워크스페이스 없이 app.py를 끝까지 돌려 보기 위한 서버
+
+    python fake_slack.py --port 3001 --latency-ms 50
+    SLACK_API_URL=http://127.0.0.1:3001/api/ SLACK_BOT_TOKEN=xoxb-fake SLACK_APP_TOKEN=xapp-fake python app.py
+
+- Web API (http://host:port/api/<method>)
+    auth.test, apps.connections.open, chat.postMessage, files.getUploadURLExternal/completeUploadExternal/info
+    그 밖의 메서드는 {"ok": true}
+    응답 지연(latency_seconds), chat.postMessage 오류(error_rate: HTTP 500)와 429(ratelimit_rate, Retry-After) 주입
+- Socket Mode (ws://host:port/link/): apps.connections.open이 알려주는 주소
+    hello 후 push()한 envelope(events_api / slash_commands)를 연결들에 돌아가며 보내고 ack 시각을 기록
+    slash command의 response_url도 이 서버(/response/<n>)로 받는다
+
+표준 라이브러리(asyncio)만 쓴다. 부하 측정은 loadtest.py 참고.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import random
+import struct
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests",
+                500: "Internal Server Error"}
+
+BOT_USER_ID = "UFAKEBOT"
+BOT_ID = "BFAKEBOT"
+TEAM_ID = "TFAKE"
+APP_ID = "AFAKE"
+
+
+def event_body(n: int, channel: str, text: str, user: str = "UALERTBOT", ts: float = None) -> dict:
+    """
+    Events API 봉투 (Socket Mode events_api payload)
+    """
+    ts = time.time() if ts is None else ts
+    return {
+        "token": "fake",
+        "team_id": TEAM_ID,
+        "api_app_id": APP_ID,
+        "type": "event_callback",
+        "event_id": f"Ev{n:010d}",
+        "event_time": int(ts),
+        "event": {"type": "message", "channel": channel, "user": user, "text": text, "ts": f"{ts:.6f}",
+                  "client_msg_id": f"fake-{n}"},
+    }
+
+
+# --------------------------------------------------------
+# WebSocket 프레임 (RFC 6455, 서버 쪽: 보내는 프레임은 마스크 없음)
+# --------------------------------------------------------
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+async def _ws_read(reader):
+    """
+    반환: (opcode, payload) - 조각난 메시지는 이어 붙인다
+    """
+    chunks = []
+    first_opcode = None
+    while True:
+        b1, b2 = await reader.readexactly(2)
+        fin, opcode = b1 & 0x80, b1 & 0x0F
+        n = b2 & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", await reader.readexactly(8))[0]
+        mask = await reader.readexactly(4) if b2 & 0x80 else None
+        data = await reader.readexactly(n)
+        if mask:
+            data = bytes(b ^ mask[i & 3] for i, b in enumerate(data))
+        if opcode >= 0x8:  # 제어 프레임은 조각 사이에도 올 수 있음
+            return opcode, data
+        if first_opcode is None:
+            first_opcode = opcode
+        chunks.append(data)
+        if fin:
+            return first_opcode, b"".join(chunks)
+
+
+class _Connection:
+    def __init__(self, cid: int, writer):
+        self.cid = cid
+        self.writer = writer
+        self.sent = 0
+        self.closed = False
+
+    def send_text(self, text: str):
+        self.writer.write(_ws_frame(0x1, text.encode()))
+        self.sent += 1
+
+
+class FakeSlackServer:
+    """
+    latency_seconds: Web API 응답 지연
+    error_rate / ratelimit_rate: chat.postMessage(fault_methods)가 500 / 429로 실패할 확률
+    clock: 기록 시각 (push/ack/post 지연 계산용)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_seconds: float = 0.0,
+                 error_rate: float = 0.0, ratelimit_rate: float = 0.0, retry_after: int = 1,
+                 fault_methods=("chat.postMessage",), seed: int = 0, clock=time.monotonic):
+        self.host = host
+        self.port = port
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.ratelimit_rate = ratelimit_rate
+        self.retry_after = retry_after
+        self.fault_methods = frozenset(fault_methods)
+        self.clock = clock
+        self._rnd = random.Random(seed)
+        self._server = None
+        self._tasks = set()  # 연결 처리 task (close에서 정리)
+        self._ids = itertools.count(1)
+
+        self.connections = []
+        self._next_conn = 0
+        self._connected = asyncio.Event()
+        self._pending = []  # 연결 전에 push된 envelope
+
+        self.pushed = {}  # envelope_id -> push 시각
+        self.acks = {}  # envelope_id -> ack 시각
+        self.ack_payloads = {}  # envelope_id -> 응답 payload (slash command 등)
+        self.posts = []  # {"t", "method", "channel", "text"} (chat.postMessage / 파일 업로드 / response_url)
+        self.calls = {}  # (method, status) -> 횟수
+        self._uploads = {}  # file_id -> 업로드된 본문
+
+    # ----------------------------------------------------
+    # 서버
+    # ----------------------------------------------------
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self):
+        for conn in self.connections:
+            if not conn.closed:
+                conn.writer.close()
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    @property
+    def api_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/"
+
+    async def wait_connected(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self._serve_socket(reader, writer, headers)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload, extra = await self._route(path, headers, body)
+                self._write_response(writer, status, payload, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self._tasks.discard(task)
+
+    @staticmethod
+    async def _read_request(reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, _version = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0) or 0)
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    @staticmethod
+    def _write_response(writer, status: int, payload, extra: dict, keep_alive: bool):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        ctype = "text/plain" if isinstance(payload, bytes) else "application/json; charset=utf-8"
+        head = [f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, 'OK')}", f"Content-Type: {ctype}",
+                f"Content-Length: {len(data)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head.extend(f"{k}: {v}" for k, v in extra.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+
+    # ----------------------------------------------------
+    # Web API
+    # ----------------------------------------------------
+    @staticmethod
+    def _params(path: str, headers: dict, body: bytes) -> dict:
+        parts = urlsplit(path)
+        params = dict(parse_qsl(parts.query))
+        ctype = headers.get("content-type", "")
+        if body and ctype.startswith("application/json"):
+            params.update(json.loads(body))
+        elif body and ctype.startswith("application/x-www-form-urlencoded"):
+            params.update(parse_qsl(body.decode()))
+        return params
+
+    def _count(self, method: str, status: int):
+        key = (method, status)
+        self.calls[key] = self.calls.get(key, 0) + 1
+
+    async def _route(self, path: str, headers: dict, body: bytes):
+        route = urlsplit(path).path
+        if route.startswith("/upload/"):
+            self._uploads[route[len("/upload/"):]] = body.decode("utf-8", "replace")
+            self._count("upload", 200)
+            return 200, b"OK", {}
+        if route.startswith("/response/"):
+            params = self._params(path, headers, body)
+            self.posts.append({"t": self.clock(), "method": "response_url", "channel": None,
+                               "text": params.get("text", "")})
+            self._count("response_url", 200)
+            return 200, b"ok", {}
+        if not route.startswith("/api/"):
+            return 404, {"ok": False, "error": "unknown_url"}, {}
+
+        method = route[len("/api/"):]
+        params = self._params(path, headers, body)
+        if self.latency_seconds > 0:
+            await asyncio.sleep(self.latency_seconds)
+        if method in self.fault_methods:
+            roll = self._rnd.random()
+            if roll < self.ratelimit_rate:
+                self._count(method, 429)
+                return 429, {"ok": False, "error": "ratelimited"}, {"Retry-After": str(self.retry_after)}
+            if roll < self.ratelimit_rate + self.error_rate:
+                self._count(method, 500)
+                return 500, {"ok": False, "error": "internal_error"}, {}
+        self._count(method, 200)
+        return 200, self._api(method, params), {}
+
+    def _api(self, method: str, params: dict) -> dict:
+        if method == "auth.test":
+            return {"ok": True, "url": "https://fake.slack.local/", "team": "fake", "user": "errbot",
+                    "team_id": TEAM_ID, "user_id": BOT_USER_ID, "bot_id": BOT_ID}
+        if method == "apps.connections.open":
+            return {"ok": True, "url": f"ws://{self.host}:{self.port}/link/?ticket={next(self._ids)}"}
+        if method == "chat.postMessage":
+            self.posts.append({"t": self.clock(), "method": method, "channel": params.get("channel"),
+                               "text": params.get("text", "")})
+            return {"ok": True, "channel": params.get("channel"), "ts": f"{time.time():.6f}"}
+        if method == "files.getUploadURLExternal":
+            file_id = f"F{next(self._ids):08d}"
+            return {"ok": True, "file_id": file_id, "upload_url": f"http://{self.host}:{self.port}/upload/{file_id}"}
+        if method == "files.completeUploadExternal":
+            files = params.get("files") or []
+            if isinstance(files, str):
+                files = json.loads(files)
+            content = "\n".join(self._uploads.pop(f["id"], "") for f in files)
+            self.posts.append({"t": self.clock(), "method": method, "channel": params.get("channel_id"),
+                               "text": f"{params.get('initial_comment', '')}\n{content}"})
+            return {"ok": True, "files": [{"id": f["id"], "title": f.get("title")} for f in files]}
+        if method == "files.info":
+            return {"ok": True, "file": {"id": params.get("file")}}
+        return {"ok": True}
+
+    # ----------------------------------------------------
+    # Socket Mode
+    # ----------------------------------------------------
+    async def _serve_socket(self, reader, writer, headers: dict):
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + _WS_GUID).encode()).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        conn = _Connection(next(self._ids), writer)
+        self.connections.append(conn)
+        conn.send_text(json.dumps({"type": "hello", "num_connections": self.live_connections(),
+                                   "debug_info": {"host": "fake-slack"}, "connection_info": {"app_id": APP_ID}}))
+        pending, self._pending = self._pending, []
+        for text in pending:
+            conn.send_text(text)
+        self._connected.set()
+        try:
+            while True:
+                opcode, data = await _ws_read(reader)
+                if opcode == 0x8:
+                    writer.write(_ws_frame(0x8, data[:2]))
+                    break
+                if opcode == 0x9:
+                    writer.write(_ws_frame(0xA, data))
+                elif opcode == 0x1:
+                    self._on_ack(data)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            conn.closed = True
+            if not self.live_connections():
+                self._connected.clear()
+
+    def _on_ack(self, data: bytes):
+        try:
+            msg = json.loads(data)
+        except ValueError:
+            return
+        envelope_id = msg.get("envelope_id")
+        if envelope_id and envelope_id not in self.acks:
+            self.acks[envelope_id] = self.clock()
+            if msg.get("payload"):
+                self.ack_payloads[envelope_id] = msg["payload"]
+
+    def live_connections(self) -> int:
+        return sum(1 for conn in self.connections if not conn.closed)
+
+    def _next_connection(self):
+        live = [conn for conn in self.connections if not conn.closed]
+        if not live:
+            return None
+        self._next_conn = (self._next_conn + 1) % len(live)
+        return live[self._next_conn]
+
+    def push(self, payload: dict, envelope_type: str = "events_api", retry_attempt: int = 0) -> str:
+        """
+        envelope 1건을 다음 연결로 보낸다 (연결이 없으면 연결될 때까지 보관)
+        """
+        envelope_id = f"env-{next(self._ids)}"
+        text = json.dumps({"envelope_id": envelope_id, "type": envelope_type, "payload": payload,
+                           "accepts_response_payload": envelope_type != "events_api",
+                           "retry_attempt": retry_attempt, "retry_reason": "timeout" if retry_attempt else ""})
+        self.pushed[envelope_id] = self.clock()
+        conn = self._next_connection()
+        if conn is None:
+            self._pending.append(text)
+        else:
+            conn.send_text(text)
+        return envelope_id
+
+    def push_command(self, command: str, text: str = "", channel_id: str = "CFAKECMD") -> str:
+        n = next(self._ids)
+        return self.push({
+            "token": "fake", "team_id": TEAM_ID, "api_app_id": APP_ID, "channel_id": channel_id,
+            "user_id": "UFAKEUSER", "command": command, "text": text, "trigger_id": f"trig-{n}",
+            "response_url": f"http://{self.host}:{self.port}/response/{n}",
+        }, envelope_type="slash_commands")
+
+    async def push_events(self, bodies, rate_per_s: float, on_push=None):
+        """
+        bodies를 초당 rate_per_s건으로 보낸다 (0이면 최대 속도). 반환: 실제 push 속도(건/초)
+        on_push(body, envelope_id): push 직후 호출
+        """
+        started = time.perf_counter()
+        n = 0
+        for n, body in enumerate(bodies, 1):
+            envelope_id = self.push(body)
+            if on_push is not None:
+                on_push(body, envelope_id)
+            if rate_per_s > 0:
+                ahead = started + n / rate_per_s - time.perf_counter()
+                if ahead > 0.002:
+                    await self._drain_writers()
+                    await asyncio.sleep(ahead)
+            elif n % 256 == 0:
+                await self._drain_writers()
+        await self._drain_writers()
+        elapsed = time.perf_counter() - started
+        return n / elapsed if elapsed > 0 else 0.0
+
+    async def _drain_writers(self):
+        for conn in self.connections:
+            if not conn.closed:
+                try:
+                    await conn.writer.drain()
+                except ConnectionError:
+                    conn.closed = True
+
+    def disconnect_all(self, reason: str = "refresh_requested"):
+        """
+        Slack이 연결 교체를 요청할 때처럼 disconnect 메시지를 보낸다
+        """
+        for conn in self.connections:
+            if not conn.closed:
+                conn.send_text(json.dumps({"type": "disconnect", "reason": reason}))
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.live_connections(),
+            "pushed": len(self.pushed),
+            "acked": len(self.acks),
+            "posts": len(self.posts),
+            "calls": {f"{method}:{status}": n for (method, status), n in sorted(self.calls.items())},
+        }
+
+
+async def _serve_forever(args):
+    server = FakeSlackServer(args.host, args.port, args.latency_ms / 1000.0, args.error_rate,
+                             args.ratelimit_rate, args.retry_after)
+    await server.start()
+    print(f"[FAKE_SLACK] api={server.api_url} (SLACK_API_URL)")
+    seen = 0
+    while True:
+        await asyncio.sleep(5)
+        for post in server.posts[seen:]:
+            print(f"[FAKE_SLACK] {post['method']} channel={post['channel']} text={post['text'][:120]!r}")
+        seen = len(server.posts)
+        print(f"[FAKE_SLACK] {server.stats()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 가짜 Slack (Web API + Socket Mode)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3001)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chat.postMessage 500 비율")
+    parser.add_argument("--ratelimit-rate", type=float, default=0.0, help="chat.postMessage 429 비율")
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+에러 시그니처 (같은 스택트레이스 반복 묶기)
+
+같은 에러가 request id / 시각만 바뀐 채 수십 번 올라온다. 본문의 가변 부분을 '#'로 바꾼 뒤
+해시한 값(fingerprint)으로 반복 로그를 묶는다.
+- 숫자로 시작하는 토큰: 숫자, 시각(2024-01-01T12:34:56.789Z -> #-#-#:#:#.#), 0x 주소, UUID 조각
+- '#'에 붙은 단어, '-'로 이어진 '#'/hex 조각(UUID에서 숫자 없는 조각 abcd)은 '#' 하나로 합침
+  (UUID는 조각 모양과 상관없이 '#' 하나, 날짜 2024-01-01도 '#').
+  앞뒤 양쪽을 지우려고 원래 방향과 뒤집은 문자열에 한 번씩 (a3b2c1/user123의 앞부분, abcdefab-#-#)
+정규식 2개 모두 첫 글자가 고정(\d, '#')이라 re의 빠른 검색으로 돌고, sub 3번 + 뒤집기 1번.
+앞 max_chars자 안의 마지막 줄바꿈까지만 본다 (예외 메시지와 상위 프레임이면 충분, 20KB 로그도 수십 us).
+
+FingerprintTracker는 (channel, rule)별 최근 시그니처 LRU와 횟수를 들고,
+트리거 시 "N건 / 서로 다른 시그니처 K개"와 대표 로그를 이미 첨부했는지를 알려 준다.
+fingerprint는 이벤트당 한 번만 구한다: 감지 쪽(record)이 구한 값을 트리거 event의 FINGERPRINT_KEY로 넘긴다.
+"""
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+# 트리거 event에 실어 보내는 이 이벤트의 fingerprint (Detector/ShardedDetector -> ErrorBot.send_alert_for_rule)
+FINGERPRINT_KEY = "_errbot_fingerprint"
+
+_DIGIT_TOKEN = re.compile(r"\d\w*")
+_MARK_JOIN = re.compile(r"#(?:[\w#]+|-[0-9a-fA-F]+\b|-#)+")
+
+
+def fingerprint(text: str, max_chars: int = 2000) -> int:
+    """
+    정규화한 앞 max_chars자의 crc32 (프로세스/재시작과 무관하게 같은 값)
+    """
+    if len(text) > max_chars:
+        # 줄 경계에서 자른다 (앞부분 id 길이가 달라도 같은 줄까지 보도록)
+        cut = text.rfind("\n", 0, max_chars)
+        text = text[:cut if cut > 0 else max_chars]
+    normalized = _normalize_reversed(text)
+    return zlib.crc32(normalized.encode("utf-8", "surrogatepass"))
+
+
+def _normalize_reversed(text: str) -> str:
+    return _MARK_JOIN.sub("#", _MARK_JOIN.sub("#", _DIGIT_TOKEN.sub("#", text))[::-1])
+
+
+def normalize(text: str) -> str:
+    """
+    fingerprint가 해시하는 문자열 (디버깅용, 원래 방향으로)
+    """
+    return _normalize_reversed(text)[::-1]
+
+
+class _Signature:
+    __slots__ = ("count", "period", "first_ts", "last_ts", "logged_ts")
+
+    def __init__(self, now_ts: float):
+        self.count = 0  # LRU에 있는 동안 누적
+        self.period = 0  # 마지막 트리거 이후
+        self.first_ts = now_ts
+        self.last_ts = now_ts
+        self.logged_ts = None  # 이 시그니처 로그를 첨부한 알림이 전송된 시각 (mark_logged)
+
+
+class _RuleSignatures:
+    __slots__ = ("lock", "entries")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # fingerprint -> _Signature (오래 안 나온 것부터)
+
+
+class FingerprintTracker:
+    def __init__(self, max_signatures: int = 64, max_chars: int = 2000):
+        """
+        max_signatures: 룰별 LRU 크기 (넘치면 가장 오래 안 나온 시그니처를 버림)
+        """
+        self.max_signatures = max_signatures
+        self.max_chars = max_chars
+        self._rules = {}
+        self._rules_lock = threading.Lock()
+
+    def _rule(self, key) -> _RuleSignatures:
+        state = self._rules.get(key)
+        if state is None:
+            with self._rules_lock:
+                state = self._rules.setdefault(key, _RuleSignatures())
+        return state
+
+    # ----------------------------------------------------
+    # 기록 (감지 경로: hit 난 이벤트만)
+    # ----------------------------------------------------
+    def record(self, text: str, items, now_ts: float) -> int:
+        """
+        이벤트 1건의 fingerprint를 한 번 구해 hit 난 룰마다 센다. items: Detector.match의 [(key, hits, threshold)]
+        """
+        fp = fingerprint(text, self.max_chars)
+        self.record_fingerprint(fp, items, now_ts)
+        return fp
+
+    def record_fingerprint(self, fp: int, items, now_ts: float):
+        """
+        이미 구한 fingerprint로 센다 (샤드 워커가 계산해 돌려준 값, shard.py)
+        """
+        for key, _hits, _threshold in items:
+            state = self._rule(key)
+            with state.lock:
+                entries = state.entries
+                sig = entries.get(fp)
+                if sig is None:
+                    sig = entries[fp] = _Signature(now_ts)
+                    if len(entries) > self.max_signatures:
+                        entries.popitem(last=False)
+                else:
+                    entries.move_to_end(fp)
+                sig.count += 1
+                sig.period += 1
+                sig.last_ts = now_ts
+
+    # ----------------------------------------------------
+    # 트리거
+    # ----------------------------------------------------
+    def take(self, key, fp: int, now_ts: float, window_seconds: float, log_repeat_seconds: float):
+        """
+        트리거 시 호출: 직전 트리거 이후 윈도우 안에서 본 반복 현황을 돌려주고 기간 카운트를 비운다.
+        fp: 트리거 이벤트의 fingerprint (record가 구한 값, FINGERPRINT_KEY)
+        반환: {"occurrences", "signatures", "fingerprint", "fingerprint_count", "log_seen"} 또는 None(기록 없음)
+        log_seen: 대표 로그(트리거 이벤트)와 같은 시그니처를 log_repeat_seconds 안에 이미 전송했으면 True
+        """
+        state = self._rules.get(key) if fp is not None else None
+        if state is None:
+            return None
+        since = now_ts - window_seconds
+        with state.lock:
+            occurrences = signatures = 0
+            for sig in state.entries.values():
+                if sig.period and sig.last_ts >= since:
+                    occurrences += sig.period
+                    signatures += 1
+                sig.period = 0
+            sig = state.entries.get(fp)
+            if sig is None:
+                return None
+            log_seen = sig.logged_ts is not None and now_ts - sig.logged_ts < log_repeat_seconds
+            return {"occurrences": occurrences, "signatures": signatures, "fingerprint": fp,
+                    "fingerprint_count": sig.count, "log_seen": log_seen}
+
+    def mark_logged(self, key, fp: int, now_ts: float):
+        """
+        대표 로그를 붙인 알림이 실제로 전송된 뒤 호출 (큐 거절/전송 실패면 다음 알림에 다시 첨부)
+        """
+        state = self._rules.get(key)
+        if state is None:
+            return
+        with state.lock:
+            sig = state.entries.get(fp)
+            if sig is not None:
+                sig.logged_ts = now_ts
+
+    def reset(self, keys=None):
+        """
+        mute/unmute 또는 룰 교체 시 (keys가 없으면 전부)
+        """
+        with self._rules_lock:
+            if keys is None:
+                self._rules = {}
+            else:
+                for key in keys:
+                    self._rules.pop(key, None)
@@ -0,0 +1,249 @@
+"""
+무중단 재시작 (Socket Mode 연결 겹치기)
+
+Slack은 앱 하나에 Socket Mode 연결을 여러 개 허용하고 이벤트 1건을 그중 한 연결로만 보낸다.
+새 프로세스가 먼저 연결한 뒤 이전 프로세스가 빠지면 재시작 중에도 이벤트를 잃지 않는다.
+
+같은 호스트의 두 프로세스가 SQLite 파일(HANDOFF_PATH) 하나로 순서를 맞춘다.
+    새 프로세스(successor)                     이전 프로세스(owner)
+    begin(): phase=joining, successor=나         poll: joining이면 계속 서비스 (아직 연결 전)
+    Socket Mode 연결
+    connected(): phase=connected                poll: connected 발견 -> on_handoff()
+    겹침 구간: 이벤트마다 claim()으로 공유 중복 제거   - 최근 dedupe 키를 공유 테이블에 기록
+                                                   - 연결 종료, 처리 중 이벤트/전송 큐 drain
+                                                   - 마지막 상태 저장
+                                                 release(): phase=released -> 종료
+owner는 successor의 연결이 실제로 열린 뒤에만 연결을 닫으므로 연결이 하나도 없는 구간이 없다.
+successor가 연결 전에 죽으면 phase는 joining에 머물고 owner는 그대로 서비스한다.
+    poll: released(또는 timeout/owner 종료) -> on_takeover()
+      - 저장된 상태를 내 윈도우에 "더해서" 합침 (겹침 구간 카운트 유지)
+      - phase=serving, owner=나, 공유 키 정리
+
+Slack 재전송이 겹침 구간에 다른 연결로 가도 claim() 테이블이 두 프로세스 공통이라 한 번만 센다.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS handoff (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    owner_pid INTEGER,
+    successor_pid INTEGER,
+    phase TEXT NOT NULL,
+    updated_ts REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS handoff_events (
+    key TEXT PRIMARY KEY,
+    ts REAL NOT NULL
+);
+"""
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class HandoffCoordinator:
+    """
+    on_handoff(): owner 쪽 - successor가 연결(connected())하면 호출. 끝나면 release()까지 이 객체가 처리
+    on_takeover(predecessor_released: bool): successor 쪽 - 이전 프로세스가 빠진 뒤 호출
+    """
+
+    def __init__(self, path: str, on_handoff, on_takeover, poll_seconds: float = 0.5,
+                 timeout_seconds: float = 60.0, clock=time.time, pid: int = None):
+        self.path = path
+        self.pid = os.getpid() if pid is None else pid
+        self.on_handoff = on_handoff
+        self.on_takeover = on_takeover
+        self.poll_seconds = poll_seconds
+        self.timeout_seconds = timeout_seconds
+        self.clock = clock
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+        self.role = None  # "owner" / "successor"
+        self.overlap = False  # 겹침 구간이면 claim()으로 공유 중복 제거
+        self.handoff_started = None
+        self.takeover_seconds = None  # successor: 겹침 시작(연결 완료) ~ 인수 완료
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ----------------------------------------------------
+    # 시작
+    # ----------------------------------------------------
+    def begin(self) -> str:
+        """
+        Socket Mode 연결 전에 호출. 살아 있는 owner가 있으면 successor, 없으면 owner
+        successor는 phase=joining만 기록한다 (owner는 connected()를 볼 때까지 연결을 유지)
+        """
+        now = self.clock()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT owner_pid, phase FROM handoff WHERE id = 1").fetchone()
+                if row and row[0] != self.pid and row[1] in ("serving", "joining", "connected") and _pid_alive(row[0]):
+                    self.role = "successor"
+                    conn.execute("UPDATE handoff SET successor_pid = ?, phase = 'joining', updated_ts = ? WHERE id = 1",
+                                 (self.pid, now))
+                else:
+                    self.role = "owner"
+                    conn.execute("DELETE FROM handoff_events")
+                    conn.execute("INSERT OR REPLACE INTO handoff (id, owner_pid, successor_pid, phase, updated_ts) "
+                                 "VALUES (1, ?, NULL, 'serving', ?)", (self.pid, now))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if self.role == "successor":
+            self.overlap = True
+            self.handoff_started = now
+            print(f"[HANDOFF] successor pid={self.pid} owner pid={row[0]} -> joining")
+        return self.role
+
+    def connected(self):
+        """
+        successor: Socket Mode 연결이 열린 뒤 호출. 이때부터 owner가 drain을 시작한다 (owner면 아무것도 안 함)
+        """
+        if self.role != "successor":
+            return
+        now = self.clock()
+        with self._lock:
+            self._conn.execute("UPDATE handoff SET phase = 'connected', updated_ts = ? "
+                               "WHERE id = 1 AND successor_pid = ? AND phase = 'joining'", (now, self.pid))
+        self.handoff_started = now
+        print(f"[HANDOFF] successor pid={self.pid} connected -> overlap")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="handoff", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(5.0)
+
+    # ----------------------------------------------------
+    # 겹침 구간 공유 중복 제거
+    # ----------------------------------------------------
+    def claim(self, keys) -> bool:
+        """
+        True면 다른 프로세스(또는 내가)가 이미 처리한 이벤트
+        """
+        if not keys:
+            return False
+        now = self.clock()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = 0
+                for key in keys:
+                    cur = conn.execute("INSERT OR IGNORE INTO handoff_events (key, ts) VALUES (?, ?)",
+                                       (json.dumps(key), now))
+                    inserted += cur.rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return inserted < len(keys)
+
+    def publish_keys(self, keys):
+        """
+        owner가 겹침 구간 직전에 본 이벤트 키 (재전송이 successor로 가도 걸러지게)
+        """
+        now = self.clock()
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO handoff_events (key, ts) VALUES (?, ?)",
+                                   [(json.dumps(key), now) for key in keys])
+
+    # ----------------------------------------------------
+    # 상태 전이
+    # ----------------------------------------------------
+    def _row(self):
+        with self._lock:
+            return self._conn.execute("SELECT owner_pid, successor_pid, phase FROM handoff WHERE id = 1").fetchone()
+
+    def release(self):
+        with self._lock:
+            self._conn.execute("UPDATE handoff SET phase = 'released', updated_ts = ? WHERE id = 1 AND owner_pid = ?",
+                               (self.clock(), self.pid))
+
+    def _take_ownership(self):
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("UPDATE handoff SET owner_pid = ?, successor_pid = NULL, phase = 'serving', "
+                             "updated_ts = ? WHERE id = 1", (self.pid, self.clock()))
+                conn.execute("DELETE FROM handoff_events")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                if self._poll():
+                    return
+            except Exception as e:
+                print(f"[HANDOFF_POLL_FAIL] {repr(e)}")
+
+    def _poll(self) -> bool:
+        """
+        반환 True면 이 프로세스의 handoff 감시 종료
+        """
+        row = self._row()
+        if row is None:
+            return False
+        owner_pid, successor_pid, phase = row
+
+        if self.role == "owner":
+            # joining(successor 연결 전)에는 연결을 닫지 않는다
+            if owner_pid == self.pid and successor_pid and successor_pid != self.pid and phase == "connected":
+                self.overlap = True
+                self.handoff_started = self.clock()
+                print(f"[HANDOFF] successor pid={successor_pid} connected -> draining")
+                try:
+                    self.on_handoff()
+                finally:
+                    self.release()
+                    print(f"[HANDOFF] released after {self.clock() - self.handoff_started:.2f}s")
+                return True
+            return False
+
+        # successor
+        released = phase == "released"
+        timed_out = self.clock() - self.handoff_started > self.timeout_seconds
+        if released or timed_out or not _pid_alive(owner_pid):
+            if not released:
+                print(f"[HANDOFF] owner pid={owner_pid} did not release (timeout={timed_out}) -> taking over")
+            self.on_takeover(released)
+            self._take_ownership()
+            self.role = "owner"
+            self.overlap = False
+            self.takeover_seconds = self.clock() - self.handoff_started
+            print(f"[HANDOFF] took over in {self.takeover_seconds:.2f}s")
+        return False
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,219 @@
+"""
+룰별 hit 이력 (/errstats)
+
+감지 윈도우(240초)는 지나간 hit를 버리므로 "최근 6시간 PET_API 에러 몇 건"에 답할 수 없다.
+(channel, rule) 키마다 고정 크기 버킷 배열 2개에 hit 수를 더해 둔다.
+    minute  60초 x 1440 (24시간)
+    hour    3600초 x 720 (30일)
+- 기록: Detector.apply에서 키당 add 2번, O(1) (SlidingWindowCounter 재사용)
+- 메모리: 키당 (1440 + 720) x 8바이트 (약 17KB), hit 수와 무관
+- 조회: 24시간 이하는 minute, 넘으면 hour 버킷에서 array 슬라이스 합 (Slack 히스토리를 읽지 않음)
+- 정확도: 버킷 1개 이내 (지금 진행 중인 분/시간 버킷을 통째로 포함)
+- RedisBackend여도 이력은 이 프로세스가 센 hit만 (인스턴스별)
+"""
+import math
+import re
+import threading
+
+from window import SlidingWindowCounter
+
+# (이름, 버킷 초, 버킷 수)
+RESOLUTIONS = (("minute", 60, 24 * 60), ("hour", 3600, 30 * 24))
+
+_RANGE_RE = re.compile(r"^(\d+)([mhd])$")
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400}
+_SPARK = "▁▂▃▄▅▆▇█"
+
+
+class _Slot:
+    __slots__ = ("lock", "rings", "dirty")
+
+    def __init__(self, resolutions):
+        self.lock = threading.Lock()
+        # 윈도우 = 버킷 수 - 1 이면 SlidingWindowCounter 버킷 수가 정확히 size개
+        self.rings = tuple(SlidingWindowCounter(seconds * (size - 1), seconds) for _name, seconds, size in resolutions)
+        self.dirty = False
+
+
+class RuleHistory:
+    def __init__(self, resolutions=RESOLUTIONS):
+        self.resolutions = tuple(resolutions)
+        self._slots = {}
+        self._register_lock = threading.Lock()
+
+    def register_keys(self, keys):
+        """
+        새 키의 버킷 배열을 미리 만든다 (기록 경로에서 dict 조회만). 빠진 룰의 이력은 남겨 둔다.
+        """
+        with self._register_lock:
+            slots = dict(self._slots)
+            for key in keys:
+                if key not in slots:
+                    slots[key] = _Slot(self.resolutions)
+            self._slots = slots
+
+    def keys(self):
+        return list(self._slots)
+
+    # ----------------------------------------------------
+    # 기록 (감지 경로)
+    # ----------------------------------------------------
+    def record(self, now_ts: float, items):
+        """
+        items: Detector.match의 [(key, hits, threshold)]
+        """
+        slots = self._slots
+        for key, hits, _threshold in items:
+            slot = slots.get(key)
+            if slot is None:
+                continue
+            with slot.lock:
+                for ring in slot.rings:
+                    ring.add(now_ts, hits)
+                slot.dirty = True
+
+    # ----------------------------------------------------
+    # 조회
+    # ----------------------------------------------------
+    def resolution_for(self, seconds: float):
+        """
+        range를 담을 수 있는 가장 촘촘한 해상도 (없으면 가장 긴 것). 반환: (index, 버킷 초, 버킷 수)
+        """
+        for i, (_name, bucket_seconds, size) in enumerate(self.resolutions):
+            if seconds <= bucket_seconds * size:
+                return i, bucket_seconds, size
+        i = len(self.resolutions) - 1
+        return i, self.resolutions[i][1], self.resolutions[i][2]
+
+    def series(self, key, seconds: float, now_ts: float):
+        """
+        최근 seconds 동안의 버킷별 hit 수 (오래된 것부터). 반환: (버킷 초, counts) - 키가 없으면 None
+        """
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        i, bucket_seconds, size = self.resolution_for(seconds)
+        n = min(size, max(1, math.ceil(seconds / bucket_seconds)))
+        with slot.lock:
+            counts = slot.rings[i].recent(n, now_ts)
+        return bucket_seconds, counts
+
+    def total(self, key, seconds: float, now_ts: float) -> int:
+        found = self.series(key, seconds, now_ts)
+        return 0 if found is None else sum(found[1])
+
+    # ----------------------------------------------------
+    # 영속화 (state_store history 테이블)
+    # ----------------------------------------------------
+    def export(self, dirty_only: bool = True):
+        """
+        [((channel, rule name), resolution 이름, SlidingWindowCounter.to_state()), ...]
+        """
+        out = []
+        for key, slot in list(self._slots.items()):
+            if dirty_only and not slot.dirty:
+                continue
+            with slot.lock:
+                states = [ring.to_state() for ring in slot.rings]
+                slot.dirty = False
+            out.extend((key, name, state) for (name, _s, _n), state in zip(self.resolutions, states))
+        return out
+
+    def load(self, rows, merge: bool = False) -> int:
+        """
+        export 형식을 복원 (merge=True면 지금 이력에 더함 - 무중단 재시작 인계). 반환: 복원한 버킷 배열 수
+        """
+        index = {name: i for i, (name, _s, _n) in enumerate(self.resolutions)}
+        restored = 0
+        for key, name, state in rows:
+            slot = self._slots.get(key)
+            i = index.get(name)
+            if slot is None or i is None:
+                continue
+            with slot.lock:
+                ring = slot.rings[i]
+                if ring.merge_state(*state) if merge else ring.load_state(*state):
+                    slot.dirty = slot.dirty or merge
+                    restored += 1
+        return restored
+
+
+# --------------------------------------------------------
+# /errstats
+# --------------------------------------------------------
+def parse_range(text: str):
+    """
+    "30m" / "6h" / "7d" -> 초. 형식이 아니면 None
+    """
+    m = _RANGE_RE.match(text.strip().lower())
+    if not m or int(m.group(1)) <= 0:
+        return None
+    return int(m.group(1)) * _UNIT_SECONDS[m.group(2)]
+
+
+def parse_errstats(text: str, default_seconds: int):
+    """
+    "/errstats [rule] [range]" 인자. 반환: (rule 이름 또는 None, 초, range 글자)
+    인자 순서는 상관없다 (range 형식인 것이 range, 나머지가 룰 이름).
+    """
+    rule, seconds, label = None, default_seconds, None
+    for token in (text or "").split():
+        parsed = parse_range(token)
+        if parsed is not None and label is None:
+            seconds, label = parsed, token.lower()
+        elif rule is None:
+            rule = token
+        else:
+            rule = f"{rule} {token}"
+    return rule, seconds, label or format_range(default_seconds)
+
+
+def format_range(seconds: int) -> str:
+    for unit in ("d", "h", "m"):
+        if seconds % _UNIT_SECONDS[unit] == 0:
+            return f"{seconds // _UNIT_SECONDS[unit]}{unit}"
+    return f"{seconds}s"
+
+
+def fold(counts, width: int):
+    """
+    counts를 최대 width칸으로 접는다 (칸별 합). 반환: (칸 list, 칸당 버킷 수)
+    """
+    per = max(1, math.ceil(len(counts) / width))
+    return [sum(counts[i:i + per]) for i in range(0, len(counts), per)], per
+
+
+def sparkline(cols) -> str:
+    """
+    칸별 값을 막대 문자로 (0은 공백)
+    """
+    peak = max(cols, default=0)
+    return "".join(_SPARK[n * len(_SPARK) // (peak + 1)] if n else " " for n in cols)
+
+
+def render_errstats(history, keys, seconds: int, label: str, now_ts: float, limit: int = 10,
+                    width: int = 24) -> str:
+    """
+    /errstats 응답. keys가 여럿이면 hit 많은 순으로 limit개 (0건 키는 생략)
+    """
+    rows = []
+    for key in keys:
+        found = history.series(key, seconds, now_ts)
+        if found is None:
+            continue
+        bucket_seconds, counts = found
+        total = sum(counts)
+        if total:
+            rows.append((total, key, bucket_seconds, counts))
+    if not rows:
+        return f"📊 최근 {label}: 기록된 hit가 없습니다."
+    rows.sort(key=lambda row: (-row[0], row[1]))
+
+    lines = [f"📊 최근 {label} hit 수 ({len(rows)}개 룰)" if len(rows) > 1 else f"📊 최근 {label} hit 수"]
+    for total, (channel, name), bucket_seconds, counts in rows[:limit]:
+        cols, per = fold(counts, width)
+        lines.append(f"• *{name}* (<#{channel}>) {total}건  `{sparkline(cols)}`  "
+                     f"{format_range(bucket_seconds * per)} 단위, 최대 {max(cols)}")
+    if len(rows) > limit:
+        lines.append(f"… 외 {len(rows) - limit}개 룰 ({sum(row[0] for row in rows[limit:])}건)")
+    return "\n".join(lines)
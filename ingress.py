@@ -0,0 +1,193 @@
+"""
+수신 큐 (이벤트 폭주 시 조기 부하 차단)
+
+장애 중에는 감시 채널에 초당 수백 건이 쏟아진다. Bolt 워커 풀에서 바로 감지까지 돌리면
+처리가 밀린 만큼 Bolt 쪽 작업 큐가 끝없이 늘고, 감지가 수 분씩 뒤처진다.
+그래서 필터/중복 제거/!mute 명령(ErrorBot._admit)까지만 Bolt 스레드에서 하고,
+감지는 크기가 정해진 이 큐 뒤의 워커 스레드가 한다.
+
+- capacity를 넘으면 새 이벤트는 버린다 (dropped) - 큐 대기 시간의 상한
+- 깊이가 high_water 이상이면 과부하 모드(degraded)로 전환, low_water 이하로 내려오면 복귀
+  (전환 후 min_degraded_seconds 동안은 유지: 폭주 중에 모드가 수십 ms마다 뒤집히지 않게)
+  과부하 모드에서 process_fn(event, trace, degraded=True)가 싼 경로를 탄다
+  (ErrorBot._process_degraded: threshold 절반 이상 찬 룰만, include_log 없이)
+- 전환은 워커가 꺼낼 때의 깊이로 판단 (submit 경로에는 put_nowait만)
+
+workers=0 이면 큐를 만들지 않는다 (ErrorBot.ingress = None, 리플레이/asyncio 런타임)
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+from alert_queue import _summary
+
+_STOP = object()
+
+# 과부하 모드로 센 이벤트 표시 (알림에서 include_log를 생략)
+DEGRADED_KEY = "_errbot_degraded"
+
+
+class IngressQueue:
+    def __init__(self, process_fn, capacity: int = 5000, high_water: int = 1000, low_water: int = None,
+                 min_degraded_seconds: float = 5.0, workers: int = 2, name: str = "ingress",
+                 latency_samples: int = 1024):
+        """
+        process_fn(event, trace, degraded): 감지 함수. 예외는 큐가 잡아서 failed로 센다.
+        low_water: 과부하 모드 해제 깊이 (기본 high_water의 절반)
+        """
+        self._process_fn = process_fn
+        self._queue = queue.Queue(maxsize=capacity)
+        self._capacity = capacity
+        self._high_water = high_water
+        self._low_water = high_water // 2 if low_water is None else low_water
+        self._min_degraded_seconds = min_degraded_seconds
+        self._workers = workers
+        self._name = name
+        self._threads = []
+        self._accepting = False
+        self.degraded = False
+
+        self._stats_lock = threading.Lock()
+        self._submitted = 0
+        self._dropped = 0
+        self._processed = 0
+        self._degraded_events = 0
+        self._failed = 0
+        self._max_depth = 0
+        self._degraded_since = None
+        self._degraded_seconds = 0.0
+        # 최근 N건만 보관 (메모리 고정)
+        self._queue_wait = deque(maxlen=latency_samples)
+
+    # ----------------------------------------------------
+    # lifecycle
+    # ----------------------------------------------------
+    def start(self):
+        if self._threads:
+            return
+        self._accepting = True
+        for i in range(self._workers):
+            t = threading.Thread(target=self._run, name=f"{self._name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 10.0):
+        """
+        신규 submit을 막고, 이미 들어온 이벤트를 모두 처리한 뒤 스레드 종료
+        """
+        self._accepting = False
+        for _ in self._threads:
+            self._queue.put(_STOP)
+
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        self._threads = [t for t in self._threads if t.is_alive()]
+
+    # ----------------------------------------------------
+    # producer (Bolt 워커 스레드)
+    # ----------------------------------------------------
+    def submit(self, event, trace=None) -> bool:
+        """
+        블로킹하지 않는다. 큐가 닫혔거나 꽉 찼으면 False (dropped)
+        """
+        if self._accepting:
+            try:
+                self._queue.put_nowait((time.monotonic(), event, trace))
+            except queue.Full:
+                pass
+            else:
+                with self._stats_lock:
+                    self._submitted += 1
+                return True
+        with self._stats_lock:
+            self._dropped += 1
+        return False
+
+    # ----------------------------------------------------
+    # consumer
+    # ----------------------------------------------------
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._execute(*item)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, enqueued_at: float, event, trace):
+        started = time.monotonic()
+        degraded = self._update_mode(self._queue.qsize())
+        ok = True
+        try:
+            self._process_fn(event, trace, degraded)
+        except Exception as e:
+            ok = False
+            print(f"[INGRESS_PROCESS_FAIL] {repr(e)}")
+
+        with self._stats_lock:
+            if not ok:
+                self._failed += 1
+            elif degraded:
+                self._degraded_events += 1
+            else:
+                self._processed += 1
+            self._queue_wait.append(started - enqueued_at)
+
+    def _update_mode(self, depth: int) -> bool:
+        """
+        깊이에 따라 과부하 모드 전환 (high_water / low_water 사이는 지금 모드 유지)
+        """
+        if depth > self._max_depth:
+            self._max_depth = depth
+        if self.degraded:
+            if depth > self._low_water or time.monotonic() - self._degraded_since < self._min_degraded_seconds:
+                return True
+        elif depth < self._high_water:
+            return False
+        with self._stats_lock:
+            took = time.monotonic() - (self._degraded_since or 0.0)
+            if self.degraded and depth <= self._low_water and took >= self._min_degraded_seconds:
+                self.degraded = False
+                self._degraded_seconds += took
+                print(f"[INGRESS_RECOVERED] depth={depth} degraded_for={took:.1f}s "
+                      f"degraded_events={self._degraded_events} dropped={self._dropped}")
+            elif not self.degraded and depth >= self._high_water:
+                self.degraded = True
+                self._degraded_since = time.monotonic()
+                print(f"[INGRESS_DEGRADED] depth={depth} high_water={self._high_water} capacity={self._capacity}")
+            return self.degraded
+
+    def join(self):
+        """
+        지금까지 들어온 이벤트가 모두 처리될 때까지 대기 (테스트/리플레이용)
+        """
+        self._queue.join()
+
+    # ----------------------------------------------------
+    # stats
+    # ----------------------------------------------------
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            queue_wait = sorted(self._queue_wait)
+            degraded_seconds = self._degraded_seconds
+            if self.degraded:
+                degraded_seconds += time.monotonic() - self._degraded_since
+            out = {
+                "depth": self._queue.qsize(),
+                "max_depth": self._max_depth,
+                "submitted": self._submitted,
+                "dropped": self._dropped,
+                "processed": self._processed,
+                "degraded": self._degraded_events,
+                "failed": self._failed,
+                "degraded_seconds": degraded_seconds,
+            }
+        out["queue_wait"] = _summary(queue_wait)
+        return out
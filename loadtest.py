@@ -0,0 +1,225 @@
+"""
+끝단 부하 테스트: 가짜 Slack(fake_slack.py) + 실제 app.py/async_app.py 프로세스
+
+    python loadtest.py --rate 2000 --duration 20
+    python loadtest.py --runtime async --latency-ms 80 --ratelimit-rate 0.05
+    python loadtest.py --prod-limits                # 발언 제한을 운영값 그대로 (기본은 측정을 위해 풀어 둠)
+
+1. 부하용 룰 파일을 만든다: 채널 CLOAD0000.. 마다 룰 1개 (keyword LOADERR, include_log로 원문 첨부)
+2. 가짜 Slack을 띄우고 봇을 SLACK_API_URL로 붙여 실행 (토큰은 가짜)
+3. Socket Mode로 message 이벤트를 초당 --rate건 --duration초 동안 push
+   (--match-ratio만큼 LOADERR seq=N, 나머지는 매치 없는 잡음)
+4. 보고
+   - 수신(ingest): Socket Mode ack 속도와 push -> ack 지연
+   - 알림 지연: threshold를 넘긴 이벤트 push -> 그 원문이 붙은 chat.postMessage 수신 (seq로 연결)
+   - back-pressure: 기대 알림 수 대비 전달 수, 429/500 응답 수, 봇 종료 통계([SHUTDOWN])
+
+slack_bolt/slack_sdk(및 async면 aiohttp)가 설치된 환경에서 실행한다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import config
+from bench import make_long_message
+from fake_slack import FakeSlackServer, event_body
+from replay import _percentile
+
+LOAD_KEYWORD = "LOADERR"
+LOAD_DEST_CH = "CLOADOUT"
+_SEQ_RE = re.compile(rf"{LOAD_KEYWORD} seq=(\d+)")
+
+
+def load_rules(channels: int, threshold: int) -> dict:
+    return {
+        "rules": [
+            {
+                "name": f"LOAD{i}",
+                "channel": f"CLOAD{i:04d}",
+                "keyword": LOAD_KEYWORD,
+                "threshold": threshold,
+                "notify": [{"channel": LOAD_DEST_CH, "text": f"{{ALERT_PREFIX}} LOAD{i} 감지", "include_log": True}],
+            }
+            for i in range(channels)
+        ]
+    }
+
+
+def make_events(total: int, channels: int, match_ratio: float, size: int):
+    """
+    반환: (bodies, 매치 이벤트 seq -> 채널)
+    """
+    filler = make_long_message(max(0, size), seed=19)
+    every = max(1, round(1 / match_ratio)) if match_ratio > 0 else 0
+    bodies, matches = [], {}
+    for n in range(total):
+        channel = f"CLOAD{n % channels:04d}"
+        if every and n % every == 0:
+            text = f"{LOAD_KEYWORD} seq={n} {filler}"
+            matches[n] = channel
+        else:
+            text = f"noise seq={n} {filler}"
+        bodies.append(event_body(n, channel, text[:max(size, 32)]))
+    return bodies, matches
+
+
+def expected_crossings(matches: dict, threshold: int):
+    """
+    채널별 threshold번째 매치마다 트리거 (윈도우보다 짧은 테스트 기준, 처리 순서는 push 순서로 가정)
+    """
+    seen = {}
+    crossings = []
+    for n in sorted(matches):
+        channel = matches[n]
+        seen[channel] = seen.get(channel, 0) + 1
+        if seen[channel] % threshold == 0:
+            crossings.append(n)
+    return crossings
+
+
+def _summary(values_ms) -> str:
+    if not values_ms:
+        return "n=0"
+    values_ms = sorted(values_ms)
+    return (f"n={len(values_ms)} p50={_percentile(values_ms, 0.5):.1f}ms p99={_percentile(values_ms, 0.99):.1f}ms "
+            f"max={values_ms[-1]:.1f}ms")
+
+
+async def run(args) -> dict:
+    server = FakeSlackServer(latency_seconds=args.latency_ms / 1000.0, error_rate=args.error_rate,
+                             ratelimit_rate=args.ratelimit_rate, retry_after=args.retry_after)
+    await server.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rules_path = os.path.join(tmp, "load_rules.json")
+        with open(rules_path, "w", encoding="utf-8") as f:
+            json.dump(load_rules(args.channels, args.threshold), f)
+        env = dict(os.environ, SLACK_API_URL=server.api_url, SLACK_BOT_TOKEN="xoxb-fake", SLACK_APP_TOKEN="xapp-fake",
+                   RULES_FILE=rules_path, PYTHONUNBUFFERED="1")
+        if not args.prod_limits:
+            for name in ("RULE_RATE_LIMIT", "DEST_RATE_LIMIT", "GLOBAL_RATE_LIMIT"):
+                env[name] = "1000000/1"
+        log_path = os.path.join(tmp, "bot.log")
+        entry = "async_app.py" if args.runtime == "async" else "app.py"
+        with open(log_path, "w", encoding="utf-8") as log:
+            proc = subprocess.Popen([sys.executable, entry], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            if not await server.wait_connected(args.connect_timeout):
+                raise SystemExit(f"bot did not connect within {args.connect_timeout}s (log: {_tail(log_path)})")
+
+            total = int(args.rate * args.duration)
+            bodies, matches = make_events(total, args.channels, args.match_ratio, args.size)
+            seq_envelope = {}  # seq(= bodies 순번) -> envelope_id
+
+            def on_push(body, envelope_id):
+                seq_envelope[len(seq_envelope)] = envelope_id
+
+            print(f"[LOAD] runtime={args.runtime} events={total} rate={args.rate}/s size={args.size}B "
+                  f"channels={args.channels} threshold={args.threshold} api_latency={args.latency_ms}ms")
+            push_rate = await server.push_events(bodies, args.rate, on_push)
+
+            # ack와 알림이 멈출 때까지 (최대 --drain-seconds)
+            deadline = time.monotonic() + args.drain_seconds
+            last = None
+            while time.monotonic() < deadline:
+                now = (len(server.acks), len(server.posts))
+                if now == last and now[0] == total:
+                    break
+                last = now
+                await asyncio.sleep(0.5)
+
+            # slash command 왕복 확인
+            command_id = server.push_command("/unmute")
+            await asyncio.sleep(1.0)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            try:
+                proc.wait(timeout=args.drain_seconds + 35)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            shutdown_line = next((line for line in reversed(_read(log_path)) if line.startswith("[SHUTDOWN]")), None)
+            boot_ready = next((line for line in _read(log_path) if "ready in" in line), None)
+            await server.close()
+
+    ack_ms = [(server.acks[e] - server.pushed[e]) * 1000.0 for e in seq_envelope.values() if e in server.acks]
+    first_push = min(server.pushed[e] for e in seq_envelope.values()) if seq_envelope else 0.0
+    last_ack = max((server.acks[e] for e in seq_envelope.values() if e in server.acks), default=first_push)
+
+    crossings = expected_crossings(matches, args.threshold)
+    alert_ms = []
+    for post in server.posts:
+        if post["channel"] != LOAD_DEST_CH:
+            continue
+        m = _SEQ_RE.search(post["text"])
+        if m and int(m.group(1)) in seq_envelope:
+            alert_ms.append((post["t"] - server.pushed[seq_envelope[int(m.group(1))]]) * 1000.0)
+
+    result = {
+        "push_rate": push_rate,
+        "acked": len(ack_ms),
+        "ingest_rate": len(ack_ms) / (last_ack - first_push) if last_ack > first_push else 0.0,
+        "ack_ms": ack_ms,
+        "expected_alerts": len(crossings),
+        "alert_ms": alert_ms,
+        "command_acked": command_id in server.acks,
+        "command_replies": sum(1 for post in server.posts if post["method"] == "response_url"),
+        "server": server.stats(),
+        "ready": boot_ready,
+        "shutdown": shutdown_line,
+    }
+    print(f"  push rate        {push_rate:10.0f} ev/s (target {args.rate})")
+    print(f"  ingest (ack)     {result['ingest_rate']:10.0f} ev/s  acked={len(ack_ms)}/{len(seq_envelope)}  "
+          f"push->ack {_summary(ack_ms)}")
+    print(f"  alerts           delivered={len(alert_ms)} expected={len(crossings)}  push->post {_summary(alert_ms)}")
+    print(f"  slash command    acked={result['command_acked']} replies={result['command_replies']}")
+    print(f"  slack calls      {result['server']['calls']}")
+    if boot_ready:
+        print(f"  bot              {boot_ready.strip()}")
+    if shutdown_line:
+        print(f"  bot              {shutdown_line.strip()}")
+    return result
+
+
+def _read(path: str):
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.readlines()
+    except OSError:
+        return []
+
+
+def _tail(path: str, n: int = 20) -> str:
+    return "".join(_read(path)[-n:])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="가짜 Slack 대상 끝단 부하 테스트")
+    parser.add_argument("--runtime", choices=("threaded", "async"), default="threaded")
+    parser.add_argument("--rate", type=float, default=1000.0, help="초당 push 이벤트 수")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help=f"push 시간(초). 기대 알림 계산을 위해 윈도우({config.WINDOW_SECONDS}s)보다 짧게")
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--threshold", type=int, default=20)
+    parser.add_argument("--match-ratio", type=float, default=0.2)
+    parser.add_argument("--size", type=int, default=600, help="메시지 크기(글자)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="가짜 Web API 응답 지연")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--ratelimit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--prod-limits", action="store_true", help="발언 제한을 config 값 그대로")
+    parser.add_argument("--connect-timeout", type=float, default=30.0)
+    parser.add_argument("--drain-seconds", type=float, default=15.0)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
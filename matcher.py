@@ -0,0 +1,211 @@
+"""
+키워드 매칭
+
+RULES의 keyword를 채널 단위로 미리 컴파일해 두고, 메시지 1건당
+- 소문자 변환 1회
+- (중복 제거된) 키워드별 C 레벨 substring count 1회
+로 해당 채널의 모든 룰 hit 수를 한 번에 구한다.
+
+순수 파이썬 Aho-Corasick은 CPython에서 문자 단위 루프가 되어 str.count보다
+수 배 느리므로 쓰지 않는다. 대신 "lower 1회 + 공유 키워드 1회 스캔"으로
+기존 룰별 lower/count 반복을 제거한다. (bench.py matcher 참고)
+키워드가 _SCAN_MIN_NEEDLES개 이상이면 키워드별 count 대신 전체 키워드를 trie 모양으로 합친
+정규식 1개로 먼저 훑고(C 레벨 1패스, 키워드 수와 거의 무관), 나온 키워드만 count한다.
+
+정규식(pattern)/필드(field) 룰은 keyword를 필수 리터럴로 삼아 위 스캔으로 먼저 거르고,
+keyword가 나온 메시지에서만 미리 컴파일한 정규식을 돌린다. (bench.py regex 참고)
+"""
+import operator
+import re
+
+
+def keyword_hits_in_text(keyword: str, text: str) -> int:
+    """
+    한 메시지 안에서 keyword가 여러 번 나오면 그 횟수만큼 카운트
+    - 대소문자 무시
+    - 단순 substring count
+    (기존 룰별 스캔. KeywordMatcher의 기준 동작)
+    """
+    if not keyword or not text:
+        return 0
+    return text.lower().count(keyword.lower())
+
+
+_SCAN_MIN_NEEDLES = 24  # 이보다 적으면 키워드별 str.count(문자당 ~1ns)가 정규식 1패스(문자당 ~20ns)보다 빠름
+
+
+def _trie_pattern(needles) -> str:
+    """
+    키워드 목록 -> 공통 접두어를 묶은 정규식 (한 위치에서는 가장 긴 키워드를 고른다)
+    """
+    root = {}
+    for needle in needles:
+        node = root
+        for ch in needle:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node):
+        end = "" in node
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if end:
+            return "(?:" + body + ")?"
+        return body
+
+    return emit(root)
+
+
+def _related_needles(needles):
+    """
+    키워드 X가 스캔에 잡혔을 때 count해야 하는 키워드 (X 자신 + 스캔에서 X에 가려질 수 있는 것)
+    - X 안에 들어 있는 키워드
+    - X의 끝부분으로 시작하는 키워드 (겹친 위치라 비겹침 스캔이 건너뜀)
+    """
+    index = {needle: i for i, needle in enumerate(needles)}
+    by_prefix = {}  # 키워드 접두어 -> 그 접두어로 시작하는 키워드 번호
+    for i, needle in enumerate(needles):
+        for k in range(1, len(needle) + 1):
+            by_prefix.setdefault(needle[:k], []).append(i)
+
+    related = {}
+    for x in needles:
+        out = {index[x[a:b]] for a in range(len(x)) for b in range(a + 1, len(x) + 1) if x[a:b] in index}
+        for k in range(1, len(x)):
+            out.update(by_prefix.get(x[k:], ()))
+        related[x] = tuple(sorted(out))
+    return related
+
+
+class KeywordMatcher:
+    """
+    채널 하나에 걸린 keyword 목록을 컴파일한 매처
+
+    counts(text)는 생성 시 넘긴 keywords와 같은 순서로 hit 수를 돌려준다.
+    결과는 keyword_hits_in_text(keyword, text)와 항상 같다.
+    """
+
+    __slots__ = ("keywords", "_needles", "_slots", "_scan", "_related")
+
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+
+        # 같은 키워드(대소문자 무시)를 쓰는 룰은 스캔 1회를 공유
+        needle_index = {}
+        slots = []
+        for kw in self.keywords:
+            needle = (kw or "").lower()
+            if not needle:
+                slots.append(-1)
+                continue
+            if needle not in needle_index:
+                needle_index[needle] = len(needle_index)
+            slots.append(needle_index[needle])
+
+        self._needles = tuple(needle_index)
+        self._slots = tuple(slots)
+        self._scan = self._related = None
+        if len(self._needles) >= _SCAN_MIN_NEEDLES:
+            self._scan = re.compile(_trie_pattern(self._needles)).findall
+            self._related = _related_needles(self._needles)
+
+    def counts(self, text: str):
+        if not text or not self._needles:
+            return [0] * len(self._slots)
+
+        lowered = text.lower()
+        needles = self._needles
+        if self._scan is None:
+            found = [lowered.count(needle) for needle in needles]
+        else:
+            found = [0] * len(needles)
+            candidates = set()
+            for needle in set(self._scan(lowered)):
+                candidates.update(self._related[needle])
+            for i in candidates:
+                found[i] = lowered.count(needles[i])
+        return [found[i] if i >= 0 else 0 for i in self._slots]
+
+
+# --------------------------------------------------------
+# 정규식 / key=value 필드 룰
+# --------------------------------------------------------
+# keyword는 이 룰들의 "필수 리터럴" 역할을 한다: KeywordMatcher가 keyword를 찾은 메시지에서만
+# 정규식/필드 추출을 돌린다. 그래서 keyword는 모든 매치에 들어 있는 문자열이어야 한다.
+FIELD_OPS = ("==", "!=", ">=", "<=", ">", "<", "=")
+_FIELD_EXPR_RE = re.compile(r"^\s*([\w.\-]+)\s*(==|!=|>=|<=|>|<|=)\s*(.+?)\s*$")
+
+
+def parse_field_expr(expr: str):
+    """
+    "latency_ms > 3000" -> ("latency_ms", ">", 3000.0) / 문자열 값은 따옴표 제거 후 str
+    형식이 틀리면 ValueError
+    """
+    m = _FIELD_EXPR_RE.match(expr or "")
+    if not m:
+        raise ValueError(f"expected '<field> <op> <value>' with op in {list(FIELD_OPS)}")
+    name, op, raw = m.groups()
+    op = "==" if op == "=" else op
+    raw = raw.strip("\"'")
+    try:
+        value = float(raw)
+    except ValueError:
+        if op not in ("==", "!="):
+            raise ValueError(f"operator {op} needs a numeric value") from None
+        value = raw
+    return name, op, value
+
+
+def compile_pattern_counter(pattern: str):
+    """
+    정규식 매치 수 (대소문자 무시, keyword와 같은 기준). 잘못된 패턴이면 re.error
+    """
+    rx = re.compile(pattern, re.IGNORECASE)
+    findall = rx.findall
+
+    def count(text: str) -> int:
+        return len(findall(text))
+
+    return count
+
+
+def compile_field_counter(expr: str):
+    """
+    메시지 안의 name=value / name: value / "name": "value" 중 조건을 만족하는 개수
+    """
+    name, op, expected = parse_field_expr(expr)
+    rx = re.compile(rf"(?<![\w.]){re.escape(name)}[\"']?\s*[=:]\s*[\"']?([^\s,;\"'}}\]]+)", re.IGNORECASE)
+    numeric = isinstance(expected, float)
+    compare = {
+        "==": operator.eq, "!=": operator.ne, ">": operator.gt,
+        ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    }[op]
+
+    def count(text: str) -> int:
+        n = 0
+        for raw in rx.findall(text):
+            if numeric:
+                try:
+                    value = float(raw)
+                except ValueError:
+                    continue
+            else:
+                value = raw
+            if compare(value, expected):
+                n += 1
+        return n
+
+    return count
+
+
+def rule_counter(rule):
+    """
+    pattern/field 룰이면 hit 수 계산 함수, 단순 keyword 룰이면 None
+    """
+    if rule.get("pattern"):
+        return compile_pattern_counter(rule["pattern"])
+    if rule.get("field"):
+        return compile_field_counter(rule["field"])
+    return None
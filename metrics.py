@@ -0,0 +1,286 @@
+"""
+Prometheus 텍스트 포맷 메트릭
+
+- Counter / Histogram: 라벨 조합별 child를 시작 시 미리 만들어 두고(hot path에서 dict 조회 없음)
+  inc()/observe()만 호출한다. 락 없이 갱신하므로 여러 스레드가 같은 child를 동시에 올리면
+  드물게 1씩 빠질 수 있다 (모니터링 용도라 허용, 대신 메시지당 비용이 락 버전의 1/3 수준).
+- GaugeFunc: 스크레이프 시점에 콜백으로 값을 계산 (윈도우 카운트, 큐 길이 등)
+- MetricsServer: /metrics HTTP 엔드포인트 (별도 스레드)
+- TextfileExporter: node_exporter textfile collector용 파일을 주기적으로 원자적 교체
+"""
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 초 단위 기본 버킷 (이벤트 처리 ~ Slack API 호출까지)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(labelnames, labelvalues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(labelnames, labelvalues)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+# --------------------------------------------------------
+# metric types
+# --------------------------------------------------------
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *labelvalues) -> _CounterChild:
+        """
+        시작 시 미리 호출해서 child를 잡아 두는 용도 (hot path에서는 child.inc()만)
+        """
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(labelvalues, _CounterChild())
+        return child
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labelvalues, child in list(self._children.items()):
+            yield f"{self.name}{_label_str(self.labelnames, labelvalues)} {_fmt(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("_upper", "counts", "sum")
+
+    def __init__(self, upper_bounds):
+        self._upper = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # 마지막 = +Inf, 전체 count는 렌더링 시 합산
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self._upper, value)] += 1
+        self.sum += value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *labelvalues) -> _HistogramChild:
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(labelvalues, _HistogramChild(self.buckets))
+        return child
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labelvalues, child in list(self._children.items()):
+            counts = list(child.counts)
+            total = child.sum
+            cumulative = 0
+            for upper, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_fmt(upper)}"'
+                yield f"{self.name}_bucket{_label_str(self.labelnames, labelvalues, le)} {cumulative}"
+            yield f"{self.name}_sum{_label_str(self.labelnames, labelvalues)} {_fmt(total)}"
+            yield f"{self.name}_count{_label_str(self.labelnames, labelvalues)} {cumulative}"
+
+
+class GaugeFunc:
+    """
+    fn() -> [(labelvalues tuple, value), ...] 를 스크레이프 시점에 호출
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames, fn):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labelvalues, value in self.fn():
+            yield f"{self.name}{_label_str(self.labelnames, labelvalues)} {_fmt(value)}"
+
+
+class CounterFunc(GaugeFunc):
+    """
+    이미 다른 곳에서 세고 있는 누적 값 (DedupeCache.hits 등)을 스크레이프 시점에 읽어 counter로 노출
+    """
+    kind = "counter"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# {metric.name} render failed: {repr(e)}")
+        return "\n".join(lines) + "\n"
+
+
+# --------------------------------------------------------
+# exporters
+# --------------------------------------------------------
+class MetricsServer:
+    """
+    GET /metrics -> registry.render()
+    """
+
+    def __init__(self, registry: Registry, port: int, host: str = "0.0.0.0"):
+        self.registry = registry
+        registry_ref = registry
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class TextfileExporter:
+    """
+    interval_seconds마다 path에 메트릭을 쓴다 (임시 파일에 쓰고 rename)
+    """
+
+    def __init__(self, registry: Registry, path: str, interval_seconds: float = 15.0):
+        self.registry = registry
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.registry.render())
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[METRICS_TEXTFILE_FAIL] {repr(e)}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.write()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-textfile", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+        self.write()
+
+
+# --------------------------------------------------------
+# 봇 메트릭
+# --------------------------------------------------------
+class BotMetrics:
+    def __init__(self):
+        self.registry = Registry()
+        r = self.registry
+        self.rule_hits = r.register(Counter(
+            "errbot_rule_hits_total", "Keyword hits counted per rule", ("channel", "rule")))
+        self.triggers = r.register(Counter(
+            "errbot_triggers_total", "Rule triggers by outcome (fired / rate_limited / muted / queue_full / correlated)",
+            ("channel", "rule", "outcome")))
+        self.handle_seconds = r.register(Histogram(
+            "errbot_handle_message_seconds", "handle_message latency"))
+        self.slack_send_seconds = r.register(Histogram(
+            "errbot_slack_send_seconds", "chat_postMessage latency by outcome", ("outcome",)))
+        self.slack_send_errors = r.register(Counter(
+            "errbot_slack_send_errors_total", "Slack send (chat_postMessage / files_upload_v2) failures by exception type", ("error",)))
+        self.ingress_events = r.register(Counter(
+            "errbot_ingress_events_total", "Events through the bounded ingress queue by outcome "
+            "(processed / degraded / dropped)", ("outcome",)))
+        self.incidents = r.register(Counter(
+            "errbot_incidents_total", "Grouped incident alerts by outcome (sent / rate_limited / queue_full)",
+            ("group", "outcome")))
+
+        # hot path에서 쓰는 child는 미리 잡아 둔다
+        self.handle = self.handle_seconds.labels()
+        self.send_ok = self.slack_send_seconds.labels("ok")
+        self.send_error = self.slack_send_seconds.labels("error")
+
+    def gauge(self, name: str, help_text: str, labelnames, fn):
+        return self.registry.register(GaugeFunc(name, help_text, labelnames, fn))
+
+    def counter_func(self, name: str, help_text: str, labelnames, fn):
+        return self.registry.register(CounterFunc(name, help_text, labelnames, fn))
+
+    def render(self) -> str:
+        return self.registry.render()
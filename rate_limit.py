@@ -0,0 +1,122 @@
+"""
+알림 발언 제한 (계층형 토큰 버킷)
+
+단계
+- rule:<channel>:<name>   룰별
+- dest:<channel>          알림을 받는 채널별
+- global                  전체
+
+트리거 1회 = 룰/전역 버킷 토큰 1개 + 토큰이 남은 수신 채널마다 1개.
+룰/전역 중 하나라도 비었거나 보낼 수 있는 수신 채널이 없으면 발언하지 않는다.
+수신 채널 버킷만 빈 경우 그 채널만 건너뛴다 (시끄러운 룰이 공용 채널 버킷을 비워도
+다른 룰의 전용 채널 알림은 나간다).
+
+전송이 전부 실패하면 release로 같은 토큰을 되돌린다 (기존 "트리거 1회 = 슬롯 1개, 실패 시 롤백").
+"""
+import threading
+from collections import namedtuple
+
+# burst개까지 쌓이고, per_seconds마다 burst개 비율로 다시 찬다
+RateLimit = namedtuple("RateLimit", ["burst", "per_seconds"])
+
+# 발언 권한. parts: 백엔드가 되돌릴 때 쓰는 값 / granted: destinations 순서대로 허용 여부
+Slot = namedtuple("Slot", ["parts", "granted"])
+
+
+def rule_bucket(channel: str, name: str) -> str:
+    return f"rule:{channel}:{name}"
+
+
+def dest_bucket(channel: str) -> str:
+    return f"dest:{channel}"
+
+
+def incident_bucket(group: str) -> str:
+    return f"incident:{group}"
+
+
+GLOBAL_BUCKET = "global"
+
+
+class TokenBuckets:
+    """
+    프로세스 메모리 토큰 버킷 (MemoryBackend용). 락 1개 안에서 단계 수만큼만 계산 (O(1) per level)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # bucket id -> [tokens, last_ts]
+
+    def _refill_locked(self, bucket_id: str, limit: RateLimit, now_ts: float):
+        state = self._buckets.get(bucket_id)
+        if state is None:
+            state = self._buckets[bucket_id] = [float(limit.burst), now_ts]
+            return state
+        elapsed = now_ts - state[1]
+        if elapsed > 0:
+            state[0] = min(float(limit.burst), state[0] + elapsed * limit.burst / limit.per_seconds)
+            state[1] = now_ts
+        return state
+
+    def acquire(self, now_ts: float, limits, destinations=()):
+        """
+        limits: [(bucket id, RateLimit), ...] 전부 필요
+        destinations: [(bucket id, RateLimit), ...] 하나 이상 필요 (비어 있으면 조건 없음)
+        반환: Slot 또는 None
+        """
+        with self._lock:
+            required = []
+            for bucket_id, limit in limits:
+                state = self._refill_locked(bucket_id, limit, now_ts)
+                if state[0] < 1.0:
+                    return None
+                required.append((bucket_id, limit, state))
+
+            granted, taken = [], []
+            for bucket_id, limit in destinations:
+                state = self._refill_locked(bucket_id, limit, now_ts)
+                ok = state[0] >= 1.0
+                granted.append(ok)
+                if ok:
+                    taken.append((bucket_id, limit, state))
+            if destinations and not taken:
+                return None
+
+            parts = []
+            for bucket_id, limit, state in required + taken:
+                state[0] -= 1.0
+                parts.append((bucket_id, limit))
+            return Slot(tuple(parts), tuple(granted))
+
+    def release(self, slot: Slot):
+        with self._lock:
+            for bucket_id, limit in slot.parts:
+                state = self._buckets.get(bucket_id)
+                if state is not None:
+                    state[0] = min(float(limit.burst), state[0] + 1.0)
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def export(self) -> dict:
+        with self._lock:
+            return {bucket_id: list(state) for bucket_id, state in self._buckets.items()}
+
+    def load(self, buckets: dict, merge: bool = False):
+        """
+        export 형식을 복원. merge=True면 지금 버킷과 합친다 (무중단 재시작 인계):
+        토큰은 적은 쪽, 마지막 충전 시각은 늦은 쪽 -> 이전 프로세스가 이미 쓴 토큰을 다시 주지 않음
+        """
+        loaded = {bucket_id: [float(t), float(ts)] for bucket_id, (t, ts) in buckets.items()}
+        with self._lock:
+            if not merge:
+                self._buckets = loaded
+                return
+            for bucket_id, state in loaded.items():
+                mine = self._buckets.get(bucket_id)
+                if mine is None:
+                    self._buckets[bucket_id] = state
+                else:
+                    mine[0] = min(mine[0], state[0])
+                    mine[1] = max(mine[1], state[1])
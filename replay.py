@@ -0,0 +1,423 @@
+"""
+오프라인 리플레이 / 처리량 벤치
+
+기록된 Slack message 이벤트(JSONL)를 실제 Slack 없이 ErrorBot.handle_message에 흘려 보내고
+- events/sec, 이벤트당 처리 시간 p50/p99
+- 어떤 알림이 나갔을지 (가짜 Slack 클라이언트에 기록)
+를 보고한다.
+
+시계는 이벤트의 ts로 주입하므로 240초 윈도우/발언 제한이 실행 속도와 무관하게 재현된다.
+보류 요약(digest)도 스레드 대신 기록된 시각 기준 DIGEST_FLUSH_SECONDS마다 flush한다.
+
+사용법:
+    python replay.py events.jsonl                 # 최대 속도
+    python replay.py events.jsonl --realtime 10   # 원래 간격의 1/10로
+    python replay.py --scenario all               # 내장 벤치 시나리오
+    python replay.py --scenario long_traces --write long_traces.jsonl
+    python replay.py --scenario all --runtime async --slack-latency-ms 50   # asyncio 런타임 (threaded와 비교)
+    python replay.py --scenario all --shards 4    # 감지를 워커 프로세스 4개로 (shard.py, 결과는 단일 프로세스와 같아야 함)
+
+JSONL 한 줄: Slack envelope({"event_id": ..., "event": {...}}) 또는 event 본문({"channel", "text", "ts", ...})
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from async_bot import AsyncErrorBot
+from backend import MemoryBackend
+from bench import make_long_message
+from bot import ErrorBot
+from shard import ShardedErrorBot
+
+
+# --------------------------------------------------------
+# 가짜 Slack
+# --------------------------------------------------------
+class ReplayClock:
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeSlackClient:
+    """
+    chat_postMessage를 기록만 한다. latency_seconds로 Slack API 지연을 흉내 낼 수 있다.
+    """
+
+    def __init__(self, clock, latency_seconds: float = 0.0):
+        self.clock = clock
+        self.latency_seconds = latency_seconds
+        self.posts = []
+
+    def auth_test(self):
+        return {"ok": True, "user_id": "UREPLAYBOT", "bot_id": "BREPLAYBOT"}
+
+    def chat_postMessage(self, channel, text, **kwargs):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self._record_post(channel, text)
+
+    def files_upload_v2(self, channel, content, initial_comment="", **kwargs):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self._record_upload(channel, content, initial_comment)
+
+    def _record_post(self, channel, text):
+        self.posts.append({"ts": self.clock(), "channel": channel, "text": text})
+        return {"ok": True, "channel": channel, "ts": f"{self.clock():.6f}"}
+
+    def _record_upload(self, channel, content, initial_comment):
+        self.posts.append({"ts": self.clock(), "channel": channel, "text": initial_comment, "snippet": len(content)})
+        return {"ok": True}
+
+
+class FakeAsyncSlackClient(FakeSlackClient):
+    """
+    AsyncWebClient 흉내 (지연은 asyncio.sleep이라 전송끼리 겹친다)
+    """
+
+    async def auth_test(self):
+        return super().auth_test()
+
+    async def chat_postMessage(self, channel, text, **kwargs):
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self._record_post(channel, text)
+
+    async def files_upload_v2(self, channel, content, initial_comment="", **kwargs):
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self._record_upload(channel, content, initial_comment)
+
+
+# --------------------------------------------------------
+# 입력
+# --------------------------------------------------------
+def as_envelope(record) -> dict:
+    if "event" in record:
+        return record
+    return {"event": record}
+
+
+def event_time(body) -> float:
+    event = body.get("event", {}) or {}
+    ts = event.get("ts") or body.get("event_time") or 0
+    return float(ts)
+
+
+def load_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [as_envelope(json.loads(line)) for line in f if line.strip()]
+
+
+# --------------------------------------------------------
+# 실행
+# --------------------------------------------------------
+def _percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[int(q * (len(sorted_values) - 1))]
+
+
+class _Timeline:
+    """
+    기록된 시각으로 시계를 옮기고, DIGEST_FLUSH_SECONDS마다 보류 요약을 flush
+    """
+
+    def __init__(self, bodies, clock, bot, realtime_speed: float):
+        self.clock = clock
+        self.bot = bot
+        self.realtime_speed = realtime_speed
+        self.first_ts = self.prev_ts = clock.now
+        self.next_flush = self.first_ts + config.DIGEST_FLUSH_SECONDS
+
+    def wait_seconds(self, body) -> float:
+        """
+        realtime_speed > 0 이면 이 이벤트 전에 실제로 기다릴 시간
+        """
+        ts = event_time(body)
+        wait = (ts - self.prev_ts) / self.realtime_speed if self.realtime_speed > 0 and ts > self.prev_ts else 0.0
+        self.prev_ts = max(self.prev_ts, ts)
+        return wait
+
+    def advance(self, body):
+        ts = event_time(body)
+        self.clock.now = ts
+        if ts >= self.next_flush:
+            self.bot.flush_digest()
+            self.next_flush = ts + config.DIGEST_FLUSH_SECONDS
+
+
+def _result(bodies, latencies, elapsed: float, delivered: float, client, first_ts: float, bot) -> dict:
+    latencies.sort()
+    result = {
+        "events": len(bodies),
+        "elapsed_s": elapsed,
+        "delivered_s": delivered,
+        "events_per_s": len(bodies) / elapsed if elapsed > 0 else 0.0,
+        "latency_us": {
+            "p50": _percentile(latencies, 0.50) * 1e6,
+            "p99": _percentile(latencies, 0.99) * 1e6,
+            "max": (latencies[-1] if latencies else 0.0) * 1e6,
+        },
+        "alerts": [
+            {"t": post["ts"] - first_ts, "channel": post["channel"], "text": post["text"].split("\n", 1)[0]}
+            for post in sorted(client.posts, key=lambda post: post["ts"])
+        ],
+    }
+    if bot.tracer is not None:
+        result["stages"] = bot.tracer.summary()
+    if bot.ingress is not None:
+        stats = bot.ingress.stats()
+        result["ingress"] = {name: stats[name] for name in ("processed", "degraded", "dropped", "max_depth")}
+    if isinstance(bot, ShardedErrorBot):
+        stats = bot.detector.stats()
+        result["shards"] = {name: stats[name] for name in ("sent", "dropped", "failed")}
+    return result
+
+
+RUNTIMES = ("inline", "threaded", "async")
+BOLT_WORKER_THREADS = 10  # Bolt Socket Mode 기본 이벤트 처리 스레드 수
+
+
+def replay(bodies, rules=None, realtime_speed: float = 0.0, slack_latency_seconds: float = 0.0,
+           make_bot=None, runtime: str = "inline", trace_sample_rate: float = 0.0, ingress: bool = False,
+           shards: int = 0):
+    """
+    bodies: Slack envelope 목록 (ts 오름차순)
+    realtime_speed > 0 이면 기록된 간격 / realtime_speed 만큼 실제로 기다린다.
+    make_bot(client, rules, backend, clock) -> bot 으로 다른 런타임을 끼울 수 있다.
+    runtime
+    - inline: 이벤트 처리 중에 바로 전송 (결정적, 기본)
+    - threaded: app.py처럼 Bolt 워커 스레드 풀 + 알림 sender 스레드
+    - async: async_app.py처럼 이벤트 루프에서 감지 + 전송 task 동시 실행
+    elapsed_s는 이벤트 처리까지, delivered_s는 마지막 알림 전송까지 걸린 시간
+    trace_sample_rate > 0 이면 단계별 평균 시간(tracer.py)을 result["stages"]에 넣는다
+    ingress=True 이면 threaded 런타임에 app.py처럼 수신 큐(ingress.py)를 둔다.
+    Bolt 스레드가 큐에 넣고 바로 돌아오므로 최대 속도에서는 시계가 감지보다 앞서가고 과부하 모드/버림이 생긴다
+    (기본은 꺼 두고 Bolt 스레드에서 바로 감지: 런타임 간 알림 결과 비교용)
+    shards > 0 이면 감지를 워커 프로세스로 (shard.py, inline/threaded만).
+    inline은 이벤트마다 워커 응답까지 기다리므로 알림 결과가 단일 프로세스와 같아야 한다
+    룰 묶음 incident(config.INCIDENT_GROUPS)는 config.RULES로 돌릴 때만 (그룹 룰이 다른 룰 목록에는 없음)
+    """
+    incident_groups = config.INCIDENT_GROUPS if rules is None else []
+    rules = config.RULES if rules is None else rules
+    if runtime == "async":
+        return asyncio.run(_replay_async(bodies, rules, realtime_speed, slack_latency_seconds, trace_sample_rate,
+                                         incident_groups))
+    clock = ReplayClock(event_time(bodies[0]) if bodies else 0.0)
+    client = FakeSlackClient(clock, latency_seconds=slack_latency_seconds)
+    backend = MemoryBackend(config.WINDOW_SECONDS, config.WINDOW_BUCKET_SECONDS)
+    bot_class, extra = (ShardedErrorBot, {"shards": shards}) if shards else (ErrorBot, {})
+    extra["incident_groups"] = incident_groups
+    if make_bot is not None:
+        bot = make_bot(client, rules, backend, clock)
+    elif runtime == "threaded":
+        bot = bot_class(client, rules, backend, clock=clock, digest_flush_seconds=0,
+                        trace_sample_rate=trace_sample_rate,
+                        ingress_workers=config.INGRESS_WORKERS if ingress else 0, **extra)
+    else:
+        bot = bot_class(client, rules, backend, clock=clock, alert_workers=0, digest_flush_seconds=0,
+                        trace_sample_rate=trace_sample_rate, ingress_workers=0, **extra)
+    # inline + 샤드: 이벤트마다 워커 응답(트리거 처리)까지 기다림
+    wait_shards = bot.detector.join if shards and runtime == "inline" and make_bot is None else None
+    bot.init_identity()
+    bot.start()
+
+    latencies = []
+    timeline = _Timeline(bodies, clock, bot, realtime_speed)
+
+    # threaded: 처리 중인 이벤트를 워커 수만큼만 허용 (시계가 처리보다 멀리 앞서가지 않게)
+    in_flight = threading.BoundedSemaphore(BOLT_WORKER_THREADS)
+
+    def handle(body):
+        try:
+            t0 = time.perf_counter()
+            bot.handle_message(body)
+            if wait_shards is not None:
+                wait_shards()
+            latencies.append(time.perf_counter() - t0)
+        finally:
+            in_flight.release()
+
+    pool = ThreadPoolExecutor(BOLT_WORKER_THREADS) if runtime == "threaded" else None
+    started = time.perf_counter()
+    for body in bodies:
+        wait = timeline.wait_seconds(body)
+        if wait:
+            time.sleep(wait)
+        in_flight.acquire()
+        timeline.advance(body)
+        if pool is None:
+            handle(body)
+        else:
+            pool.submit(handle, body)
+    if pool is not None:
+        pool.shutdown(wait=True)
+    elapsed = time.perf_counter() - started
+    bot.stop()
+    delivered = time.perf_counter() - started
+    return _result(bodies, latencies, elapsed, delivered, client, timeline.first_ts, bot)
+
+
+async def _replay_async(bodies, rules, realtime_speed: float, slack_latency_seconds: float,
+                        trace_sample_rate: float, incident_groups):
+    clock = ReplayClock(event_time(bodies[0]) if bodies else 0.0)
+    client = FakeAsyncSlackClient(clock, latency_seconds=slack_latency_seconds)
+    backend = MemoryBackend(config.WINDOW_SECONDS, config.WINDOW_BUCKET_SECONDS)
+    bot = AsyncErrorBot(client, rules, backend, clock=clock, alert_workers=config.ASYNC_SEND_CONCURRENCY,
+                        digest_flush_seconds=0, trace_sample_rate=trace_sample_rate,
+                        incident_groups=incident_groups)
+    await bot.init_identity_async()
+    bot.start()
+
+    latencies = []
+    timeline = _Timeline(bodies, clock, bot, realtime_speed)
+    started = time.perf_counter()
+    for body in bodies:
+        # 소켓에서 다음 이벤트를 기다리는 동안처럼 루프에 양보 (전송 task 진행)
+        await asyncio.sleep(timeline.wait_seconds(body))
+        timeline.advance(body)
+        t0 = time.perf_counter()
+        bot.handle_message(body)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    await bot.alert_queue.join()
+    await bot.aclose()
+    delivered = time.perf_counter() - started
+    return _result(bodies, latencies, elapsed, delivered, client, timeline.first_ts, bot)
+
+
+# --------------------------------------------------------
+# 벤치 시나리오
+# --------------------------------------------------------
+def _event(n: int, ts: float, channel: str, text: str) -> dict:
+    return {
+        "event_id": f"Ev{n:08d}",
+        "event": {"type": "message", "channel": channel, "user": "UALERTBOT", "text": text, "ts": f"{ts:.6f}"},
+    }
+
+
+def scenario_long_traces(n: int = 2_000, start: float = 1_700_000_000.0):
+    """
+    SVC_WATCHTOWER_CH에 20KB 스택트레이스가 0.5초 간격으로 쏟아짐
+    """
+    pool = [make_long_message(20_000, seed=i) for i in range(8)]
+    return [_event(i, start + i * 0.5, config.SVC_WATCHTOWER_CH, pool[i % len(pool)]) for i in range(n)]
+
+
+def scenario_keyword_dense(n: int = 5_000, start: float = 1_700_000_000.0):
+    """
+    한 메시지에 키워드가 수백 번 들어간 짧은 메시지 (TMAP "API", watchtower 벤더 키워드)
+    """
+    texts = [
+        (config.SVC_TMAP_DIV_CH, "API error " * 500),
+        (config.SVC_TMAP_DIV_CH, "status=500 TOAST ERROR " * 100),
+        (config.SVC_WATCHTOWER_CH, "Claude Gemini MODEL_LABEL: GPT Perplexity " * 100),
+    ]
+    return [_event(i, start + i * 0.2, *texts[i % len(texts)]) for i in range(n)]
+
+
+def scenario_many_channels(n: int = 20_000, channels: int = 200, start: float = 1_700_000_000.0):
+    """
+    봇이 초대된 채널 다수 (대부분 감시 대상 아님) + 감시 채널 일부
+    """
+    rnd = random.Random(7)
+    watched = sorted({rule["channel"] for rule in config.RULES})
+    noisy = [f"CNOISE{i:05d}" for i in range(channels - len(watched))]
+    all_channels = watched + noisy
+    words = ["deploy", "ok", "RTZR_API", "PET_API", "API", "status=500", "hello", "timeout"]
+    out = []
+    for i in range(n):
+        text = " ".join(rnd.choice(words) for _ in range(12))
+        out.append(_event(i, start + i * 0.05, rnd.choice(all_channels), text))
+    return out
+
+
+SCENARIOS = {
+    "long_traces": scenario_long_traces,
+    "keyword_dense": scenario_keyword_dense,
+    "many_channels": scenario_many_channels,
+}
+
+
+def print_result(name: str, result: dict, show_alerts: bool = True):
+    lat = result["latency_us"]
+    print(
+        f"[{name}] events={result['events']} {result['events_per_s']:.0f} ev/s "
+        f"p50={lat['p50']:.1f}us p99={lat['p99']:.1f}us max={lat['max']:.1f}us "
+        f"alerts={len(result['alerts'])} delivered={result['delivered_s']:.2f}s"
+    )
+    if result.get("stages"):
+        print("  stages " + " ".join(f"{name}={stage['mean_us']:.1f}us" for name, stage in result["stages"].items())
+              + f" (n={result['stages']['total']['n']})")
+    if result.get("ingress"):
+        print("  ingress " + " ".join(f"{name}={value}" for name, value in result["ingress"].items()))
+    if result.get("shards"):
+        print("  shards " + " ".join(f"{name}={value}" for name, value in result["shards"].items()))
+    if show_alerts:
+        for alert in result["alerts"]:
+            print(f"  +{alert['t']:9.1f}s {alert['channel']} {alert['text'][:80]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded Slack message events through ErrorBot")
+    parser.add_argument("path", nargs="?", help="JSONL file of recorded events")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS) + ["all"], help="built-in benchmark scenario")
+    parser.add_argument("--realtime", type=float, default=0.0, metavar="SPEED",
+                        help="replay with original spacing divided by SPEED (default: as fast as possible)")
+    parser.add_argument("--slack-latency-ms", type=float, default=0.0, help="fake chat_postMessage latency")
+    parser.add_argument("--runtime", choices=RUNTIMES, default="inline",
+                        help="inline (deterministic), threaded (app.py) or async (async_app.py)")
+    parser.add_argument("--trace-sample", type=float, default=0.0, metavar="RATE",
+                        help="sample RATE of events for per-stage timing (tracer.py)")
+    parser.add_argument("--ingress", action="store_true",
+                        help="threaded runtime: bounded ingress queue in front of detection, as in app.py")
+    parser.add_argument("--shards", type=int, default=0, metavar="N",
+                        help="inline/threaded runtime: run detection in N channel-sharded worker processes (shard.py)")
+    parser.add_argument("--write", metavar="PATH", help="write the scenario events to JSONL instead of replaying")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--quiet", action="store_true", help="do not list alerts")
+    args = parser.parse_args(argv)
+    if args.shards and args.runtime == "async":
+        parser.error("--shards works with the inline and threaded runtimes")
+
+    if args.path:
+        runs = [(args.path, load_jsonl(args.path))]
+    elif args.scenario:
+        names = sorted(SCENARIOS) if args.scenario == "all" else [args.scenario]
+        runs = [(name, SCENARIOS[name]()) for name in names]
+    else:
+        parser.error("give a JSONL path or --scenario")
+
+    if args.write:
+        with open(args.write, "w", encoding="utf-8") as f:
+            for _name, bodies in runs:
+                for body in bodies:
+                    f.write(json.dumps(body, ensure_ascii=False) + "\n")
+        return 0
+
+    results = {}
+    for name, bodies in runs:
+        result = replay(bodies, realtime_speed=args.realtime, slack_latency_seconds=args.slack_latency_ms / 1000.0,
+                        runtime=args.runtime, trace_sample_rate=args.trace_sample, ingress=args.ingress,
+                        shards=args.shards)
+        results[name] = result
+        if not args.json:
+            print_result(name, result, show_alerts=not args.quiet)
+    if args.json:
+        json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
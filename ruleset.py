@@ -0,0 +1,410 @@
+"""
+룰 설정 로드 / 검증 / 컴파일
+
+룰은 config.RULES(기본값) 또는 외부 JSON/YAML 파일(RULES_FILE)에서 읽는다.
+읽은 룰은 검증 후 불변 RuleSet으로 컴파일한다.
+- 룰/notify는 MappingProxyType, 목록은 tuple (런타임에 수정 불가)
+- notify 텍스트의 {변수}는 컴파일 시 1번만 치환
+- 채널 인덱스(매처 포함)도 여기서 만든다
+
+실행 중 교체는 ErrorBot.swap_rules(RuleSet) 참고 (속성 1개 교체라 이벤트 처리가 멈추지 않음).
+
+파일 형식 (JSON도 같은 구조):
+    vars:                       # 선택. config의 대문자 문자열 상수(ALERT_PREFIX, *_CH, MENTION_* 등)를 덮어씀
+      NEW_VENDOR_CH: C0123ABCD
+    rules:
+      - name: RTZR_API
+        channel: SVC_WATCHTOWER_CH      # 변수 이름 또는 채널 ID
+        keyword: RTZR_API
+        threshold: 6                    # adaptive 룰에서는 학습(warmup) 중에 쓰는 값
+        match: absent                   # 선택: keyword가 "없는" 메시지를 센다
+        adaptive: {k: 4, floor: 3}      # 선택: 평소 대비 k·표준편차를 넘으면 발사 (baseline.py, true면 기본값)
+        rate_limit: [1, 600]            # 선택: 룰별 발언 제한 (burst, per_seconds), 기본 RULE_RATE_LIMIT
+        notify:
+          - channel: SVC_WATCHTOWER_CH
+            text: "{ALERT_PREFIX} 노트 에러(RTZR_API)가 감지되었습니다. (cc. {MENTION_HEO}님)"
+            include_log: false
+      - name: TMAP_5XX
+        channel: SVC_TMAP_DIV_CH
+        keyword: status=5               # pattern/field 룰에서는 모든 매치에 들어 있는 필수 리터럴 (사전 필터)
+        pattern: 'status=5\\d\\d'       # 선택: 정규식 (대소문자 무시), 매치 수 = hit
+        # field: "latency_ms > 3000"    # 선택: key=value 필드 조건 (keyword 생략 시 필드 이름)
+        threshold: 6
+        notify: [...]
+
+사용법:
+    python ruleset.py --check rules.yaml     # 검증만
+    python ruleset.py --dump rules.json      # 현재 config.RULES를 파일로 내보내기
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+import config
+from baseline import AdaptiveSpec
+from detector import build_channel_index
+from matcher import compile_pattern_counter, parse_field_expr
+
+RuleSet = namedtuple("RuleSet", ["rules", "channel_index", "keys", "version", "source"])
+
+_RULE_FIELDS = {"name", "channel", "keyword", "threshold", "match", "notify", "rate_limit", "pattern", "field",
+                "adaptive"}
+_NOTIFY_FIELDS = {"channel", "text", "include_log"}
+_MATCH_MODES = (None, "absent")
+_CHANNEL_ID_RE = re.compile(r"^[A-Z][A-Z0-9]{2,}$")
+
+
+class RuleConfigError(ValueError):
+    def __init__(self, source: str, errors):
+        self.source = source
+        self.errors = list(errors)
+        super().__init__(f"{source}: " + "; ".join(self.errors))
+
+
+# --------------------------------------------------------
+# 컴파일
+# --------------------------------------------------------
+def default_vars() -> dict:
+    """
+    config 모듈의 대문자 문자열 상수 (채널 ID, MENTION_*, ALERT_PREFIX)
+    """
+    return {
+        name: value for name, value in vars(config).items()
+        if name.isupper() and isinstance(value, str)
+    }
+
+
+def _resolve_channel(value, variables, where, errors):
+    if not isinstance(value, str) or not value:
+        errors.append(f"{where}: channel must be a non-empty string")
+        return None
+    channel = variables.get(value, value)
+    if not isinstance(channel, str) or not _CHANNEL_ID_RE.match(channel):
+        errors.append(f"{where}: unknown channel {value!r} (not a variable or Slack channel ID)")
+        return None
+    return channel
+
+
+def _render(text, variables, where, errors):
+    if not isinstance(text, str) or not text:
+        errors.append(f"{where}: text must be a non-empty string")
+        return None
+    try:
+        return text.format_map(variables)
+    except KeyError as e:
+        errors.append(f"{where}: unknown variable {{{e.args[0]}}} in text")
+    except (ValueError, IndexError) as e:
+        errors.append(f"{where}: bad text template ({e}); use {{{{ }}}} for literal braces")
+    return None
+
+
+def _compile_rule(raw, i, variables, errors):
+    where = f"rules[{i}]"
+    if not isinstance(raw, dict):
+        errors.append(f"{where}: must be a mapping")
+        return None
+    n_errors = len(errors)
+
+    unknown = set(raw) - _RULE_FIELDS
+    if unknown:
+        errors.append(f"{where}: unknown field(s) {sorted(unknown)}")
+    name = raw.get("name")
+    if not isinstance(name, str) or not name:
+        errors.append(f"{where}: name must be a non-empty string")
+    else:
+        where = f"rules[{i}] ({name})"
+    pattern, field = raw.get("pattern"), raw.get("field")
+    keyword = raw.get("keyword")
+    bad_field = False
+    if field is not None and keyword is None and isinstance(field, str):
+        try:
+            keyword = parse_field_expr(field)[0]
+        except ValueError:
+            bad_field = True  # 아래 field 검사에서 형식 오류로 보고
+    if (not isinstance(keyword, str) or not keyword) and not bad_field:
+        errors.append(f"{where}: keyword must be a non-empty string"
+                      + (" (literal that every pattern match contains)" if pattern is not None else ""))
+    if pattern is not None and field is not None:
+        errors.append(f"{where}: use either pattern or field, not both")
+    elif pattern is not None:
+        try:
+            if not isinstance(pattern, str) or not pattern:
+                raise ValueError("must be a non-empty string")
+            compile_pattern_counter(pattern)
+        except (re.error, ValueError) as e:
+            errors.append(f"{where}: bad pattern ({e})")
+    elif field is not None:
+        try:
+            if not isinstance(field, str):
+                raise ValueError("must be a string like 'latency_ms > 3000'")
+            field_name = parse_field_expr(field)[0]
+            if isinstance(keyword, str) and keyword.lower() not in field_name.lower():
+                raise ValueError(f"keyword {keyword!r} must be part of the field name {field_name!r}")
+        except ValueError as e:
+            errors.append(f"{where}: bad field ({e})")
+    threshold = raw.get("threshold")
+    if isinstance(threshold, bool) or not isinstance(threshold, int) or threshold < 1:
+        errors.append(f"{where}: threshold must be a positive integer")
+    match = raw.get("match")
+    if match not in _MATCH_MODES:
+        errors.append(f"{where}: match must be one of {[m for m in _MATCH_MODES if m]} (or omitted)")
+    channel = _resolve_channel(raw.get("channel"), variables, where, errors)
+    rate_limit = raw.get("rate_limit")
+    if rate_limit is not None:
+        if (not isinstance(rate_limit, (list, tuple)) or len(rate_limit) != 2
+                or isinstance(rate_limit[0], bool) or not isinstance(rate_limit[0], int) or rate_limit[0] < 1
+                or isinstance(rate_limit[1], bool) or not isinstance(rate_limit[1], (int, float))
+                or rate_limit[1] <= 0):
+            errors.append(f"{where}: rate_limit must be [burst (int >= 1), per_seconds (> 0)]")
+        else:
+            rate_limit = tuple(rate_limit)
+
+    adaptive = _compile_adaptive(raw.get("adaptive"), where, errors)
+
+    notify = []
+    raw_notify = raw.get("notify", [])
+    if not isinstance(raw_notify, (list, tuple)):
+        errors.append(f"{where}: notify must be a list")
+        raw_notify = []
+    for j, action in enumerate(raw_notify):
+        a_where = f"{where}.notify[{j}]"
+        if not isinstance(action, dict):
+            errors.append(f"{a_where}: must be a mapping")
+            continue
+        unknown = set(action) - _NOTIFY_FIELDS
+        if unknown:
+            errors.append(f"{a_where}: unknown field(s) {sorted(unknown)}")
+        include_log = action.get("include_log", False)
+        if not isinstance(include_log, bool):
+            errors.append(f"{a_where}: include_log must be true/false")
+        notify.append(MappingProxyType({
+            "channel": _resolve_channel(action.get("channel"), variables, a_where, errors),
+            "text": _render(action.get("text"), variables, a_where, errors),
+            "include_log": include_log,
+        }))
+
+    if len(errors) > n_errors:
+        return None
+    rule = {"name": name, "channel": channel, "keyword": keyword, "threshold": threshold, "notify": tuple(notify)}
+    if match is not None:
+        rule["match"] = match
+    if rate_limit is not None:
+        rule["rate_limit"] = rate_limit
+    if pattern is not None:
+        rule["pattern"] = pattern
+    if field is not None:
+        rule["field"] = field
+    if adaptive is not None:
+        rule["adaptive"] = adaptive
+    return MappingProxyType(rule)
+
+
+def _compile_adaptive(raw, where: str, errors: list):
+    """
+    adaptive: true 또는 {k, floor, warmup, alpha} (빠진 값은 config.ADAPTIVE_DEFAULTS)
+    """
+    if raw is None or raw is False:
+        return None
+    if raw is True:
+        raw = {}
+    if not isinstance(raw, dict):
+        errors.append(f"{where}: adaptive must be true or a mapping")
+        return None
+    unknown = set(raw) - set(AdaptiveSpec._fields)
+    if unknown:
+        errors.append(f"{where}.adaptive: unknown field(s) {sorted(unknown)}")
+        return None
+    spec = AdaptiveSpec(**dict(config.ADAPTIVE_DEFAULTS, **raw))
+    numbers = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in spec)
+    if not numbers or spec.k <= 0 or not 0 < spec.alpha < 1:
+        errors.append(f"{where}.adaptive: k must be > 0 and alpha in (0, 1)")
+        return None
+    if not isinstance(spec.floor, int) or spec.floor < 1 or not isinstance(spec.warmup, int) or spec.warmup < 0:
+        errors.append(f"{where}.adaptive: floor must be an integer >= 1 and warmup an integer >= 0")
+        return None
+    return spec
+
+
+def _version(rules) -> str:
+    canonical = json.dumps(
+        [dict(rule, notify=[dict(a) for a in rule["notify"]]) for rule in rules],
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+def compile_rules(raw_rules, variables: dict = None, source: str = "config.RULES") -> RuleSet:
+    """
+    raw_rules 검증 + 불변 RuleSet 생성. 문제가 하나라도 있으면 전부 모아서 RuleConfigError
+    """
+    variables = default_vars() if variables is None else variables
+    errors = []
+    if not isinstance(raw_rules, (list, tuple)) or not raw_rules:
+        raise RuleConfigError(source, ["rules must be a non-empty list"])
+
+    rules = [_compile_rule(raw, i, variables, errors) for i, raw in enumerate(raw_rules)]
+    if errors:
+        raise RuleConfigError(source, errors)
+
+    rules = tuple(rules)
+    return RuleSet(
+        rules=rules,
+        channel_index=build_channel_index(rules),
+        keys=frozenset((rule["channel"], rule["name"]) for rule in rules),
+        version=_version(rules),
+        source=source,
+    )
+
+
+# --------------------------------------------------------
+# 파일
+# --------------------------------------------------------
+def _read_file(path: str):
+    with open(path, encoding="utf-8") as f:
+        raw = f.read()
+    if path.endswith((".yaml", ".yml")):
+        import yaml  # YAML 파일을 쓸 때만 필요
+
+        return yaml.safe_load(raw)
+    return json.loads(raw)
+
+
+def load_rules_file(path: str) -> RuleSet:
+    try:
+        data = _read_file(path)
+    except Exception as e:
+        raise RuleConfigError(path, [f"cannot read: {repr(e)}"]) from e
+    if not isinstance(data, dict) or "rules" not in data:
+        raise RuleConfigError(path, ["top level must be a mapping with 'rules' (and optional 'vars')"])
+
+    file_vars = data.get("vars") or {}
+    if not isinstance(file_vars, dict) or not all(isinstance(v, str) for v in file_vars.values()):
+        raise RuleConfigError(path, ["vars must be a mapping of name -> string"])
+    return compile_rules(data["rules"], {**default_vars(), **file_vars}, source=path)
+
+
+def load_rules(path: str = None) -> RuleSet:
+    """
+    path가 있으면 파일, 없으면 config.RULES
+    """
+    if path:
+        return load_rules_file(path)
+    return compile_rules(config.RULES)
+
+
+def dump_rules(ruleset: RuleSet) -> dict:
+    """
+    RuleSet -> 룰 파일 형식 ({"rules": [...]}). load_rules_file로 다시 읽으면 같은 version
+    - 이미 치환된 notify text의 중괄호는 이스케이프 (다시 {VAR} 치환되지 않게)
+    - adaptive(AdaptiveSpec)는 mapping으로 (JSON 리스트면 검증에서 거부됨)
+    """
+    rules = []
+    for rule in ruleset.rules:
+        out = dict(rule, notify=[dict(a, text=a["text"].replace("{", "{{").replace("}", "}}"))
+                                 for a in rule["notify"]])
+        if "adaptive" in rule:
+            out["adaptive"] = rule["adaptive"]._asdict()
+        rules.append(out)
+    return {"rules": rules}
+
+
+def diff_rules(old: RuleSet, new: RuleSet) -> dict:
+    """
+    (channel, rule name) 키 기준 비교
+    - changed: keyword/match/pattern/field/adaptive가 바뀐 키
+      (무엇을 세는지 또는 적응형 기준선의 의미가 달라지므로 윈도우 카운트와 EWMA 기준선 초기화 대상)
+    - threshold/notify/rate_limit만 바뀐 키는 unchanged로 보고 카운트를 유지한다
+    """
+    def signatures(ruleset):
+        out = {}
+        for rule in ruleset.rules:
+            out.setdefault((rule["channel"], rule["name"]), []).append(
+                (rule["keyword"], rule.get("match"), rule.get("pattern"), rule.get("field"), rule.get("adaptive")))
+        return out
+
+    old_sig, new_sig = signatures(old), signatures(new)
+    return {
+        "added": sorted(new_sig.keys() - old_sig.keys()),
+        "removed": sorted(old_sig.keys() - new_sig.keys()),
+        "changed": sorted(k for k in new_sig.keys() & old_sig.keys() if new_sig[k] != old_sig[k]),
+    }
+
+
+class RulesFileWatcher:
+    """
+    interval_seconds마다 파일 mtime/size를 보고 바뀌었으면 on_change()를 호출 (폴링, 외부 의존 없음)
+    """
+
+    def __init__(self, path: str, on_change, interval_seconds: float = 5.0):
+        self.path = path
+        self.on_change = on_change
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self._last = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            current = self._stat()
+            if current is None or current == self._last:
+                continue
+            self._last = current
+            try:
+                self.on_change()
+            except Exception as e:
+                print(f"[RULES_WATCH_FAIL] {repr(e)}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="rules-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+
+
+# --------------------------------------------------------
+# CLI
+# --------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate or export alert rule files")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--check", metavar="PATH", help="validate a JSON/YAML rule file")
+    group.add_argument("--dump", metavar="PATH", help="write config.RULES as a JSON rule file")
+    args = parser.parse_args(argv)
+
+    if args.dump:
+        ruleset = compile_rules(config.RULES)
+        data = dump_rules(ruleset)
+        with open(args.dump, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"wrote {len(ruleset.rules)} rules to {args.dump} (version={ruleset.version})")
+        return 0
+
+    try:
+        ruleset = load_rules_file(args.check)
+    except RuleConfigError as e:
+        for error in e.errors:
+            print(f"{e.source}: {error}")
+        return 1
+    print(f"{args.check}: OK rules={len(ruleset.rules)} channels={len(ruleset.channel_index)} version={ruleset.version}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Slack 런타임 공통 부품 (app.py: 스레드 / async_app.py: asyncio)
+
+백엔드, 룰 파일 감시/재적용, 상태 저장, 메트릭 노출을 같은 설정으로 만든다.
+slack_bolt는 import하지 않는다.
+"""
+import time
+
+from backend import MemoryBackend, RedisBackend
+from config import (
+    ERRSTATS_DEFAULT_SECONDS,
+    ERRSTATS_MAX_RULES,
+    HANDOFF_PATH,
+    HANDOFF_POLL_SECONDS,
+    HANDOFF_TIMEOUT_SECONDS,
+    METRICS_PORT,
+    METRICS_TEXTFILE,
+    METRICS_TEXTFILE_SECONDS,
+    RULES_FILE,
+    RULES_WATCH_SECONDS,
+    SHARED_WINDOW_BUCKET_SECONDS,
+    STATE_DB_PATH,
+    STATE_FLUSH_SECONDS,
+    STATE_REDIS_URL,
+    WINDOW_BUCKET_SECONDS,
+    WINDOW_SECONDS,
+)
+from handoff import HandoffCoordinator
+from history import parse_errstats, render_errstats
+from metrics import MetricsServer, TextfileExporter
+from ruleset import RuleConfigError, RulesFileWatcher, load_rules
+from state_store import StateSnapshotter, StateStore
+
+
+def build_backend():
+    if STATE_REDIS_URL:
+        try:
+            import redis  # 공유 모드에서만 필요 (requirements.txt)
+        except ImportError as e:
+            raise SystemExit("[BOOT] STATE_REDIS_URL is set but the redis package is missing (pip install redis)") from e
+
+        client = redis.Redis.from_url(STATE_REDIS_URL)
+        print(f"[BOOT] state backend=redis url={STATE_REDIS_URL}")
+        return RedisBackend(client, WINDOW_SECONDS, SHARED_WINDOW_BUCKET_SECONDS)
+    return MemoryBackend(WINDOW_SECONDS, WINDOW_BUCKET_SECONDS)
+
+
+def initial_rules():
+    return load_rules(RULES_FILE)
+
+
+def reload_rules(bot):
+    """
+    RULES_FILE을 다시 읽어 교체. 검증 실패 시 기존 룰을 그대로 쓴다.
+    반환: (swap 결과 또는 None(변경 없음/실패), 에러 문자열 또는 None)
+    """
+    try:
+        ruleset = load_rules(RULES_FILE)
+        if ruleset.version == bot.ruleset.version:
+            return None, None
+        return bot.swap_rules(ruleset), None
+    except RuleConfigError as e:
+        print(f"[RULES_RELOAD_FAIL] {e}")
+        return None, str(e)
+
+
+def reload_reply(bot) -> str:
+    """
+    /reload 응답 문구
+    """
+    if not RULES_FILE:
+        return "RULES_FILE이 설정되지 않아 다시 읽을 룰 파일이 없습니다."
+    result, error = reload_rules(bot)
+    if error:
+        return f"⚠️ 룰 파일 오류로 기존 룰을 유지합니다.\n```{error}```"
+    if result is None:
+        return f"변경 없음 (version={bot.ruleset.version})"
+    return (
+        f"✅ 룰 교체 완료 version={result['version']} rules={result['rules']} "
+        f"(추가 {len(result['added'])} / 삭제 {len(result['removed'])} / 변경 {len(result['changed'])}, "
+        f"{result['took_ms']:.1f}ms)"
+    )
+
+
+def errstats_reply(bot, text: str) -> str:
+    """
+    /errstats [rule] [range] 응답 (룰 이름은 대소문자 무시, range 예: 30m / 6h / 7d)
+    """
+    rule, seconds, label = parse_errstats(text, ERRSTATS_DEFAULT_SECONDS)
+    keys = bot.history.keys()
+    if rule is not None:
+        wanted = rule.lower()
+        keys = [key for key in keys if key[1].lower() == wanted]
+        if not keys:
+            return f"'{rule}' 룰의 이력이 없습니다. 사용법: /errstats [rule] [30m|6h|7d]"
+    return render_errstats(bot.history, keys, seconds, label, bot.clock(), limit=ERRSTATS_MAX_RULES)
+
+
+def build_rules_watcher(bot):
+    if not RULES_FILE:
+        return None
+    return RulesFileWatcher(RULES_FILE, lambda: reload_rules(bot), RULES_WATCH_SECONDS)
+
+
+def build_state(bot):
+    """
+    반환: (StateStore 또는 None, StateSnapshotter 또는 None)
+    Redis 공유 모드에서는 Redis 자체가 상태 저장소라 로컬 파일은 쓰지 않음
+    """
+    if not STATE_DB_PATH or STATE_REDIS_URL:
+        return None, None
+    store = StateStore(STATE_DB_PATH)
+    return store, StateSnapshotter(store, bot.collect_state, STATE_FLUSH_SECONDS)
+
+
+def build_metrics_exporters(registry):
+    exporters = []
+    if METRICS_PORT is not None:
+        exporters.append(MetricsServer(registry, METRICS_PORT))
+    if METRICS_TEXTFILE:
+        exporters.append(TextfileExporter(registry, METRICS_TEXTFILE, METRICS_TEXTFILE_SECONDS))
+    return exporters
+
+
+def build_handoff(bot, state_store, state_snapshotter, on_drain, path=HANDOFF_PATH, **coordinator_kwargs):
+    """
+    path(HANDOFF_PATH)가 있으면 무중단 재시작 코디네이터 (없으면 None)
+    on_drain(): 이전 프로세스 쪽 - 연결 종료, 처리 중 이벤트/전송 큐 drain, 마지막 상태 저장
+    콜백은 코디네이터 스레드에서 불린다.
+    """
+    if not path:
+        return None
+
+    def on_handoff():
+        # 겹침 구간: 이후 이벤트는 공유 테이블로 중복 확인, 최근 키는 다음 프로세스가 보도록 기록
+        bot.overlap_claim = coordinator.claim
+        coordinator.publish_keys(bot.event_dedupe.keys())
+        on_drain()
+
+    def on_takeover(released):
+        if state_store is not None:
+            # 이전 프로세스의 마지막 저장 상태 + 겹침 구간에 내가 센 카운트
+            bot.restore_state(state_store, merge=True)
+            state_snapshotter.start()
+        bot.overlap_claim = None
+
+    coordinator_kwargs.setdefault("poll_seconds", HANDOFF_POLL_SECONDS)
+    coordinator_kwargs.setdefault("timeout_seconds", HANDOFF_TIMEOUT_SECONDS)
+    coordinator = HandoffCoordinator(path, on_handoff, on_takeover, **coordinator_kwargs)
+    return coordinator
+
+
+def prepare_state(bot, coordinator, state_store, state_snapshotter):
+    """
+    Socket Mode 연결 전에 호출
+    이전 프로세스가 아직 서비스 중이면(successor) 상태 복원/저장은 인수 시점(on_takeover)으로 미룬다.
+    """
+    role = coordinator.begin() if coordinator is not None else "owner"
+    if role == "successor":
+        bot.overlap_claim = coordinator.claim
+        return role
+    if state_store is not None:
+        bot.restore_state(state_store)
+        state_snapshotter.start()
+    return role
+
+
+def record_ready(bot, started: float, coordinator):
+    """
+    started(time.monotonic) ~ Socket Mode 연결 완료까지를 메트릭으로 남긴다
+    """
+    ready_seconds = time.monotonic() - started
+    print(f"[BOOT] ready in {ready_seconds:.2f}s role={coordinator.role if coordinator is not None else 'owner'}")
+    m = bot.metrics
+    m.gauge("errbot_startup_seconds", "Seconds from process start to Socket Mode connected", (),
+            lambda: [((), ready_seconds)])
+    if coordinator is not None:
+        m.gauge("errbot_handoff_seconds", "Seconds from overlap start to taking over from the previous process", (),
+                lambda: [] if coordinator.takeover_seconds is None else [((), coordinator.takeover_seconds)])
@@ -0,0 +1,561 @@
+"""
+채널 샤딩 멀티프로세스 감지 (SHARD_WORKERS > 0)
+
+큰 메시지의 lower + 키워드/정규식 스캔은 CPU 작업이라 Bolt 스레드를 늘려도 GIL 하나에 묶인다.
+이 모드에서는 감지를 N개 워커 프로세스로 나눈다.
+- 채널 ID를 consistent hashing(ShardRing)으로 워커에 배정. 채널의 윈도우 카운트/적응형 기준선은
+  그 워커만 들고 있다 (채널 하나는 항상 한 워커 - 같은 키를 두 프로세스가 세지 않음)
+- 코디네이터(ShardedErrorBot, Socket Mode 쪽 프로세스)는 필터/중복 제거/!mute, 발언 제한(전역 포함),
+  보류 요약, 시그니처/이력, Slack 전송을 그대로 맡는다 (ErrorBot 코드 그대로)
+- 워커로는 이벤트 dict가 아니라 (seq, now_ts, channel, text)만 간다. text는 UTF-8로 한 번 인코딩해
+  헤더와 붙인 바이트 1개를 send_bytes로 (pickle 없음), 워커는 memoryview에서 바로 디코딩
+- 워커 응답은 hit 난 룰의 (이름, hits, threshold, 발사 여부)와 에러 시그니처만. 입력이 밀려 있으면
+  최대 REPLY_BATCH건씩 묶어 보낸다
+- 코디네이터의 응답 스레드 1개가 seq 순서대로 적용한다 (워커 간 응답 순서가 달라도 트리거 순서는
+  이벤트가 들어온 순서). 그래서 발언 제한/요약/알림 결과가 단일 프로세스와 같다
+  (replay.py --shards, bench.py shards)
+
+- 윈도우 시각(now_ts)은 코디네이터가 이벤트를 넘길 때의 시계 값을 같이 보낸다 (리플레이 시계 그대로)
+- 워커 호출(룰 교체, mute 초기화, 상태 내보내기 등)도 같은 파이프와 seq를 쓰므로 이벤트와 순서가 섞이지 않는다
+- 파이프가 차면 submit이 기다린다 (워커가 밀린 만큼 Bolt 스레드가 느려짐 - 이벤트를 버리지 않음)
+- 워커가 죽으면 그 워커 채널의 이벤트는 버리고 센다 ([SHARD_EXIT], stats의 dropped)
+- 수신 큐(ingress.py)는 쓰지 않는다. 워커 파이프가 그 역할 (과부하 모드 없음)
+- 워커는 spawn으로 띄운다 (Bolt/메트릭 스레드가 있는 프로세스를 fork하지 않음)
+- 배정은 채널 단위라 바쁜 채널이 몇 개 없으면 워커 부하가 고르지 않다 (채널 하나는 코어 하나를 넘지 못함)
+"""
+import bisect
+import itertools
+import multiprocessing
+import pickle
+import signal
+import struct
+import threading
+import time
+import zlib
+from multiprocessing.connection import wait
+
+import config
+from backend import MemoryBackend
+from bot import ErrorBot
+from detector import Detector, build_channel_index
+from fingerprint import FINGERPRINT_KEY, fingerprint
+
+# 워커로 보내는 룰 필드 (notify 등 전송 설정은 코디네이터만)
+DETECT_FIELDS = ("name", "channel", "keyword", "threshold", "match", "pattern", "field", "adaptive")
+
+REPLY_BATCH = 64
+RING_REPLICAS = 64
+
+_EVENT = b"E"
+_CALL = b"C"
+_HEADER = struct.Struct("<QdH")  # seq, now_ts, channel 바이트 수
+
+
+class ShardRing:
+    """
+    채널 -> 워커 번호 (가상 노드 RING_REPLICAS개씩, crc32 - 프로세스/재시작과 무관하게 같은 배정)
+    워커 수가 바뀌어도 옮겨 가는 채널은 약 1/N
+    """
+
+    def __init__(self, shards: int, replicas: int = RING_REPLICAS):
+        points = sorted((zlib.crc32(f"shard-{i}-{r}".encode()), i) for i in range(shards) for r in range(replicas))
+        self._hashes = [h for h, _i in points]
+        self._owners = [i for _h, i in points]
+
+    def shard_for(self, channel: str) -> int:
+        i = bisect.bisect(self._hashes, zlib.crc32(channel.encode("utf-8")))
+        return self._owners[i % len(self._owners)]
+
+
+def detect_rule(rule) -> dict:
+    return {name: rule[name] for name in DETECT_FIELDS if name in rule}
+
+
+# --------------------------------------------------------
+# 워커 프로세스
+# --------------------------------------------------------
+class _Clock:
+    __slots__ = ("now",)
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Worker:
+    """
+    워커 프로세스 안의 감지 (Detector + MemoryBackend, 트리거는 응답으로 돌려줌)
+    """
+
+    def __init__(self, window_seconds: float, bucket_seconds: float, fingerprint_chars: int):
+        self.clock = _Clock()
+        self.backend = MemoryBackend(window_seconds, bucket_seconds)
+        self.detector = Detector({}, None, self.backend, clock=self.clock)
+        self.fingerprint_chars = fingerprint_chars
+
+    def event(self, now_ts: float, channel: str, text: str):
+        self.clock.now = now_ts
+        matched = self.detector.match({"channel": channel, "text": text})
+        if matched is None:
+            return None
+        _hit_rules, items, now_ts = matched
+        fired = self.backend.record_hits(now_ts, items)
+        fp = fingerprint(text, self.fingerprint_chars) if self.fingerprint_chars else None
+        return [(key[1], hits, threshold, hit) for (key, hits, threshold), hit in zip(items, fired)], fp
+
+    # 코디네이터 호출 (ShardedDetector._call)
+    def swap(self, rules, reset_keys):
+        self.detector.swap(build_channel_index(rules), reset_keys=reset_keys)
+        return len(rules)
+
+    def reset(self):
+        self.detector.reset()
+
+    def window_count(self, key, now_ts: float) -> int:
+        return self.backend.window_count(key, now_ts)
+
+    def threshold(self, rule) -> int:
+        return self.detector.threshold(rule)
+
+    def export(self, dirty_only: bool):
+        return self.backend.export_windows(dirty_only), self.detector.adaptive.export()
+
+    def load(self, windows, baselines, merge: bool):
+        restored = self.backend.merge_windows(windows) if merge else self.backend.import_windows(windows)
+        return restored, self.detector.adaptive.load(baselines, merge=merge)
+
+
+def _worker_main(requests, replies, window_seconds: float, bucket_seconds: float, fingerprint_chars: int):
+    # 종료는 코디네이터가 파이프로 (Ctrl-C/SIGTERM은 코디네이터가 받아서 drain)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    worker = _Worker(window_seconds, bucket_seconds, fingerprint_chars)
+    offset = 1 + _HEADER.size
+    running = True
+    while running:
+        out = []
+        while True:
+            try:
+                msg = requests.recv_bytes()
+            except EOFError:
+                return
+            if msg[:1] == _EVENT:
+                seq, now_ts, channel_len = _HEADER.unpack_from(msg, 1)
+                view = memoryview(msg)
+                channel = str(view[offset:offset + channel_len], "utf-8")
+                try:
+                    out.append((seq, True, worker.event(now_ts, channel,
+                                                        str(view[offset + channel_len:], "utf-8", "surrogatepass"))))
+                except Exception as e:
+                    out.append((seq, False, repr(e)))
+            else:
+                seq, op, args = pickle.loads(msg[1:])
+                if op == "stop":
+                    out.append((seq, True, None))
+                    running = False
+                    break
+                try:
+                    out.append((seq, True, getattr(worker, op)(*args)))
+                except Exception as e:
+                    out.append((seq, False, repr(e)))
+            if len(out) >= REPLY_BATCH or not requests.poll():
+                break
+        replies.send_bytes(pickle.dumps(out, pickle.HIGHEST_PROTOCOL))
+
+
+# --------------------------------------------------------
+# 코디네이터
+# --------------------------------------------------------
+class _Call:
+    __slots__ = ("done", "ok", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.result = None
+
+
+class ShardError(RuntimeError):
+    pass
+
+
+class ShardedDetector:
+    """
+    Detector와 같은 인터페이스 (process / process_traced / swap / set_muted / reset / threshold / window_count)
+    감지는 워커 프로세스에서, 트리거 처리(on_trigger)는 응답 스레드에서 seq 순서대로.
+    생성 시 워커를 띄운다 (상태 복원이 start 전에 오므로). close()로 남은 이벤트를 처리하고 종료.
+    """
+
+    def __init__(self, channel_index, on_trigger, backend, shards: int, clock=time.time, metrics=None,
+                 history=None, fingerprints=None, fingerprint_chars: int = config.FINGERPRINT_MAX_CHARS,
+                 window_seconds: float = config.WINDOW_SECONDS, bucket_seconds: float = config.WINDOW_BUCKET_SECONDS):
+        """
+        backend: 코디네이터 백엔드 (mute, 발언 제한만. 윈도우 카운트는 워커 MemoryBackend)
+        """
+        self.on_trigger = on_trigger
+        self.backend = backend
+        self.clock = clock
+        self.metrics = metrics
+        self.history = history
+        self.fingerprints = fingerprints
+        self.shards = shards
+        self.ring = ShardRing(shards)
+
+        ctx = multiprocessing.get_context("spawn")
+        self._requests = []
+        self._replies = []
+        self._processes = []
+        for i in range(shards):
+            recv_req, send_req = ctx.Pipe(duplex=False)
+            recv_rep, send_rep = ctx.Pipe(duplex=False)
+            p = ctx.Process(target=_worker_main, name=f"errbot-shard-{i}", daemon=True,
+                            args=(recv_req, send_rep, window_seconds, bucket_seconds,
+                                  fingerprint_chars if fingerprints is not None else 0))
+            p.start()
+            recv_req.close()
+            send_rep.close()
+            self._requests.append(send_req)
+            self._replies.append(recv_rep)
+            self._processes.append(p)
+        self._alive = [True] * shards
+        self._closing = False
+
+        # seq 발급 + 파이프 쓰기는 한 락 안에서 (워커별 처리 순서 = seq 순서)
+        self._submit_lock = threading.Lock()
+        self._seq = itertools.count()
+        self._submitted = 0
+        self._pending = {}  # seq -> (shard, event 또는 _Call, now_ts)
+        self._applied = 0
+        self._applied_cond = threading.Condition()
+        self._sent = [0] * shards
+        self._dropped = 0
+        self._failed = 0
+
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="shard-dispatch", daemon=True)
+        self._dispatcher.start()
+
+        self.channel_index = {}
+        self._route = {}
+        self._rules = {}
+        self._hit_counters = {}
+        self.swap(channel_index)
+
+    # ----------------------------------------------------
+    # 룰
+    # ----------------------------------------------------
+    def swap(self, channel_index, reset_keys=()):
+        """
+        채널별 담당 워커에 그 채널 룰만 보낸다 (모든 워커 응답까지 대기)
+        """
+        keys = {key for entry in channel_index.values() for key in entry.keys}
+        if self.history is not None:
+            self.history.register_keys(keys)
+        rules = dict(self._rules)  # 교체 직전 이벤트 응답은 이전 룰로 올 수 있음
+        per_shard = [[] for _ in range(self.shards)]
+        route = {}
+        for channel, entry in channel_index.items():
+            shard = route[channel] = self.ring.shard_for(channel)
+            for rule, key in zip(entry.rules, entry.keys):
+                rules[key] = rule
+                per_shard[shard].append(detect_rule(rule))
+                if self.metrics is not None and key not in self._hit_counters:
+                    self._hit_counters[key] = self.metrics.rule_hits.labels(*key)
+        resets = [[key for key in reset_keys if self.ring.shard_for(key[0]) == i] for i in range(self.shards)]
+        self._rules = rules
+        self._call_all("swap", [(per_shard[i], resets[i]) for i in range(self.shards)])
+        self.channel_index = channel_index
+        self._route = route
+
+    @property
+    def muted(self) -> bool:
+        return self.backend.muted
+
+    def set_muted(self, muted: bool):
+        self.backend.set_muted(muted)
+
+    # ----------------------------------------------------
+    # 감지 (Bolt 스레드)
+    # ----------------------------------------------------
+    def process(self, event):
+        if self.backend.muted:
+            return
+        channel = event.get("channel")
+        shard = self._route.get(channel)
+        if shard is None:
+            return
+        now_ts = self.clock()
+        channel_bytes = channel.encode("utf-8")
+        text_bytes = (event.get("text") or "").encode("utf-8", "surrogatepass")
+        with self._submit_lock:
+            if not self._alive[shard]:
+                self._dropped += 1
+                return
+            seq = next(self._seq)
+            self._pending[seq] = (shard, event, now_ts)
+            self._submitted = seq + 1
+            try:
+                self._requests[shard].send_bytes(b"".join(
+                    (_EVENT, _HEADER.pack(seq, now_ts, len(channel_bytes)), channel_bytes, text_bytes)))
+            except OSError:
+                # 워커가 막 죽음: 응답 스레드가 EOF를 보고 이 seq를 실패로 채운다
+                self._dropped += 1
+                return
+            self._sent[shard] += 1
+
+    def process_traced(self, event, trace):
+        """
+        워커로 넘기는 데까지만 잰다 (워커 안의 match/window는 워커 프로세스 시간)
+        """
+        self.process(event)
+        trace.mark("shard")
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        지금까지 넘긴 이벤트/호출의 트리거 처리가 끝날 때까지 대기
+        """
+        target = self._submitted
+        with self._applied_cond:
+            return self._applied_cond.wait_for(lambda: self._applied >= target, timeout)
+
+    # ----------------------------------------------------
+    # 워커 호출
+    # ----------------------------------------------------
+    def _call(self, shard: int, op: str, *args):
+        return self._call_all(op, {shard: args})[0]
+
+    def _call_all(self, op: str, args_by_shard):
+        """
+        args_by_shard: 워커별 인자 (list면 전체 워커, dict면 그 워커만). 반환: 결과 list (워커 번호 순)
+        """
+        shards = range(self.shards) if isinstance(args_by_shard, list) else sorted(args_by_shard)
+        calls = []
+        with self._submit_lock:
+            for shard in shards:
+                if not self._alive[shard]:
+                    raise ShardError(f"shard {shard} is not running")
+                call = _Call()
+                seq = next(self._seq)
+                self._pending[seq] = (shard, call, None)
+                self._submitted = seq + 1
+                calls.append(call)
+                try:
+                    self._requests[shard].send_bytes(_CALL + pickle.dumps((seq, op, args_by_shard[shard]),
+                                                                          pickle.HIGHEST_PROTOCOL))
+                except OSError:
+                    pass  # 위와 같음 (call은 실패로 끝남)
+        out = []
+        for call in calls:
+            call.done.wait()
+            if not call.ok:
+                raise ShardError(f"{op}: {call.result}")
+            out.append(call.result)
+        return out
+
+    # ----------------------------------------------------
+    # 응답 (shard-dispatch 스레드)
+    # ----------------------------------------------------
+    def _dispatch_loop(self):
+        conns = {conn: i for i, conn in enumerate(self._replies)}
+        ready = {}
+        next_seq = 0
+        while conns:
+            for conn in wait(list(conns)):
+                try:
+                    for seq, ok, payload in pickle.loads(conn.recv_bytes()):
+                        ready[seq] = (ok, payload)
+                except (EOFError, OSError):
+                    self._shard_exited(conns.pop(conn), ready)
+            applied = next_seq
+            while next_seq in ready:
+                ok, payload = ready.pop(next_seq)
+                self._apply(self._pending.pop(next_seq), ok, payload)
+                next_seq += 1
+            if next_seq != applied:
+                with self._applied_cond:
+                    self._applied = next_seq
+                    self._applied_cond.notify_all()
+
+    def _shard_exited(self, shard: int, ready):
+        with self._submit_lock:
+            if self._alive[shard] and not self._closing:
+                print(f"[SHARD_EXIT] shard={shard} exitcode={self._processes[shard].exitcode}")
+            self._alive[shard] = False
+            for seq, (owner, _item, _now_ts) in list(self._pending.items()):
+                if owner == shard and seq not in ready:
+                    ready[seq] = (False, "shard exited")
+
+    def _apply(self, pending, ok: bool, payload):
+        shard, item, now_ts = pending
+        if isinstance(item, _Call):
+            item.ok, item.result = ok, payload
+            item.done.set()
+            return
+        if not ok:
+            self._failed += 1
+            print(f"[SHARD_PROCESS_FAIL] shard={shard} {payload}")
+            return
+        if payload is None:
+            return
+        try:
+            self._fire(item, now_ts, *payload)
+        except Exception as e:
+            self._failed += 1
+            print(f"[SHARD_DISPATCH_FAIL] {repr(e)}")
+
+    def _fire(self, event, now_ts: float, hits, fp):
+        """
+        Detector.apply의 코디네이터 쪽 절반: 이력/시그니처 기록 후 발사된 룰마다 on_trigger
+        """
+        channel = event.get("channel")
+        items = [((channel, name), count, threshold) for name, count, threshold, _fired in hits]
+        for key, count, _threshold in items:
+            counter = self._hit_counters.get(key)
+            if counter is not None:
+                counter.inc(count)
+        if self.history is not None:
+            self.history.record(now_ts, items)
+        if self.fingerprints is not None and fp is not None:
+            self.fingerprints.record_fingerprint(fp, items, now_ts)
+        rules = self._rules
+        for (key, _count, _threshold), (_name, _c, _t, fired) in zip(items, hits):
+            if fired:
+                if fp is not None and FINGERPRINT_KEY not in event:
+                    event = dict(event, **{FINGERPRINT_KEY: fp})
+                self.on_trigger(rules[key], event)
+
+    # ----------------------------------------------------
+    # 상태
+    # ----------------------------------------------------
+    def reset(self):
+        """
+        모든 워커의 윈도우 카운트 초기화 (mute/unmute)
+        """
+        self._call_all("reset", [()] * self.shards)
+
+    def threshold(self, rule) -> int:
+        if rule.get("adaptive") is None:
+            return rule["threshold"]
+        return self._call(self.ring.shard_for(rule["channel"]), "threshold", detect_rule(rule))
+
+    def window_count(self, channel, rule_name, now_ts: float = None) -> int:
+        now_ts = self.clock() if now_ts is None else now_ts
+        return self._call(self.ring.shard_for(channel), "window_count", (channel, rule_name), now_ts)
+
+    def export_state(self, dirty_only: bool = True):
+        """
+        반환: (윈도우 rows, 적응형 기준선 rows) - MemoryBackend.export_windows / AdaptiveThresholds.export 형식
+        """
+        windows, baselines = [], []
+        for shard_windows, shard_baselines in self._call_all("export", [(dirty_only,)] * self.shards):
+            windows.extend(shard_windows)
+            baselines.extend(shard_baselines)
+        return windows, baselines
+
+    def load_state(self, windows, baselines, merge: bool = False):
+        """
+        채널별 담당 워커로 나눠 복원. 반환: (복원한 윈도우 수, 기준선 수)
+        """
+        args = [([], [], merge) for _ in range(self.shards)]
+        for key, state in windows:
+            args[self.ring.shard_for(key[0])][0].append((tuple(key), state))
+        for row in baselines:
+            args[self.ring.shard_for(row[0])][1].append(row)
+        results = self._call_all("load", args)
+        return sum(r[0] for r in results), sum(r[1] for r in results)
+
+    def stats(self) -> dict:
+        return {
+            "shards": self.shards,
+            "sent": list(self._sent),
+            "pending": len(self._pending),
+            "dropped": self._dropped,
+            "failed": self._failed,
+            "alive": sum(self._alive),
+        }
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def close(self, timeout: float = 10.0):
+        """
+        남은 이벤트를 처리한 뒤 워커 종료
+        """
+        self._closing = True
+        if any(self._alive):
+            try:
+                self._call_all("stop", {i: () for i in range(self.shards) if self._alive[i]})
+            except ShardError as e:
+                print(f"[SHARD_STOP_FAIL] {e}")
+        deadline = time.monotonic() + timeout
+        for p in self._processes:
+            p.join(max(0.0, deadline - time.monotonic()))
+            if p.is_alive():
+                p.terminate()
+        for conn in self._requests:
+            conn.close()
+        self._dispatcher.join(max(0.0, deadline - time.monotonic()))
+
+
+class ShardedErrorBot(ErrorBot):
+    """
+    감지만 워커 프로세스로 나눈 ErrorBot (app.py, SHARD_WORKERS > 0)
+    shards: 워커 프로세스 수
+    """
+
+    def __init__(self, *args, shards: int = 2, **kwargs):
+        self._shards = shards
+        super().__init__(*args, **kwargs)
+
+    def _make_detector(self):
+        return ShardedDetector(self.ruleset.channel_index, self.send_alert_for_rule, self.backend, self._shards,
+                               clock=self.clock, metrics=self.metrics, history=self.history,
+                               fingerprints=self.fingerprints, window_seconds=self.backend.window_seconds,
+                               bucket_seconds=getattr(self.backend, "bucket_seconds", config.WINDOW_BUCKET_SECONDS))
+
+    def _make_ingress(self, capacity: int, high_water: int, workers: int):
+        # 워커 파이프가 수신 큐 역할
+        return None
+
+    def stop(self):
+        # 워커에 남은 이벤트의 트리거가 전송 큐로 들어간 뒤 큐를 닫는다
+        self.detector.close()
+        super().stop()
+
+    def flush_digest(self):
+        # 앞서 넘긴 이벤트의 트리거가 요약에 들어간 뒤에 보냄 (단일 프로세스와 같은 요약)
+        self.detector.join()
+        super().flush_digest()
+
+    def stats(self) -> dict:
+        out = super().stats()
+        out["shards"] = self.detector.stats()
+        return out
+
+    def _register_gauges(self):
+        super()._register_gauges()
+        self.metrics.gauge("errbot_shard_pending", "Events handed to shard workers and not yet applied", (),
+                           lambda: [((), self.detector.pending())])
+
+    # ----------------------------------------------------
+    # 상태 (윈도우/기준선은 워커에)
+    # ----------------------------------------------------
+    def collect_state(self):
+        windows, baselines = self.detector.export_state()
+        meta = {"muted": self.backend.muted, "rate_buckets": self.backend.export_limits(), "baselines": baselines}
+        return windows, meta, self.history.export()
+
+    def restore_state(self, store, merge: bool = False):
+        started = time.perf_counter()
+        windows, meta = store.load()
+        restored, baselines = self.detector.load_state(windows, meta.get("baselines", []), merge=merge)
+        self.backend.set_muted(bool(meta.get("muted", False)))
+        self.backend.import_limits(meta.get("rate_buckets", {}), merge=merge)
+        history = self.history.load(store.load_history(), merge=merge)
+        took_ms = (time.perf_counter() - started) * 1000.0
+        print(
+            f"[BOOT] state {'merged' if merge else 'restored'} path={store.path} windows={restored}/{len(windows)} "
+            f"muted={self.detector.muted} baselines={baselines} history={history} shards={self._shards} "
+            f"took={took_ms:.1f}ms"
+        )
@@ -0,0 +1,159 @@
+"""
+감지 상태 영속화 (선택)
+
+윈도우 카운터 / 발언 제한 토큰 버킷 / mute 상태 / 룰별 hit 이력을 로컬 SQLite 파일에 저장해 두고
+재시작 시 바로 복원한다. Slack 히스토리를 다시 읽지 않는다.
+- 쓰기는 StateSnapshotter 스레드가 주기적으로 "바뀐 키만" 한 트랜잭션으로 묶어 처리
+  (메시지 처리 경로는 dirty 플래그만 세움)
+- WAL 모드라 쓰는 도중 죽어도 마지막 커밋 상태로 열린다
+"""
+import json
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS windows (
+    channel TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    bucket_seconds REAL NOT NULL,
+    head INTEGER,
+    total INTEGER NOT NULL,
+    buckets BLOB NOT NULL,
+    PRIMARY KEY (channel, rule)
+);
+CREATE TABLE IF NOT EXISTS history (
+    channel TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket_seconds REAL NOT NULL,
+    head INTEGER,
+    total INTEGER NOT NULL,
+    buckets BLOB NOT NULL,
+    PRIMARY KEY (channel, rule, resolution)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class StateStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def save(self, windows, meta: dict, history=()):
+        """
+        windows: Detector.export_windows() 결과
+        meta: JSON 직렬화 가능한 값들 (mute, 발언 제한 버킷 등)
+        history: RuleHistory.export() 결과 (바뀐 키만)
+        """
+        rows = [
+            (channel, rule, bucket_seconds, head, total, buckets)
+            for (channel, rule), (bucket_seconds, head, total, buckets) in windows
+        ]
+        history_rows = [
+            (channel, rule, resolution, bucket_seconds, head, total, buckets)
+            for (channel, rule), resolution, (bucket_seconds, head, total, buckets) in history
+        ]
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                if rows:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO windows (channel, rule, bucket_seconds, head, total, buckets) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                if history_rows:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO history "
+                        "(channel, rule, resolution, bucket_seconds, head, total, buckets) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        history_rows,
+                    )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [(k, json.dumps(v)) for k, v in meta.items()],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def load(self):
+        """
+        (windows, meta) - windows는 Detector.import_windows()에 그대로 넘긴다.
+        """
+        with self._lock:
+            window_rows = self._conn.execute(
+                "SELECT channel, rule, bucket_seconds, head, total, buckets FROM windows"
+            ).fetchall()
+            meta_rows = self._conn.execute("SELECT key, value FROM meta").fetchall()
+
+        windows = [
+            ((channel, rule), (bucket_seconds, head, total, bytes(buckets)))
+            for channel, rule, bucket_seconds, head, total, buckets in window_rows
+        ]
+        meta = {k: json.loads(v) for k, v in meta_rows}
+        return windows, meta
+
+    def load_history(self):
+        """
+        RuleHistory.load()에 그대로 넘기는 형식
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT channel, rule, resolution, bucket_seconds, head, total, buckets FROM history"
+            ).fetchall()
+        return [
+            ((channel, rule), resolution, (bucket_seconds, head, total, bytes(buckets)))
+            for channel, rule, resolution, bucket_seconds, head, total, buckets in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class StateSnapshotter:
+    """
+    interval_seconds마다 collect_fn() -> (windows, meta[, history])를 받아 store.save()
+    stop() 시 마지막으로 한 번 더 저장한다.
+    """
+
+    def __init__(self, store: StateStore, collect_fn, interval_seconds: float = 5.0):
+        self.store = store
+        self.collect_fn = collect_fn
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="state-snapshotter", daemon=True)
+        self._thread.start()
+
+    def flush(self):
+        try:
+            self.store.save(*self.collect_fn())
+        except Exception as e:
+            print(f"[STATE_SAVE_FAIL] {repr(e)}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.flush()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
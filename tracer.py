@@ -0,0 +1,125 @@
+"""
+샘플링 단계별 타이밍 (handle_message -> process_message -> send_alert_for_rule)
+
+TRACE_SAMPLE_RATE > 0 이면 이벤트 N건 중 1건(1/rate)을 골라 단계별 시간을 잰다.
+    dedupe     필터 + Slack 재전송 중복 제거 + !mute 명령
+    ingress    수신 큐 대기 (ingress.py, 큐를 쓸 때만)
+    extract    text + attachments + blocks 버퍼 만들기 (extract.py)
+    match      lower + 룰 스캔 (KeywordMatcher, 정규식/필드)
+    window     윈도우 카운터 갱신 (lock_wait 제외)
+    lock_wait  (channel, rule) 키 락 대기 (MemoryBackend)
+    fingerprint  에러 시그니처 계산 + 룰별 LRU 갱신 (fingerprint.py, hit 난 이벤트만)
+    shard      샤드 워커로 넘기기 (shard.py, match~fingerprint 대신. 워커 안 시간은 재지 않음)
+    send       트리거 -> 발언 제한 확인 + 전송 큐 투입 (alert_workers=0이면 Slack 호출까지)
+단계별 시간은 errbot_stage_seconds{stage} 히스토그램으로 모으고,
+SLOW_EVENT_MS를 넘은 이벤트는 단계 분해와 메시지 크기를 로그로 남긴다 ([SLOW_EVENT]).
+
+샘플링을 끄면(rate 0) ErrorBot.tracer가 None이라 이벤트당 추가 비용은 분기 1개다.
+샘플링된 이벤트도 같은 단계 함수를 쓰고 사이사이 시각만 찍는다 (ErrorBot._handle_traced).
+"""
+import itertools
+import time
+
+from metrics import Counter, Histogram
+
+STAGES = ("dedupe", "ingress", "extract", "match", "window", "lock_wait", "fingerprint", "shard", "send")
+
+# 단계 하나는 보통 수 us, 느린 경우 수십 ms
+STAGE_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+class Trace:
+    """
+    이벤트 1건의 단계별 시간 (한 번에 한 스레드만 쓴다. 수신 큐를 거치면 워커 스레드로 넘어감)
+    """
+    __slots__ = ("started", "last", "spans", "carved", "size", "channel")
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.spans = {}
+        self.carved = 0.0
+        self.size = 0
+        self.channel = None
+
+    def mark(self, stage: str):
+        """
+        직전 mark 이후 시간을 stage에 더한다 (carve로 따로 뺀 시간은 제외)
+        """
+        now = time.perf_counter()
+        spans = self.spans
+        spans[stage] = spans.get(stage, 0.0) + (now - self.last - self.carved)
+        self.last = now
+        self.carved = 0.0
+
+    def carve(self, stage: str, seconds: float):
+        """
+        다음 mark 구간 안에서 잰 시간을 별도 단계로 (예: window 안의 lock_wait)
+        """
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+        self.carved += seconds
+
+    def total(self) -> float:
+        return self.last - self.started
+
+
+class StageTracer:
+    """
+    sample_rate: 0~1 (1/sample_rate건마다 1건, 결정적이라 난수 비용 없음)
+    slow_seconds: 이 시간을 넘은 이벤트는 로그 (샘플링 안 된 이벤트는 전체 시간/크기만)
+    """
+
+    def __init__(self, sample_rate: float, slow_seconds: float, metrics, log=print):
+        self.every = max(1, round(1.0 / sample_rate))
+        self.slow_seconds = slow_seconds
+        self.log = log
+        self._tick = itertools.count()
+
+        r = metrics.registry
+        stage_seconds = r.register(Histogram(
+            "errbot_stage_seconds", "Per-stage time of sampled events (see tracer.py)", ("stage",),
+            buckets=STAGE_BUCKETS))
+        self._stage = {stage: stage_seconds.labels(stage) for stage in STAGES}
+        self._total = stage_seconds.labels("total")
+        self._slow = r.register(Counter(
+            "errbot_slow_events_total", "Events over the latency budget (SLOW_EVENT_MS)", ("sampled",)))
+        self._slow_sampled = self._slow.labels("true")
+        self._slow_unsampled = self._slow.labels("false")
+
+    def sample(self):
+        """
+        이번 이벤트를 잴지 (next()는 GIL 하에서 원자적)
+        """
+        if next(self._tick) % self.every:
+            return None
+        return Trace()
+
+    def finish(self, trace: Trace):
+        stage = self._stage
+        for name, seconds in trace.spans.items():
+            stage[name].observe(seconds)
+        total = trace.total()
+        self._total.observe(total)
+        if total > self.slow_seconds:
+            self._slow_sampled.inc()
+            breakdown = " ".join(f"{name}={seconds * 1000:.2f}ms" for name, seconds in trace.spans.items())
+            self.log(f"[SLOW_EVENT] total={total * 1000:.2f}ms channel={trace.channel} size={trace.size} "
+                     f"{breakdown}")
+
+    def check_unsampled(self, elapsed: float, body):
+        if elapsed > self.slow_seconds:
+            self._slow_unsampled.inc()
+            event = body.get("event", {}) or {}
+            self.log(f"[SLOW_EVENT] total={elapsed * 1000:.2f}ms channel={event.get('channel')} "
+                     f"size={len(event.get('text') or '')} (not sampled)")
+
+    def summary(self) -> dict:
+        """
+        단계별 평균 (us) / 샘플 수 - 리플레이/벤치 출력용
+        """
+        out = {}
+        for name, child in list(self._stage.items()) + [("total", self._total)]:
+            n = sum(child.counts)
+            if n:
+                out[name] = {"n": n, "mean_us": child.sum / n * 1e6}
+        return out
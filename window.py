@@ -0,0 +1,138 @@
+"""
+고정 메모리 슬라이딩 윈도우 카운터
+
+hit마다 timestamp를 쌓는 대신 bucket_seconds 단위 버킷 배열(ring)에 개수만 더한다.
+- add(now, n), count(now): O(1) (경과한 버킷 정리는 상각 O(1))
+- 메모리: 버킷 수(window / bucket + 1) 고정, hit 수와 무관
+- 정확도: 버킷 1개 이내 (윈도우 경계가 버킷 단위로 잘림)
+"""
+import math
+from array import array
+
+
+class SlidingWindowCounter:
+    __slots__ = ("window_seconds", "bucket_seconds", "_size", "_buckets", "_head", "_total")
+
+    def __init__(self, window_seconds: float, bucket_seconds: float = 1.0):
+        if window_seconds <= 0 or bucket_seconds <= 0:
+            raise ValueError("window_seconds and bucket_seconds must be positive")
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        # 경계 버킷까지 포함해야 기존(now - ts <= window) 이벤트를 놓치지 않는다
+        self._size = int(math.ceil(window_seconds / bucket_seconds)) + 1
+        self._buckets = array("q", bytes(8 * self._size))
+        self._head = None  # 마지막으로 정리한 절대 버킷 번호
+        self._total = 0
+
+    def _advance(self, now_ts: float) -> int:
+        """
+        now_ts 버킷까지 시간을 진행시키며 윈도우 밖 버킷을 0으로 만든다.
+        시계가 되돌아간 경우에는 현재 head 버킷을 그대로 쓴다.
+        """
+        idx = int(now_ts // self.bucket_seconds)
+        head = self._head
+        if head is None:
+            self._head = idx
+            return idx
+        if idx <= head:
+            return head
+
+        buckets = self._buckets
+        size = self._size
+        if idx - head >= size:
+            self.clear()
+        else:
+            total = self._total
+            for i in range(head + 1, idx + 1):
+                slot = i % size
+                total -= buckets[slot]
+                buckets[slot] = 0
+            self._total = total
+        self._head = idx
+        return idx
+
+    def prune(self, now_ts: float):
+        self._advance(now_ts)
+
+    def add(self, now_ts: float, n: int = 1):
+        idx = int(now_ts // self.bucket_seconds)
+        if idx != self._head:
+            idx = self._advance(now_ts)
+        self._buckets[idx % self._size] += n
+        self._total += n
+
+    def count(self, now_ts: float = None) -> int:
+        if now_ts is not None:
+            self._advance(now_ts)
+        return self._total
+
+    def recent(self, n: int, now_ts: float = None):
+        """
+        최근 버킷 n개(지금 버킷 포함)의 카운트 list, 오래된 것부터 (n은 버킷 수까지)
+        array 슬라이스 2개라 버킷 수천 개도 수 us
+        """
+        if now_ts is not None:
+            self._advance(now_ts)
+        n = max(0, min(n, self._size))
+        if self._head is None or n == 0:
+            return [0] * n
+        end = self._head % self._size + 1
+        start = end - n
+        buckets = self._buckets
+        if start >= 0:
+            return buckets[start:end].tolist()
+        return buckets[start:].tolist() + buckets[:end].tolist()
+
+    def clear(self):
+        self._buckets = array("q", bytes(8 * self._size))
+        self._total = 0
+
+    def __len__(self):
+        return self._total
+
+    # ----------------------------------------------------
+    # 영속화 (state_store)
+    # ----------------------------------------------------
+    def to_state(self):
+        """
+        (bucket_seconds, head, total, 버킷 bytes)
+        head가 절대 버킷 번호라 복원 후 시간이 지나 있으면 다음 add/count에서 자연스럽게 만료된다.
+        """
+        return self.bucket_seconds, self._head, self._total, self._buckets.tobytes()
+
+    def load_state(self, bucket_seconds, head, total, buckets_bytes) -> bool:
+        """
+        같은 윈도우/버킷 설정으로 저장된 상태만 복원. 설정이 다르면 False
+        """
+        if bucket_seconds != self.bucket_seconds:
+            return False
+        buckets = array("q")
+        buckets.frombytes(buckets_bytes)
+        if len(buckets) != self._size:
+            return False
+        self._buckets = buckets
+        self._head = head
+        self._total = total
+        return True
+
+    def merge_state(self, bucket_seconds, head, total, buckets_bytes) -> bool:
+        """
+        다른 프로세스가 센 상태를 지금 카운트에 더한다 (무중단 재시작: 겹침 구간 동안 양쪽이 나눠 센 hit)
+        """
+        other = SlidingWindowCounter(self.window_seconds, self.bucket_seconds)
+        if not other.load_state(bucket_seconds, head, total, buckets_bytes):
+            return False
+        if other._head is None:
+            return True
+        if self._head is None:
+            self._head = other._head
+        # 두 카운터를 같은 head로 맞추면 버킷 위치(절대 번호 % size)가 같아진다
+        target = max(self._head, other._head)
+        self._advance(target * self.bucket_seconds)
+        other._advance(target * self.bucket_seconds)
+        buckets = self._buckets
+        for i, n in enumerate(other._buckets):
+            if n:
+                buckets[i] += n
+        self._total += other._total
+        return True